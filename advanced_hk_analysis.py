@@ -121,16 +121,72 @@ def load_special_number_data(file_path='HK2025_lottery_data_complete.json'):
             special_history.append(entry)
     return special_history
 
-def analyze_special_trend(special_history, weights):
+def zodiac_gaps(special_history):
+    """每个生肖距今的遗漏期数（未出现记为100），与回顾期无关"""
+    zodiac_last_seen = {z: 100 for z in ZODIAC_MAP.keys()}
+    for i, record in enumerate(special_history):
+        z = record['shengXiao']
+        if z in zodiac_last_seen and zodiac_last_seen[z] == 100:
+            zodiac_last_seen[z] = i
+    return zodiac_last_seen
+
+def special_window_stats(special_history, lookback, zodiac_last_seen=None, counts=None):
+    """
+    V6 特码窗口统计：只依赖历史与回顾期，与其余权重无关，
+    可以在多个策略之间共享（见 tournament.py）。
+    counts 为可选的窗口计数 {'zodiac', 'color', 'tail'}（Counter，键按在窗口中首次出现的顺序），
+    由前缀累计计数切片得到时与直接扫描窗口的结果完全相同。
+    """
+    recent_specials = special_history[:lookback]
+
+    # --- 1. 多维统计 ---
+    # 生肖
+    zodiac_counts = counts['zodiac'] if counts else Counter(r['shengXiao'] for r in recent_specials)
+    if zodiac_last_seen is None:
+        zodiac_last_seen = zodiac_gaps(special_history)
+    coldest_zodiac = max(zodiac_last_seen, key=zodiac_last_seen.get)
+
+    # 波色
+    color_counts = counts['color'] if counts else Counter(r['color'] for r in recent_specials)
+    total_colors = sum(color_counts.values()) or 1
+    color_weights = {c: (count / total_colors) for c, count in color_counts.items()}
+    # 找出最热波色
+    top_colors = {c for c, _ in color_counts.most_common(1)}
+
+    # 尾数
+    tail_counts = counts['tail'] if counts else Counter(r['number'] % 10 for r in recent_specials)
+    total_tails = sum(tail_counts.values()) or 1
+    tail_weights = {t: (count / total_tails) for t, count in tail_counts.items()}
+    # 找出最热尾数
+    top_tails = {t for t, _ in tail_counts.most_common(2)}
+
+    return {
+        'zodiac_counts': zodiac_counts,
+        'zodiac_last_seen': zodiac_last_seen,
+        'coldest_zodiac': coldest_zodiac,
+        'color_counts': color_counts,
+        'color_weights': color_weights,
+        'top_colors': top_colors,
+        'tail_counts': tail_counts,
+        'tail_weights': tail_weights,
+        'top_tails': top_tails
+    }
+
+def special_lookback(weights):
+    lookback = int(weights.get('special_lookback', 20))
+    if lookback < 5: lookback = 5
+    return lookback
+
+def analyze_special_trend(special_history, weights, stats=None):
     """
     V6 核心算法：全域号码评分系统 + 共振效应
     (Tier 1 Target: Special Number)
+    stats 为可选的预先计算好的 special_window_stats 结果
     """
     if not special_history:
         return None
 
-    lookback = int(weights.get('special_lookback', 20))
-    if lookback < 5: lookback = 5
+    lookback = special_lookback(weights)
     
     # 提取基础权重
     w_hot = weights.get('special_hot', 1.0)
@@ -144,32 +200,18 @@ def analyze_special_trend(special_history, weights):
     w_resonance = weights.get('special_resonance', 1.5) # 共振倍率
     w_tail_cont = weights.get('special_tail_continuity', 1.0)
 
-    recent_specials = special_history[:lookback]
-
     # --- 1. 多维统计 ---
-    # 生肖
-    zodiac_counts = Counter(r['shengXiao'] for r in recent_specials)
-    zodiac_last_seen = {z: 100 for z in ZODIAC_MAP.keys()}
-    for i, record in enumerate(special_history):
-        z = record['shengXiao']
-        if z in zodiac_last_seen and zodiac_last_seen[z] == 100:
-            zodiac_last_seen[z] = i
-    coldest_zodiac = max(zodiac_last_seen, key=zodiac_last_seen.get)
-
-    # 波色
-    color_counts = Counter(r['color'] for r in recent_specials)
-    total_colors = sum(color_counts.values()) or 1
-    color_weights = {c: (count / total_colors) for c, count in color_counts.items()}
-    # 找出最热波色
-    top_colors = {c for c, _ in color_counts.most_common(1)}
-
-    # 尾数
-    tails = [r['number'] % 10 for r in recent_specials]
-    tail_counts = Counter(tails)
-    total_tails = sum(tail_counts.values()) or 1
-    tail_weights = {t: (count / total_tails) for t, count in tail_counts.items()}
-    # 找出最热尾数
-    top_tails = {t for t, _ in tail_counts.most_common(2)}
+    if stats is None:
+        stats = special_window_stats(special_history, lookback)
+    zodiac_counts = stats['zodiac_counts']
+    zodiac_last_seen = stats['zodiac_last_seen']
+    coldest_zodiac = stats['coldest_zodiac']
+    color_counts = stats['color_counts']
+    color_weights = stats['color_weights']
+    top_colors = stats['top_colors']
+    tail_counts = stats['tail_counts']
+    tail_weights = stats['tail_weights']
+    top_tails = stats['top_tails']
 
     # --- 2. 基础评分 (生肖) ---
     zodiac_scores = {}
@@ -83,6 +83,22 @@ for cat_name, cat_map in ALL_CATEGORIES.items():
             num: k for k, z_set in cat_map.items() for z in z_set for num in ZODIAC_MAP[z]
         }
 
+# V7 默认参数（未经优化，用于缺少策略文件时以及策略对比）
+DEFAULT_V7_WEIGHTS = {
+    'special_hot': 2.5,
+    'special_gap': 2.5,
+    'special_zodiac': 5.0,
+    'special_color_weight': 3.0,
+    'special_tail_weight': 3.0,
+    'special_cold_protect': 4.0,
+    'special_lookback': 30,
+    'special_resonance': 2.0,
+    'special_cycle_weight': 2.5,
+    'special_element_weight': 2.5,
+    'special_balance_weight': 2.0,
+    'special_diversity_bonus': 1.5
+}
+
 def load_data():
     """Loads and combines all lottery data."""
     all_records = {}
@@ -121,17 +137,82 @@ def load_special_number_data(file_path='lottery_data_2025_complete.json'):
             special_history.append(entry)
     return special_history
 
-def analyze_special_trend(special_history, weights):
+def zodiac_gaps(special_history):
+    """每个生肖距今的遗漏期数（未出现记为100），与回顾期无关"""
+    zodiac_last_seen = {z: 100 for z in ZODIAC_MAP.keys()}
+    for i, record in enumerate(special_history):
+        z = record['shengXiao']
+        if z in zodiac_last_seen and zodiac_last_seen[z] == 100:
+            zodiac_last_seen[z] = i
+    return zodiac_last_seen
+
+def special_window_stats(special_history, lookback, zodiac_last_seen=None, counts=None):
+    """
+    V7 特码窗口统计：只依赖历史与回顾期，与其余权重无关。
+    同一期、同一回顾期的统计可以在多个策略之间共享（见 tournament.py）。
+    counts 为可选的窗口计数 {'zodiac', 'color', 'tail', 'element'}（Counter，键按在窗口中首次出现的顺序），
+    由前缀累计计数切片得到时与直接扫描窗口的结果完全相同。
+    """
+    recent_specials = special_history[:lookback]
+
+    # --- 1. 多维统计增强版 ---
+    # 生肖统计
+    zodiac_counts = counts['zodiac'] if counts else Counter(r['shengXiao'] for r in recent_specials)
+    if zodiac_last_seen is None:
+        zodiac_last_seen = zodiac_gaps(special_history)
+
+    # 波色统计
+    color_counts = counts['color'] if counts else Counter(r['color'] for r in recent_specials)
+    total_colors = sum(color_counts.values()) or 1
+    color_weights = {c: (count / total_colors) for c, count in color_counts.items()}
+    top_colors = {c for c, _ in color_counts.most_common(2)}
+
+    # 尾数统计
+    tail_counts = counts['tail'] if counts else Counter(r['number'] % 10 for r in recent_specials)
+    total_tails = sum(tail_counts.values()) or 1
+    tail_weights = {t: (count / total_tails) for t, count in tail_counts.items()}
+    top_tails = {t for t, _ in tail_counts.most_common(3)}
+
+    # V7 新增：五行统计
+    element_counts = (counts['element'] if counts
+                      else Counter(r.get('wuXing', '未知') for r in recent_specials if r.get('wuXing')))
+    total_elements = sum(element_counts.values()) or 1
+    element_weights = {e: (count / total_elements) for e, count in element_counts.items()}
+    
+    # V7 新增：周期性分析
+    recent_5_zodiacs = [r['shengXiao'] for r in special_history[:5]]
+    cycle_pattern = Counter(recent_5_zodiacs)
+
+    return {
+        'zodiac_counts': zodiac_counts,
+        'zodiac_last_seen': zodiac_last_seen,
+        'color_counts': color_counts,
+        'color_weights': color_weights,
+        'top_colors': top_colors,
+        'tail_counts': tail_counts,
+        'tail_weights': tail_weights,
+        'top_tails': top_tails,
+        'element_counts': element_counts,
+        'element_weights': element_weights,
+        'cycle_pattern': cycle_pattern
+    }
+
+def special_lookback(weights):
+    lookback = int(weights.get('special_lookback', 20))
+    if lookback < 5: lookback = 5
+    return lookback
+
+def analyze_special_trend(special_history, weights, stats=None):
     """
     V7 核心算法：8生肖智能覆盖 + 多维度深度分析
     目标：通过8个生肖实现最高准确率（理论值67%+）
     策略：热门生肖(6) + 防守冷门(2) + 多维度交叉验证
+    stats 为可选的预先计算好的 special_window_stats 结果
     """
     if not special_history:
         return None
 
-    lookback = int(weights.get('special_lookback', 20))
-    if lookback < 5: lookback = 5
+    lookback = special_lookback(weights)
     
     # 提取基础权重
     w_hot = weights.get('special_hot', 1.0)
@@ -148,43 +229,20 @@ def analyze_special_trend(special_history, weights):
     w_cycle = weights.get('special_cycle_weight', 1.0)
     w_diversity = weights.get('special_diversity_bonus', 1.0)
 
-    recent_specials = special_history[:lookback]
-
     # --- 1. 多维统计增强版 ---
-    # 生肖统计
-    zodiac_counts = Counter(r['shengXiao'] for r in recent_specials)
-    zodiac_last_seen = {z: 100 for z in ZODIAC_MAP.keys()}
-    zodiac_streak = {z: 0 for z in ZODIAC_MAP.keys()}
-    
-    for i, record in enumerate(special_history):
-        z = record['shengXiao']
-        if z in zodiac_last_seen and zodiac_last_seen[z] == 100:
-            zodiac_last_seen[z] = i
-    
-    for z in ZODIAC_MAP.keys():
-        zodiac_streak[z] = zodiac_last_seen[z]
-
-    # 波色统计
-    color_counts = Counter(r['color'] for r in recent_specials)
-    total_colors = sum(color_counts.values()) or 1
-    color_weights = {c: (count / total_colors) for c, count in color_counts.items()}
-    top_colors = {c for c, _ in color_counts.most_common(2)}
-
-    # 尾数统计
-    tails = [r['number'] % 10 for r in recent_specials]
-    tail_counts = Counter(tails)
-    total_tails = sum(tail_counts.values()) or 1
-    tail_weights = {t: (count / total_tails) for t, count in tail_counts.items()}
-    top_tails = {t for t, _ in tail_counts.most_common(3)}
-
-    # V7 新增：五行统计
-    element_counts = Counter(r.get('wuXing', '未知') for r in recent_specials if r.get('wuXing'))
-    total_elements = sum(element_counts.values()) or 1
-    element_weights = {e: (count / total_elements) for e, count in element_counts.items()}
-    
-    # V7 新增：周期性分析
-    recent_5_zodiacs = [r['shengXiao'] for r in special_history[:5]]
-    cycle_pattern = Counter(recent_5_zodiacs)
+    if stats is None:
+        stats = special_window_stats(special_history, lookback)
+    zodiac_counts = stats['zodiac_counts']
+    zodiac_last_seen = stats['zodiac_last_seen']
+    color_counts = stats['color_counts']
+    color_weights = stats['color_weights']
+    top_colors = stats['top_colors']
+    tail_counts = stats['tail_counts']
+    tail_weights = stats['tail_weights']
+    top_tails = stats['top_tails']
+    element_counts = stats['element_counts']
+    element_weights = stats['element_weights']
+    cycle_pattern = stats['cycle_pattern']
 
     # --- 2. 智能评分系统 (生肖层级) ---
     zodiac_scores = {}
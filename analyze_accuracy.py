@@ -1,16 +1,11 @@
 import json
-from collections import Counter
+import walk_forward_v7
 
-# Load lottery data
-with open('lottery_data_2025_complete.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+# Load V7 strategy and the shared walk-forward results table
+with open('best_special_strategy_macau_v7.json', 'r', encoding='utf-8') as f:
+    weights = json.load(f)
 
-records = data.get('totalRecords', [])
-records.sort(key=lambda x: int(x['period']), reverse=True)
-
-# Load prediction history
-with open('macau_special_prediction_history.json', 'r', encoding='utf-8') as f:
-    predictions = json.load(f)
+table = walk_forward_v7.get_walk_forward('macau', weights)
 
 print("="*60)
 print("特码预测准确率分析")
@@ -18,81 +13,67 @@ print("="*60)
 
 # Analyze last 50 periods special number zodiac distribution
 zodiac_count = {}
-for i, record in enumerate(records[:50]):
-    if 'numberList' in record and len(record['numberList']) >= 7:
-        special = record['numberList'][-1]
-        zodiac = special['shengXiao']
-        number = int(special['number'])
-        zodiac_count[zodiac] = zodiac_count.get(zodiac, 0) + 1
+recent_50 = walk_forward_v7.recent(table, 50)
+for zodiac in recent_50['actual_zodiac']:
+    zodiac_count[zodiac] = zodiac_count.get(zodiac, 0) + 1
+total_recent = len(recent_50['actual_zodiac']) or 1
 
-print('\n最近50期特码生肖分布:')
+print(f'\n最近{total_recent}期特码生肖分布:')
 for z, c in sorted(zodiac_count.items(), key=lambda x: x[1], reverse=True):
-    print(f'  {z}: {c}期 ({c/50*100:.1f}%)')
+    print(f'  {z}: {c}期 ({c/total_recent*100:.1f}%)')
 
 # Check prediction accuracy
 print("\n" + "="*60)
 print("预测准确率检查 (最近20期)")
 print("="*60)
 
+# zodiac_rank is the position of the actual zodiac in the predicted list (0 = miss),
+# so the top-k hit for any k follows without re-running the prediction.
 hits_4 = 0
 hits_6 = 0
 hits_7 = 0
+hits_8 = 0
 total_checked = 0
 
-for pred in predictions[:20]:
-    period = pred.get('period')
-    
-    # Find actual result
-    actual_record = None
-    for record in records:
-        if int(record['period']) == period:
-            actual_record = record
-            break
-    
-    if not actual_record:
-        continue
-    
-    if 'numberList' not in actual_record or len(actual_record['numberList']) < 7:
-        continue
-        
-    actual_special = actual_record['numberList'][-1]
-    actual_zodiac = actual_special['shengXiao']
-    actual_number = int(actual_special['number'])
-    
-    predicted_zodiacs_4 = [z[0] for z in pred.get('top_zodiacs', [])][:4]
-    predicted_zodiacs_6 = [z[0] for z in pred.get('top_zodiacs', [])][:6] if len(pred.get('top_zodiacs', [])) >= 6 else predicted_zodiacs_4
-    predicted_zodiacs_7 = [z[0] for z in pred.get('top_zodiacs', [])][:7] if len(pred.get('top_zodiacs', [])) >= 7 else predicted_zodiacs_6
-    
-    hit_4 = actual_zodiac in predicted_zodiacs_4
-    hit_6 = actual_zodiac in predicted_zodiacs_6
-    hit_7 = actual_zodiac in predicted_zodiacs_7
-    
-    if hit_4:
-        hits_4 += 1
-    if hit_6:
-        hits_6 += 1
-    if hit_7:
-        hits_7 += 1
-    
+for row in walk_forward_v7.iter_rows(table, limit=20):
+    rank = row['zodiac_rank']
+    predicted = row['predicted_zodiacs']
+
+    hit_4 = 0 < rank <= 4
+    hit_6 = 0 < rank <= 6
+    hit_7 = 0 < rank <= 7
+    hit_8 = rank > 0
+
+    hits_4 += hit_4
+    hits_6 += hit_6
+    hits_7 += hit_7
+    hits_8 += hit_8
     total_checked += 1
-    
+
     status_4 = "HIT" if hit_4 else "MISS"
     status_6 = "HIT" if hit_6 else "MISS"
     status_7 = "HIT" if hit_7 else "MISS"
-    
-    print(f"\n期号 {period}:")
-    print(f"  实际特码: {actual_number} ({actual_zodiac})")
-    print(f"  预测4肖: {predicted_zodiacs_4} - {status_4}")
-    print(f"  预测6肖: {predicted_zodiacs_6} - {status_6}")
-    print(f"  预测7肖: {predicted_zodiacs_7} - {status_7}")
+    status_8 = "HIT" if hit_8 else "MISS"
 
-print("\n" + "="*60)
-print("统计结果")
-print("="*60)
-print(f"总检查期数: {total_checked}")
-print(f"预测4肖命中: {hits_4}/{total_checked} ({hits_4/total_checked*100:.1f}%)")
-print(f"预测6肖命中: {hits_6}/{total_checked} ({hits_6/total_checked*100:.1f}%)")
-print(f"预测7肖命中: {hits_7}/{total_checked} ({hits_7/total_checked*100:.1f}%)")
-print(f"\n4肖失误率: {(total_checked-hits_4)/total_checked*100:.1f}%")
-print(f"6肖失误率: {(total_checked-hits_6)/total_checked*100:.1f}%")
-print(f"7肖失误率: {(total_checked-hits_7)/total_checked*100:.1f}%")
+    print(f"\n期号 {row['period']}:")
+    print(f"  实际特码: {row['actual_number']} ({row['actual_zodiac']})")
+    print(f"  预测4肖: {predicted[:4]} - {status_4}")
+    print(f"  预测6肖: {predicted[:6]} - {status_6}")
+    print(f"  预测7肖: {predicted[:7]} - {status_7}")
+    print(f"  预测8肖: {predicted[:8]} - {status_8}")
+
+if total_checked == 0:
+    print("\n没有可用的回测结果。")
+else:
+    print("\n" + "="*60)
+    print("统计结果")
+    print("="*60)
+    print(f"总检查期数: {total_checked}")
+    print(f"预测4肖命中: {hits_4}/{total_checked} ({hits_4/total_checked*100:.1f}%)")
+    print(f"预测6肖命中: {hits_6}/{total_checked} ({hits_6/total_checked*100:.1f}%)")
+    print(f"预测7肖命中: {hits_7}/{total_checked} ({hits_7/total_checked*100:.1f}%)")
+    print(f"预测8肖命中: {hits_8}/{total_checked} ({hits_8/total_checked*100:.1f}%)")
+    print(f"\n4肖失误率: {(total_checked-hits_4)/total_checked*100:.1f}%")
+    print(f"6肖失误率: {(total_checked-hits_6)/total_checked*100:.1f}%")
+    print(f"7肖失误率: {(total_checked-hits_7)/total_checked*100:.1f}%")
+    print(f"8肖失误率: {(total_checked-hits_8)/total_checked*100:.1f}%")
@@ -0,0 +1,184 @@
+"""
+回测显著性检验
+用向量化的 NumPy 随机模拟替代手写的"理论准确率 66.7%"：
+
+1. 随机基线：在同样的期数上模拟成千上万个随机 8生肖 / 12号码 策略；
+2. 置换检验：把实际开奖结果在各期之间打乱，检验真实策略的命中
+   是否依赖于"预测与当期对应"，而不只是偏好常出的生肖。
+
+开奖与预测都编码为位掩码（生肖 12 位，号码 50 位），命中判断只是一次移位与按位与。
+"""
+from itertools import combinations
+import numpy as np
+import walk_forward_v7
+from advanced_lottery_analysis_v7 import ZODIAC_MAP
+
+ZODIAC_INDEX = {z: i for i, z in enumerate(ZODIAC_MAP.keys())}
+N_ZODIACS = len(ZODIAC_INDEX)
+N_NUMBERS = 49
+
+DEFAULT_SIMULATIONS = 20000
+DEFAULT_PERMUTATIONS = 10000
+SIMULATION_CHUNK = 500000     # 每批生成的随机号码组合数，控制内存占用
+
+
+def encode_table(table):
+    """把滚动回测结果表编码为位掩码数组"""
+    actual_zodiac = np.array([ZODIAC_INDEX[z] for z in table['actual_zodiac']], dtype=np.int64)
+    actual_number = np.array(table['actual_number'], dtype=np.int64)
+
+    zodiac_mask = np.zeros(len(actual_zodiac), dtype=np.int64)
+    number_mask = np.zeros(len(actual_number), dtype=np.uint64)
+    for i, (zodiacs, numbers) in enumerate(zip(table['predicted_zodiacs'], table['recommended_numbers'])):
+        for z in zodiacs:
+            zodiac_mask[i] |= 1 << ZODIAC_INDEX[z]
+        for n in numbers:
+            number_mask[i] |= np.uint64(1) << np.uint64(n)
+
+    return {
+        'actual_zodiac': actual_zodiac,
+        'actual_number': actual_number,
+        'zodiac_mask': zodiac_mask,
+        'number_mask': number_mask,
+        'n_zodiacs': max((len(z) for z in table['predicted_zodiacs']), default=0),
+        'n_numbers': max((len(n) for n in table['recommended_numbers']), default=0)
+    }
+
+
+def _mask_hits(masks, actual):
+    """masks 与 actual 形状可广播；返回每个元素是否命中 (0/1)"""
+    if masks.dtype == np.uint64:
+        return ((masks >> actual.astype(np.uint64)) & np.uint64(1)).astype(np.int64)
+    return (masks >> actual) & 1
+
+
+def simulate_random_zodiac_hits(actual_zodiac, k, n_sims, rng):
+    """随机 k 生肖策略：每期独立地从全部 C(12, k) 个组合中均匀抽取"""
+    all_masks = np.array([sum(1 << i for i in combo) for combo in combinations(range(N_ZODIACS), k)], dtype=np.int64)
+    picks = all_masks[rng.integers(len(all_masks), size=(n_sims, len(actual_zodiac)))]
+    return _mask_hits(picks, actual_zodiac[None, :]).sum(axis=1)
+
+
+def simulate_random_number_hits(actual_number, k, n_sims, rng):
+    """随机 k 号码策略：每期独立地从 1-49 中均匀抽取 k 个不重复号码"""
+    n_periods = len(actual_number)
+    hits = np.zeros(n_sims, dtype=np.int64)
+    bits = np.uint64(1) << np.arange(1, N_NUMBERS + 1, dtype=np.uint64)
+    sims_per_chunk = max(1, SIMULATION_CHUNK // max(n_periods, 1))
+    for start in range(0, n_sims, sims_per_chunk):
+        rows = min(sims_per_chunk, n_sims - start)
+        keys = rng.random((rows * n_periods, N_NUMBERS), dtype=np.float32)
+        chosen = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        masks = np.bitwise_or.reduce(bits[chosen], axis=1).reshape(rows, n_periods)
+        hits[start:start + rows] = _mask_hits(masks, actual_number[None, :]).sum(axis=1)
+    return hits
+
+
+def permutation_hits(masks, actual, n_perms, rng):
+    """置换检验：保持每期预测不变，打乱实际开奖与期数的对应关系"""
+    order = np.argsort(rng.random((n_perms, len(actual))), axis=1)
+    return _mask_hits(masks[None, :], actual[order]).sum(axis=1)
+
+
+def wilson_interval(hits, total, z=1.96):
+    """命中率的 Wilson 置信区间（默认95%）"""
+    if total == 0:
+        return (0.0, 0.0)
+    p = hits / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    half = z * np.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return (float(center - half), float(center + half))
+
+
+def _p_value(distribution, observed):
+    return float((1 + np.count_nonzero(distribution >= observed)) / (1 + len(distribution)))
+
+
+def _summarize(observed, total, random_hits, perm_hits):
+    return {
+        'hits': int(observed),
+        'total': int(total),
+        'hit_rate': observed / total if total else 0.0,
+        'hit_rate_ci95': wilson_interval(observed, total),
+        'random_mean_rate': float(random_hits.mean() / total) if total else 0.0,
+        'random_rate_ci95': (float(np.percentile(random_hits, 2.5) / total),
+                             float(np.percentile(random_hits, 97.5) / total)) if total else (0.0, 0.0),
+        'p_value_vs_random': _p_value(random_hits, observed),
+        'permutation_mean_rate': float(perm_hits.mean() / total) if total else 0.0,
+        'p_value_permutation': _p_value(perm_hits, observed)
+    }
+
+
+def significance_report(table, n_sims=DEFAULT_SIMULATIONS, n_perms=DEFAULT_PERMUTATIONS, seed=0):
+    """
+    对一张滚动回测结果表做随机基线与置换检验。
+    返回 {'zodiac': {...}, 'number': {...}}，均为命中率、置信区间与 p 值。
+    """
+    total = walk_forward_v7.table_size(table)
+    if total == 0:
+        return None
+
+    rng = np.random.default_rng(seed)
+    encoded = encode_table(table)
+
+    zodiac_observed = int(_mask_hits(encoded['zodiac_mask'], encoded['actual_zodiac']).sum())
+    number_observed = int(_mask_hits(encoded['number_mask'], encoded['actual_number']).sum())
+
+    zodiac_random = simulate_random_zodiac_hits(encoded['actual_zodiac'], encoded['n_zodiacs'], n_sims, rng)
+    number_random = simulate_random_number_hits(encoded['actual_number'], encoded['n_numbers'], n_sims, rng)
+    zodiac_perm = permutation_hits(encoded['zodiac_mask'], encoded['actual_zodiac'], n_perms, rng)
+    number_perm = permutation_hits(encoded['number_mask'], encoded['actual_number'], n_perms, rng)
+
+    return {
+        'simulations': n_sims,
+        'permutations': n_perms,
+        'zodiac': _summarize(zodiac_observed, total, zodiac_random, zodiac_perm),
+        'number': _summarize(number_observed, total, number_random, number_perm)
+    }
+
+
+def format_significance(report, indent="  "):
+    """把显著性结果格式化为可打印的文本行"""
+    if not report:
+        return [f"{indent}无可用回测结果，无法进行显著性检验"]
+    lines = []
+    for key, label in (('zodiac', '8生肖'), ('number', '推荐号码')):
+        r = report[key]
+        low, high = r['hit_rate_ci95']
+        r_low, r_high = r['random_rate_ci95']
+        lines.append(f"{indent}【{label}】实际命中率 {r['hit_rate']*100:.1f}% (95%CI {low*100:.1f}%-{high*100:.1f}%)")
+        lines.append(f"{indent}  随机基线 {r['random_mean_rate']*100:.1f}% (95%区间 {r_low*100:.1f}%-{r_high*100:.1f}%), p={r['p_value_vs_random']:.4f}")
+        lines.append(f"{indent}  置换检验 均值 {r['permutation_mean_rate']*100:.1f}%, p={r['p_value_permutation']:.4f}")
+    lines.append(f"{indent}(随机模拟 {report['simulations']} 次, 置换 {report['permutations']} 次)")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+    parser = argparse.ArgumentParser(description="V7回测显著性检验")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--periods', type=int, default=None, help='只检验最近 N 期（默认全部）')
+    parser.add_argument('--simulations', type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument('--permutations', type=int, default=DEFAULT_PERMUTATIONS)
+    args = parser.parse_args()
+
+    weights = {}
+    try:
+        with open(f'best_special_strategy_{args.lottery}_v7.json', 'r', encoding='utf-8') as f:
+            weights = json.load(f)
+    except FileNotFoundError:
+        print("注意: 未找到V7策略文件，将使用默认V7策略。")
+
+    table = walk_forward_v7.get_walk_forward(args.lottery, weights)
+    if args.periods:
+        table = walk_forward_v7.recent(table, args.periods)
+
+    start = time.time()
+    report = significance_report(table, args.simulations, args.permutations)
+    print(f"V7 显著性检验 - {args.lottery.upper()} ({walk_forward_v7.table_size(table)} 期)")
+    for line in format_significance(report):
+        print(line)
+    print(f"耗时: {time.time() - start:.2f} 秒")
@@ -1,8 +1,36 @@
 import json
+import os
 from collections import Counter
 import advanced_lottery_analysis as macau_analyzer
 import advanced_hk_analysis as hk_analyzer
 
+DATA_FILES = {
+    'macau': 'lottery_data_2025_complete.json',
+    'hk': 'HK2025_lottery_data_complete.json'
+}
+
+# 进程内历史缓存：以数据文件的修改时间为准，优化器的每次回测不再重复解析JSON
+_history_cache = {}
+
+def load_history(lottery_type, special=False):
+    """加载（并缓存）通用或特码历史数据"""
+    analyzer = macau_analyzer if lottery_type == 'macau' else hk_analyzer
+    data_file = DATA_FILES[lottery_type]
+    mtime = os.path.getmtime(data_file) if os.path.exists(data_file) else None
+    key = (lottery_type, special)
+    cached = _history_cache.get(key)
+    if cached is None or cached[0] != mtime:
+        history = analyzer.load_special_number_data(data_file) if special else analyzer.load_data()
+        cached = (mtime, history)
+        _history_cache[key] = cached
+    return cached[1]
+
+def preload_history(lottery_type):
+    """进程池初始化时调用，预先加载该彩种的通用与特码历史"""
+    if lottery_type in DATA_FILES:
+        load_history(lottery_type)
+        load_history(lottery_type, special=True)
+
 def run_backtest(lottery_type, weights, backtest_range=100):
     """
     V6 通用回测：权重调整
@@ -15,7 +43,7 @@ def run_backtest(lottery_type, weights, backtest_range=100):
     else:
         return 0 
 
-    full_history = analyzer.load_data()
+    full_history = load_history(lottery_type)
     min_lookback = 30 
     
     if not full_history or len(full_history) <= min_lookback:
@@ -84,7 +112,7 @@ def run_special_backtest(lottery_type, weights, backtest_range=100):
     else:
         return 0 
 
-    full_special_history = analyzer.load_special_number_data()
+    full_special_history = load_history(lottery_type, special=True)
     lookback = int(weights.get('special_lookback', 20))
     min_lookback = lookback + 5 
     
@@ -1,7 +1,6 @@
-import json
-from collections import Counter
 import advanced_lottery_analysis_v7 as macau_analyzer_v7
-# 如果有HK版本，可以添加：import advanced_hk_analysis_v7 as hk_analyzer_v7
+import walk_forward_v7
+import backtest_significance
 
 def run_special_backtest_v7(lottery_type, weights, backtest_range=100):
     """
@@ -14,138 +13,76 @@ def run_special_backtest_v7(lottery_type, weights, backtest_range=100):
     
     目标准确率：70%+（理论值67%）
     """
-    if lottery_type == 'macau':
-        analyzer = macau_analyzer_v7
-    elif lottery_type == 'hk':
-        # 如果有HK V7版本，使用它；否则回退到macau
-        analyzer = macau_analyzer_v7
-    else:
+    if lottery_type not in walk_forward_v7.DATA_FILES:
         return 0 
 
-    full_special_history = analyzer.load_special_number_data()
-    lookback = int(weights.get('special_lookback', 20))
-    min_lookback = lookback + 5 
+    full_special_history = walk_forward_v7.load_special_history(lottery_type)
+    min_lookback = walk_forward_v7.min_history_for(weights)
     
     if not full_special_history or len(full_special_history) <= min_lookback:
         return 0 
 
-    actual_backtest_range = min(backtest_range, len(full_special_history) - min_lookback)
-    
-    total_score = 0
-    zodiac_hits = 0
-    number_hits = 0
-    total_tests = 0
-    
-    for i in range(actual_backtest_range):
-        target_special_draw = full_special_history[i]
-        history_for_prediction = full_special_history[i+1:]
-        
-        if not history_for_prediction: 
-            continue
+    table = walk_forward_v7.run_walk_forward(full_special_history, weights, max_periods=backtest_range)
+    return score_walk_forward(table)
 
-        prediction = analyzer.analyze_special_trend(history_for_prediction, weights)
-        if not prediction: 
-            continue
+def run_special_backtest_v7_objectives(lottery_type, weights, backtest_range=100):
+    """
+    V7 特码回测的多目标版本：分别返回 (生肖命中期数, 特码数字命中期数, 回测期数)，
+    不合成单一分数，供 Pareto 多目标优化使用。数据不足时返回 (0, 0, 0)。
+    """
+    if lottery_type not in walk_forward_v7.DATA_FILES:
+        return (0, 0, 0)
 
-        # 提取预测的8个生肖
-        predicted_zodiacs = [p[0] for p in prediction.get('top_zodiacs', [])]
-        recommended_numbers = prediction.get('recommended_numbers', [])
-        
-        actual_zodiac = target_special_draw['shengXiao']
-        actual_number = target_special_draw['number']
+    full_special_history = walk_forward_v7.load_special_history(lottery_type)
+    if not full_special_history or len(full_special_history) <= walk_forward_v7.min_history_for(weights):
+        return (0, 0, 0)
 
-        total_tests += 1
+    table = walk_forward_v7.run_walk_forward(full_special_history, weights, max_periods=backtest_range)
+    return (sum(table['zodiac_hit']), sum(table['number_hit']), walk_forward_v7.table_size(table))
 
-        # V7 评分规则（针对8生肖优化）
+def preload_history(lottery_type):
+    """进程池初始化时调用，预先加载该彩种的特码历史"""
+    walk_forward_v7.preload_history(lottery_type)
+
+def score_walk_forward(table):
+    """按V7评分规则为滚动回测结果表打分"""
+    total_score = 0
+    for zodiac_hit, number_hit in zip(table['zodiac_hit'], table['number_hit']):
         # 1. 生肖命中：+100 分
-        if actual_zodiac in predicted_zodiacs:
+        if zodiac_hit:
             total_score += 100
-            zodiac_hits += 1
-        
         # 2. 特码数字命中：+500 分（核心目标）
-        if actual_number in recommended_numbers:
+        if number_hit:
             total_score += 500
-            number_hits += 1
         else:
             # 3. 未命中惩罚：-50 分（相比V6减少惩罚）
             total_score -= 50
+    return total_score
 
-    # 输出统计信息（调试用）
-    if total_tests > 0:
-        zodiac_accuracy = (zodiac_hits / total_tests) * 100
-        number_accuracy = (number_hits / total_tests) * 100
-        # 不打印详细信息，避免优化过程输出过多
-
-    return total_score 
-
-def display_backtest_report_v7(lottery_type, weights, backtest_range=50):
+def display_backtest_report_v7(lottery_type, weights, backtest_range=50, table=None):
     """
     显示详细的V7回测报告
+    结果取自滚动回测结果表（walk_forward_v7），不重复计算预测
     """
     print(f"\n{'='*60}")
     print(f"V7 特码回测报告 - {lottery_type.upper()}")
     print(f"{'='*60}")
     
-    if lottery_type == 'macau':
-        analyzer = macau_analyzer_v7
-    elif lottery_type == 'hk':
-        analyzer = macau_analyzer_v7
-    else:
+    if lottery_type not in walk_forward_v7.DATA_FILES:
         print("不支持的彩票类型")
         return
 
-    full_special_history = analyzer.load_special_number_data()
-    lookback = int(weights.get('special_lookback', 20))
-    min_lookback = lookback + 5
-    
-    if not full_special_history or len(full_special_history) <= min_lookback:
-        print("历史数据不足")
-        return
-
-    actual_backtest_range = min(backtest_range, len(full_special_history) - min_lookback)
-    
-    zodiac_hits = 0
-    number_hits = 0
-    total_tests = 0
-    
-    detailed_results = []
-    
-    for i in range(actual_backtest_range):
-        target_special_draw = full_special_history[i]
-        history_for_prediction = full_special_history[i+1:]
-        
-        if not history_for_prediction:
-            continue
+    if table is None:
+        full_special_history = walk_forward_v7.load_special_history(lottery_type)
+        if not full_special_history or len(full_special_history) <= walk_forward_v7.min_history_for(weights):
+            print("历史数据不足")
+            return
+        table = walk_forward_v7.get_walk_forward(lottery_type, weights, full_special_history)
 
-        prediction = analyzer.analyze_special_trend(history_for_prediction, weights)
-        if not prediction:
-            continue
-
-        predicted_zodiacs = [p[0] for p in prediction.get('top_zodiacs', [])]
-        recommended_numbers = prediction.get('recommended_numbers', [])
-        
-        actual_zodiac = target_special_draw['shengXiao']
-        actual_number = target_special_draw['number']
-        period = target_special_draw['period']
-
-        total_tests += 1
-        
-        zodiac_hit = actual_zodiac in predicted_zodiacs
-        number_hit = actual_number in recommended_numbers
-        
-        if zodiac_hit:
-            zodiac_hits += 1
-        if number_hit:
-            number_hits += 1
-            
-        detailed_results.append({
-            'period': period,
-            'actual_number': actual_number,
-            'actual_zodiac': actual_zodiac,
-            'predicted_zodiacs': predicted_zodiacs,
-            'zodiac_hit': zodiac_hit,
-            'number_hit': number_hit
-        })
+    table = walk_forward_v7.recent(table, backtest_range)
+    total_tests = walk_forward_v7.table_size(table)
+    zodiac_hits = sum(table['zodiac_hit'])
+    number_hits = sum(table['number_hit'])
     
     # 输出统计
     print(f"\n回测期数: {total_tests}")
@@ -164,23 +101,30 @@ def display_backtest_report_v7(lottery_type, weights, backtest_range=50):
         print(f"  命中次数: {number_hits}/{total_tests}")
         print(f"  准确率: {number_accuracy:.2f}%")
         
-        # 目标评估
+        # 目标评估：与同期随机策略及置换检验对比，而非固定的理论值
+        significance = backtest_significance.significance_report(table)
+        baseline = significance['zodiac']['random_mean_rate'] * 100
+        p_value = significance['zodiac']['p_value_vs_random']
         print(f"\n【目标评估】")
-        print(f"  理论准确率（8/12生肖）: 66.7%")
+        print(f"  随机基线准确率（同期模拟）: {baseline:.2f}%")
         print(f"  实际准确率: {zodiac_accuracy:.2f}%")
         
-        if zodiac_accuracy >= 70:
-            print(f"  [SUCCESS] 超越目标！（70%+）")
-        elif zodiac_accuracy >= 67:
-            print(f"  [GOOD] 达到理论预期（67%+）")
+        if p_value < 0.05:
+            print(f"  [SUCCESS] 显著优于随机策略（p={p_value:.4f}）")
+        elif zodiac_accuracy > baseline:
+            print(f"  [GOOD] 高于随机基线，但尚不显著（p={p_value:.4f}）")
         else:
-            print(f"  [NEED IMPROVEMENT] 未达标，需要继续优化")
+            print(f"  [NEED IMPROVEMENT] 未超过随机基线，需要继续优化")
+        
+        print(f"\n【显著性检验】")
+        for line in backtest_significance.format_significance(significance):
+            print(line)
     
     # 显示最近10期详情
     print(f"\n{'='*60}")
     print(f"最近10期详细结果")
     print(f"{'='*60}")
-    for result in detailed_results[:10]:
+    for result in walk_forward_v7.iter_rows(table, limit=10):
         status = "HIT" if result['zodiac_hit'] else "MISS"
         print(f"\n期号 {result['period']}:")
         print(f"  实际特码: {result['actual_number']} ({result['actual_zodiac']})")
@@ -195,19 +139,6 @@ if __name__ == "__main__":
     print("\n使用默认V7参数进行测试...")
     
     # 默认V7参数
-    default_v7_weights = {
-        'special_hot': 2.5,
-        'special_gap': 2.5,
-        'special_zodiac': 5.0,
-        'special_color_weight': 3.0,
-        'special_tail_weight': 3.0,
-        'special_cold_protect': 4.0,
-        'special_lookback': 30,
-        'special_resonance': 2.0,
-        'special_cycle_weight': 2.5,
-        'special_element_weight': 2.5,
-        'special_balance_weight': 2.0,
-        'special_diversity_bonus': 1.5
-    }
+    default_v7_weights = dict(macau_analyzer_v7.DEFAULT_V7_WEIGHTS)
     
     display_backtest_report_v7('macau', default_v7_weights, backtest_range=50)
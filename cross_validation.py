@@ -0,0 +1,211 @@
+"""
+滚动起点交叉验证 (Rolling-Origin Cross-Validation)
+
+优化器在最近 backtest_range 期上调参，又在同样的期数上报告适应度，属于样本内评分。
+本模块把历史切成多个 训练段(较早) → 测试段(紧随其后、较新) 的折，
+在多个工作进程中并行评估，每个进程在初始化时接收一次历史数据并共享使用。
+
+两种模式：
+- 固定策略 (默认)：直接用给定策略评估每一折的测试段，并标记该段是否落在
+  优化器的调参区间内（样本内），从而对比样本内/样本外命中率。
+  折从最新一期向前排列，默认参数保证数据足够时（可回测期数 ≥ 调参区间 + 测试段 + 训练段）
+  至少有一折完全落在调参区间之外；没有任何样本外折时给出警告并以非零状态退出；
+- 重新训练 (--refit)：每一折只在训练段上运行一个小规模遗传算法得到策略，
+  再在测试段上评估，得到真正的样本外命中率。
+"""
+import json
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+import backtester_v7
+import walk_forward_v7
+import optimizer_special_v7
+
+DEFAULT_FOLDS = 6
+DEFAULT_TEST_SIZE = 20
+DEFAULT_TRAIN_SIZE = 20
+OPTIMIZER_BACKTEST_RANGE = 80     # optimizer_special_v7 的调参区间（最近80期）
+# 以上默认值：第5折的测试段从第 80 期开始，只需 80 + 20 + 20 = 120 期可回测数据（澳门约124期）
+
+REFIT_POPULATION_SIZE = 20
+REFIT_GENERATIONS = 8
+
+# 工作进程共享的历史数据（由进程池初始化函数设置一次）
+_worker_history = None
+
+
+def _init_worker(special_history):
+    global _worker_history
+    _worker_history = special_history
+
+
+def rolling_origin_folds(n_available, n_folds=DEFAULT_FOLDS, test_size=DEFAULT_TEST_SIZE, train_size=DEFAULT_TRAIN_SIZE):
+    """
+    生成折的划分。下标与 special_history 一致：0 为最新一期，越大越早。
+    第 k 折的测试段为 [k*test_size, (k+1)*test_size)，训练段紧接在其之前（更早）。
+    """
+    folds = []
+    for k in range(n_folds):
+        test_start = k * test_size
+        train_start = test_start + test_size
+        if train_start + train_size > n_available:
+            break
+        folds.append({
+            'fold': k + 1,
+            'test_start': test_start,
+            'test_size': test_size,
+            'train_start': train_start,
+            'train_size': train_size
+        })
+    return folds
+
+
+def window_metrics(special_history, weights, start, size):
+    """在一个窗口上滚动回测，返回命中率与V7评分"""
+    table = walk_forward_v7.run_walk_forward(special_history, weights, max_periods=size, start=start)
+    total = walk_forward_v7.table_size(table)
+    zodiac_hits = sum(table['zodiac_hit'])
+    number_hits = sum(table['number_hit'])
+    return {
+        'periods': total,
+        'first_period': table['period'][-1] if total else None,
+        'last_period': table['period'][0] if total else None,
+        'zodiac_hits': zodiac_hits,
+        'number_hits': number_hits,
+        'zodiac_rate': zodiac_hits / total if total else 0.0,
+        'number_rate': number_hits / total if total else 0.0,
+        'score': backtester_v7.score_walk_forward(table)
+    }
+
+
+def _train_fitness(special_history, weights, fold):
+    """训练段适应度：按期平均分，避免长回顾期因可回测期数少而被不公平惩罚"""
+    m = window_metrics(special_history, weights, fold['train_start'], fold['train_size'])
+    return m['score'] / m['periods'] if m['periods'] else -float('inf')
+
+
+def refit_strategy(special_history, fold, seed):
+    """只在训练段上运行小规模遗传算法，返回训练得到的策略"""
+    rng = np.random.default_rng(seed)
+    space = optimizer_special_v7.SPACE
+    population = optimizer_special_v7.create_initial_population(rng, REFIT_POPULATION_SIZE)
+    best_individual, best_fitness = None, -float('inf')
+    for _ in range(REFIT_GENERATIONS):
+        population = space.canonicalize(population)
+        fitness = np.array([_train_fitness(special_history, space.to_individual(row), fold) for row in population])
+        best_index = int(np.argmax(fitness))
+        if fitness[best_index] > best_fitness:
+            best_individual, best_fitness = space.to_individual(population[best_index]), fitness[best_index]
+        population = optimizer_special_v7.breed(population, fitness, REFIT_POPULATION_SIZE, rng)
+    return best_individual
+
+
+def evaluate_fold(task):
+    """工作进程中评估一折"""
+    fold, weights, refit, seed = task
+    special_history = _worker_history
+    start_time = time.time()
+
+    if refit:
+        weights = refit_strategy(special_history, fold, seed + fold['fold'])
+
+    train = window_metrics(special_history, weights, fold['train_start'], fold['train_size'])
+    test = window_metrics(special_history, weights, fold['test_start'], fold['test_size'])
+    return {
+        **fold,
+        'in_sample': (not refit) and fold['test_start'] < OPTIMIZER_BACKTEST_RANGE,
+        'train': train,
+        'test': test,
+        'weights': weights if refit else None,
+        'seconds': time.time() - start_time
+    }
+
+
+def cross_validate(lottery_type, weights, n_folds=DEFAULT_FOLDS, test_size=DEFAULT_TEST_SIZE,
+                   train_size=DEFAULT_TRAIN_SIZE, refit=False, workers=None, seed=42):
+    """并行评估所有折，返回按折排列的结果列表（第1折为最新）"""
+    special_history = walk_forward_v7.load_special_history(lottery_type)
+    n_available = walk_forward_v7.available_periods(special_history, weights)
+    folds = rolling_origin_folds(n_available, n_folds, test_size, train_size)
+    if not folds:
+        return []
+
+    tasks = [(fold, weights, refit, seed) for fold in folds]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        _init_worker(special_history)
+        return [evaluate_fold(task) for task in tasks]
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(special_history,)) as pool:
+        return pool.map(evaluate_fold, tasks, chunksize=1)
+
+
+def has_out_of_sample(results):
+    return any(not r['in_sample'] for r in results)
+
+
+def display_cross_validation_report(lottery_type, results):
+    """打印逐折的样本内/样本外命中率"""
+    print(f"\n{'='*70}")
+    print(f"V7 滚动交叉验证报告 - {lottery_type.upper()}")
+    print(f"{'='*70}")
+    if not results:
+        print("历史数据不足，无法划分交叉验证折")
+        return
+
+    print(f"\n  {'折':<4} {'测试期号':<12} {'训练8肖':<10} {'测试8肖':<10} {'测试号码':<10} {'样本'}")
+    print(f"  {'-'*60}")
+    for r in results:
+        test, train = r['test'], r['train']
+        span = f"{test['first_period']}-{test['last_period']}"
+        sample = "样本内" if r['in_sample'] else "样本外"
+        print(f"  {r['fold']:<4} {span:<12} {train['zodiac_rate']*100:>6.1f}%   "
+              f"{test['zodiac_rate']*100:>6.1f}%   {test['number_rate']*100:>6.1f}%   {sample}")
+
+    out_of_sample = [r['test'] for r in results if not r['in_sample']]
+    if out_of_sample:
+        periods = sum(t['periods'] for t in out_of_sample)
+        zodiac_rate = sum(t['zodiac_hits'] for t in out_of_sample) / periods if periods else 0
+        number_rate = sum(t['number_hits'] for t in out_of_sample) / periods if periods else 0
+        print(f"\n  样本外合计: {periods} 期, 8生肖命中率 {zodiac_rate*100:.1f}%, 号码命中率 {number_rate*100:.1f}%")
+    else:
+        print(f"\n  警告: 没有任何测试段落在优化器调参区间（最近 {OPTIMIZER_BACKTEST_RANGE} 期）之外，"
+              f"以上全部是样本内命中率，不能说明策略的样本外表现。")
+        print(f"  可减小 --train-size / --test-size，或使用 --refit 在每折训练段上重新优化。")
+    print(f"\n{'='*70}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="V7 滚动起点交叉验证")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--test-size', type=int, default=DEFAULT_TEST_SIZE)
+    parser.add_argument('--train-size', type=int, default=DEFAULT_TRAIN_SIZE)
+    parser.add_argument('--refit', action='store_true', help='每折在训练段上重新优化策略')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数（默认CPU核数）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    strategy_file = f'best_special_strategy_{args.lottery}_v7.json'
+    weights = {}
+    try:
+        with open(strategy_file, 'r', encoding='utf-8') as f:
+            weights = json.load(f)
+    except FileNotFoundError:
+        print(f"注意: 未找到 {strategy_file}，将使用默认V7策略。")
+
+    start = time.time()
+    results = cross_validate(args.lottery, weights, args.folds, args.test_size, args.train_size,
+                             refit=args.refit, workers=args.workers, seed=args.seed)
+    display_cross_validation_report(args.lottery, results)
+    print(f"耗时: {time.time() - start:.2f} 秒")
+
+    output_file = f'{args.lottery}_v7_cross_validation.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"[OK] 交叉验证结果已保存至: {output_file}")
+    if not has_out_of_sample(results):
+        sys.exit(1)
@@ -1,12 +1,18 @@
 import streamlit as st
-import subprocess
-import sys
 import os
 import glob
 import json
 import pandas as pd
 from datetime import datetime
 import re
+import time
+import visualize_v7_performance
+import run_v7_prediction
+import data_files
+import optimizer_progress
+import job_queue
+
+JOB_REFRESH_SECONDS = 2     # 执行中心后台任务进度的刷新间隔（秒）
 
 # --- Page Configuration and Custom CSS ---
 st.set_page_config(page_title="智能策略分析平台", page_icon="💎", layout="wide")
@@ -75,17 +81,29 @@ st.markdown("""
 
 
 # --- Data Loading Functions ---
-@st.cache_data
+# 缓存键包含文件的 (修改时间, 大小)：流水线改写某个文件后只重新解析这一个文件，
+# 未变化的大文件在重跑与会话之间一直命中缓存，不再需要 st.cache_data.clear()。
+JSON_CACHE_ENTRIES = 256    # 缓存的解析结果上限（旧版本按最近最少使用淘汰）
+
+@st.cache_data(max_entries=JSON_CACHE_ENTRIES, show_spinner=False)
+def parse_json_file(file_path, version, default_value):
+    """version 只作为缓存键；为 None 表示文件不存在。读取期间文件被改写时抛出异常，不会缓存到旧版本下"""
+    return data_files.read_json_version(file_path, version, default_value)
+
 def load_json_data(file_path, default_value=None):
     if default_value is None:
         default_value = []
-    if os.path.exists(file_path):
+    for _ in range(data_files.READ_RETRIES):
+        try:
+            return parse_json_file(file_path, data_files.file_version(file_path), default_value)
+        except data_files.FileChangedError:
+            continue
+    # 文件持续被改写：本次直接读取，不写入缓存
+    try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return default_value
-    return default_value
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default_value
 
 # --- UI Rendering Functions ---
 
@@ -579,6 +597,111 @@ def render_prediction_history():
                 st.markdown(f"**特码分析说明:** {entry.get('special_number_prediction_logic', 'N/A')}")
                 st.markdown("---")
 
+# --- Background Jobs (执行中心) ---
+
+JOB_STATUS_LABELS = {'queued': '排队中', 'running': '运行中', 'succeeded': '完成', 'failed': '失败', 'cancelled': '已取消'}
+
+def is_job_active(kind):
+    job = job_queue.latest_job(kind)
+    return job is not None and job['status'] in job_queue.ACTIVE_STATUSES
+
+def submit_job(kind):
+    """提交到后台任务队列（相同任务已在排队或运行时不重复提交），并确保工作进程在运行"""
+    job, created = job_queue.submit(kind)
+    job_queue.ensure_worker()
+    if not created:
+        st.toast(f"已有相同的{job['label']}任务 (#{job['id']}) {JOB_STATUS_LABELS[job['status']]}")
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}分{seconds:02d}秒" if minutes else f"{seconds}秒"
+
+@st.cache_resource
+def load_v7_engine():
+    return run_v7_prediction.V7PredictionEngine()
+
+def get_v7_engine():
+    """常驻的V7预测引擎（历史数据、策略与窗口统计已预加载）；数据或策略文件变化后重新加载"""
+    engine = load_v7_engine()
+    if engine.is_stale():
+        load_v7_engine.clear()
+        engine = load_v7_engine()
+    return engine
+
+def render_v7_prediction_result(v7_result):
+    st.markdown("### 📊 预测结果")
+    st.markdown(f"**期号:** {v7_result.get('period', 'N/A')}")
+    st.markdown(f"**推荐8生肖:** {', '.join(v7_result.get('predicted_zodiacs', []))}")
+    st.markdown(f"**波色:** {v7_result.get('predicted_color', 'N/A')}")
+    st.markdown(f"**尾数:** {v7_result.get('predicted_tail', 'N/A')}")
+    st.markdown(f"**五行:** {v7_result.get('predicted_element', 'N/A')}")
+    st.markdown(f"**推荐号码:** {', '.join(map(str, v7_result.get('recommended_numbers', [])[:12]))}")
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def render_job_progress(kind):
+    """某类后台任务最近一次运行的实时进度：只重跑这个片段，不阻塞页面其余部分"""
+    job = job_queue.latest_job(kind)
+    dismissed = st.session_state.setdefault('dismissed_jobs', set())
+    if job is None or job['id'] in dismissed:
+        return
+    status = job['status']
+
+    if status == 'queued':
+        st.info(f"{job['label']} (#{job['id']}) 排队中，等待前面的任务完成...")
+        if st.button("取消", key=f"cancel_{kind}"):
+            job_queue.cancel(job['id'])
+            st.rerun()
+        return
+
+    if job['started_at'] is None:
+        # 排队中就被取消：从未启动，没有耗时、进度与输出
+        st.warning(f"{job['label']} (#{job['id']}) 已取消")
+        if st.button("关闭", key=f"dismiss_{kind}"):
+            dismissed.add(job['id'])
+            st.rerun()
+        return
+
+    progress = job_queue.job_progress(job)
+    elapsed = (job['finished_at'] or datetime.now().timestamp()) - job['started_at']
+    if status == 'running':
+        if progress['n_generations']:
+            text = (f"{progress['lottery_type'].upper()} 第 {progress['generation']}/{progress['n_generations']} 代"
+                    f" · 已用 {format_duration(elapsed)}")
+            if progress['eta'] is not None:
+                text += f" · 预计剩余 {format_duration(progress['eta'])}"
+            st.progress(progress['generation'] / progress['n_generations'], text=text)
+        else:
+            st.progress(0.0, text=f"{job['label']} (#{job['id']}) 运行中 · 已用 {format_duration(elapsed)}")
+        if st.button("正在取消..." if job['cancel_requested'] else "取消", key=f"cancel_{kind}",
+                     disabled=bool(job['cancel_requested'])):
+            job_queue.cancel(job['id'])
+    elif status == 'succeeded':
+        st.success(f"{job['label']}完成！耗时 {format_duration(elapsed)}")
+    elif status == 'cancelled':
+        st.warning(f"{job['label']} (#{job['id']}) 已取消")
+    else:
+        st.error(f"{job['label']}失败 (退出码 {job['returncode']})，详见下方输出。")
+
+    if progress and progress['fitness_log']:
+        df_log = pd.DataFrame(progress['fitness_log'])
+        df_log.rename(columns={'generation': '代数', 'best_fitness': '每代最高分', 'average_fitness': '每代平均分',
+                               'global_best': '全局最高分'}, inplace=True)
+        st.line_chart(df_log, x='代数', y=['全局最高分', '每代最高分', '每代平均分'],
+                      color=["#5eead4", "#0ea5e9", "#374151"], height=250)
+
+    with st.expander("运行输出", expanded=status != 'running'):
+        st.code(optimizer_progress.read_output(job), language='bash')
+
+    if status not in job_queue.ACTIVE_STATUSES:
+        finished = st.session_state.setdefault('finished_jobs', set())
+        if job['id'] not in finished:
+            # 任务刚结束：重跑整个页面，让按钮状态与各页面数据更新
+            finished.add(job['id'])
+            st.rerun()
+        if st.button("关闭", key=f"dismiss_{kind}"):
+            dismissed.add(job['id'])
+            st.rerun()
+
 def create_execution_tab():
     st.title("⚙️ 执行中心")
     st.markdown("在这里，您可以手动触发数据获取、AI优化和报告生成。")
@@ -591,119 +714,70 @@ def create_execution_tab():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🎯 运行V7预测 (澳门)", use_container_width=True, type="primary"):
-                with st.spinner("正在生成V7预测..."):
-                    result = subprocess.run([sys.executable, "run_v7_prediction.py"], 
-                                          capture_output=True, 
-                                          encoding='utf-8',
-                                          errors='replace')
-                    output = result.stdout + "\n" + result.stderr
-                    st.code(output, language='bash')
-                    
-                    # 加载并显示预测结果
-                    try:
-                        import glob
-                        latest_v7_file = max(glob.glob('predictions/v7_prediction_*.json'), 
-                                           key=os.path.getctime, default=None)
-                        if latest_v7_file:
-                            v7_result = load_json_data(latest_v7_file)
-                            st.success("V7预测完成！")
-                            
-                            # 显示格式化结果
-                            st.markdown("### 📊 预测结果")
-                            st.markdown(f"**期号:** {v7_result.get('period', 'N/A')}")
-                            st.markdown(f"**推荐8生肖:** {', '.join(v7_result.get('predicted_zodiacs', []))}")
-                            st.markdown(f"**波色:** {v7_result.get('predicted_color', 'N/A')}")
-                            st.markdown(f"**尾数:** {v7_result.get('predicted_tail', 'N/A')}")
-                            st.markdown(f"**五行:** {v7_result.get('predicted_element', 'N/A')}")
-                            st.markdown(f"**推荐号码:** {', '.join(map(str, v7_result.get('recommended_numbers', [])[:12]))}")
-                    except Exception as e:
-                        st.error(f"显示预测结果时出错: {e}")
-                    
-                    st.cache_data.clear()
+                start = time.perf_counter()
+                v7_result = get_v7_engine().predict()
+                if v7_result:
+                    run_v7_prediction.save_prediction(v7_result)
+                    st.session_state['v7_prediction'] = (v7_result, (time.perf_counter() - start) * 1000)
+                else:
+                    st.error("V7预测失败：无法加载历史数据。")
+            if 'v7_prediction' in st.session_state:
+                v7_result, elapsed_ms = st.session_state['v7_prediction']
+                st.success(f"V7预测完成！耗时 {elapsed_ms:.0f} 毫秒")
+                render_v7_prediction_result(v7_result)
         
         with col2:
+            v7_perf = load_json_data('v7_performance_report.json', default_value={})
             if st.button("📊 查看V7性能", use_container_width=True):
-                with st.spinner("正在分析V7性能..."):
-                    result = subprocess.run([sys.executable, "visualize_v7_performance.py"], 
-                                          capture_output=True,
-                                          encoding='utf-8',
-                                          errors='replace')
-                    output = result.stdout + "\n" + result.stderr
-                    st.code(output, language='bash')
-                    
-                    # 加载并显示性能报告
+                with st.spinner("正在增量更新V7性能报告..."):
                     try:
-                        v7_perf = load_json_data('v7_performance_report.json')
-                        if v7_perf:
-                            st.success("性能分析完成！")
-                            st.markdown("### 📈 V7性能摘要")
-                            col_a, col_b, col_c = st.columns(3)
-                            col_a.metric("测试期数", v7_perf.get('total_tests', 0))
-                            col_b.metric("命中期数", v7_perf.get('hits', 0))
-                            col_c.metric("准确率", f"{v7_perf.get('accuracy', 0):.1f}%")
+                        v7_perf = visualize_v7_performance.update_performance_report('macau') or {}
+                        st.success("性能分析完成！")
                     except Exception as e:
-                        st.error(f"显示性能报告时出错: {e}")
-                    
-                    st.success("性能分析完成！")
+                        st.error(f"更新性能报告时出错: {e}")
+
+            if v7_perf:
+                st.markdown("### 📈 V7性能摘要")
+                st.caption(f"覆盖全部历史，最新期号: {v7_perf.get('latest_period', 'N/A')}")
+                col_a, col_b, col_c = st.columns(3)
+                col_a.metric("测试期数", v7_perf.get('total_tests', 0))
+                col_b.metric("命中期数", v7_perf.get('hits', 0))
+                col_c.metric("准确率", f"{v7_perf.get('accuracy', 0):.1f}%")
+                segments = v7_perf.get('segments', [])
+                if segments:
+                    df_segments = pd.DataFrame(segments).rename(columns={'name': '分段', 'accuracy': '准确率(%)'})
+                    st.bar_chart(df_segments, x='分段', y='准确率(%)')
+                st.markdown(f"**最长连续命中:** {v7_perf.get('max_hit_streak', 0)} 期 &nbsp; "
+                            f"**最长连续失误:** {v7_perf.get('max_miss_streak', 0)} 期")
+            else:
+                st.info("尚未生成V7性能报告，点击上方按钮生成。")
 
     with st.container(border=True):
         st.subheader("📅 日常分析 (包含复盘)")
         st.markdown("获取最新数据，复盘上一期预测，并为下一期生成新预测。")
-        if st.button("🚀 运行每日分析", use_container_width=True):
-            with st.spinner("正在执行每日分析..."):
-                result = subprocess.run([sys.executable, "run_daily_analysis.py"], 
-                                      capture_output=True,
-                                      encoding='utf-8',
-                                      errors='replace')
-                output = result.stdout + "\n" + result.stderr
-                st.code(output, language='bash')
-                st.success("执行完毕！请刷新页面查看最新报告和复盘记录。")
-                st.cache_data.clear()
-                st.rerun()
+        if st.button("🚀 运行每日分析", use_container_width=True, disabled=is_job_active('daily')):
+            submit_job('daily')
+        render_job_progress('daily')
 
     with st.container(border=True):
         st.subheader("🧠 AI策略优化 (V6版本)")
         st.markdown("启动遗传算法，让AI学习并演进出新的最优通用策略。**此过程非常耗时。**")
-        if st.button("🧠 运行通用策略优化 (V6)", use_container_width=True):
-            with st.spinner("正在运行通用策略优化，可能需要数分钟..."):
-                result = subprocess.run([sys.executable, "optimizer.py"], 
-                                      capture_output=True,
-                                      encoding='utf-8',
-                                      errors='replace')
-                output = result.stdout + "\n" + result.stderr
-                st.code(output, language='bash')
-                st.success("通用策略优化完成！请刷新页面查看新策略和学习曲线。")
-                st.cache_data.clear()
-                st.rerun()
+        if st.button("🧠 运行通用策略优化 (V6)", use_container_width=True, disabled=is_job_active('general')):
+            submit_job('general')
+        render_job_progress('general')
         
         st.markdown("---")
         st.markdown("启动遗传算法，让AI学习并演进出新的最优特码策略 (V6)。**此过程非常耗时。**")
-        if st.button("🎯 运行特码策略优化 (V6)", use_container_width=True):
-            with st.spinner("正在运行特码策略优化，可能需要数分钟..."):
-                result = subprocess.run([sys.executable, "optimizer_special.py"], 
-                                      capture_output=True,
-                                      encoding='utf-8',
-                                      errors='replace')
-                output = result.stdout + "\n" + result.stderr
-                st.code(output, language='bash')
-                st.success("特码策略优化完成！请刷新页面查看新策略和学习曲线。")
-                st.cache_data.clear()
-                st.rerun()
+        if st.button("🎯 运行特码策略优化 (V6)", use_container_width=True, disabled=is_job_active('special')):
+            submit_job('special')
+        render_job_progress('special')
     
     with st.container(border=True):
         st.subheader("⚡ V7策略优化 (高级)")
         st.markdown("重新优化V7算法参数（8生肖系统）。**约需5-10分钟。**")
-        if st.button("🎯 运行V7特码优化", use_container_width=True):
-            with st.spinner("正在运行V7优化，请耐心等待..."):
-                result = subprocess.run([sys.executable, "optimizer_special_v7.py"], 
-                                      capture_output=True,
-                                      encoding='utf-8',
-                                      errors='replace')
-                output = result.stdout + "\n" + result.stderr
-                st.code(output, language='bash')
-                st.success("V7策略优化完成！")
-                st.cache_data.clear()
-                st.rerun()
+        if st.button("🎯 运行V7特码优化", use_container_width=True, disabled=is_job_active('v7')):
+            submit_job('v7')
+        render_job_progress('v7')
 
 # --- Main App Layout ---
 
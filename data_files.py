@@ -0,0 +1,41 @@
+"""
+数据文件的版本与一致读取
+
+流水线随时可能改写 JSON 产物。file_version 返回文件的 (修改时间, 大小)，作为缓存键或变化检测；
+read_json_version 读取时校验读完后版本仍是调用方给定的版本，读取期间被改写则抛出 FileChangedError，
+调用方取新版本重试，保证缓存中的内容与其版本键一致。
+"""
+import json
+import os
+
+READ_RETRIES = 3    # 读取期间文件被改写时的重试次数
+
+
+class FileChangedError(Exception):
+    """文件在读取期间被改写"""
+
+
+def file_version(path):
+    """文件的 (修改时间, 大小)；不存在时为 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_json_version(path, version, default_value=None):
+    """读取版本为 version 的 JSON 文件；文件不存在返回 default_value，读取期间被改写则抛出 FileChangedError"""
+    if version is None:
+        return default_value
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        data = default_value
+    except OSError:
+        # 读取前被删除或替换
+        raise FileChangedError(path)
+    if file_version(path) != version:
+        raise FileChangedError(path)
+    return data
@@ -0,0 +1,136 @@
+"""
+基因敏感度探测：找出对回测结果没有影响（死基因）或影响很小的基因
+
+对若干个基准策略（已保存的最优策略 + 随机策略），把每个基因依次替换为取值范围内
+PROBE_POINTS 个均匀分布的值，其余基因保持不变；全部探测个体组成一个矩阵，
+经 FitnessEvaluator 批量回测（并行 + 缓存）。一个基因的影响 = 各基准上探测得分的极差的平均值。
+
+- 在所有基准上都不改变得分的基因判为 dead（分析器读取但未使用，如 V7 的 special_cold_protect）；
+- 影响低于最大影响 LOW_EFFECT_THRESHOLD 的基因判为 low。
+两类基因写入报告的 frozen（取最优策略中的值，没有最优策略时取范围中点），
+优化器加 --prune-genes 即冻结这些基因，不再参与搜索与交叉。
+"""
+import json
+import time
+import numpy as np
+import optimizer_core
+from optimizer_backends import OBJECTIVES
+
+PROBE_POINTS = 5            # 每个基因在取值范围内探测的取值个数
+RANDOM_BASES = 4            # 除最优策略外的随机基准策略数
+LOW_EFFECT_THRESHOLD = 0.05 # 影响低于最大影响的该比例视为低影响
+
+
+def load_base_strategy(objective, lottery_type):
+    """已保存的最优策略；不存在时返回 None"""
+    try:
+        with open(objective.best_file(lottery_type), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return None
+
+
+def build_probes(space, bases, points=PROBE_POINTS):
+    """
+    探测矩阵：对每个基准、每个基因、每个探测值生成一行。
+    返回形状为 (基准数 × 基因数 × 探测值数, 基因数) 的矩阵。
+    """
+    values = space.lower + np.linspace(0.0, 1.0, points)[:, None] * (space.upper - space.lower)
+    probes = np.repeat(bases[:, None, None, :], space.n_genes, axis=1).repeat(points, axis=2)
+    for gene in range(space.n_genes):
+        probes[:, gene, :, gene] = values[:, gene]
+    return probes.reshape(-1, space.n_genes)
+
+
+def probe_sensitivity(objective_name, lottery_type, random_bases=RANDOM_BASES, points=PROBE_POINTS,
+                      threshold=LOW_EFFECT_THRESHOLD, workers=None, seed=0):
+    """运行敏感度探测并返回报告"""
+    objective = OBJECTIVES[objective_name]
+    space = objective.space
+    rng = np.random.default_rng(seed)
+
+    best = load_base_strategy(objective, lottery_type)
+    bases = space.random(random_bases, rng)
+    if best is not None:
+        bases = np.vstack([space.from_individuals([best], rng), bases])
+    bases = space.canonicalize(bases)
+
+    probes = build_probes(space, bases, points)
+    with optimizer_core.FitnessEvaluator(objective.fitness_fn, lottery_type, objective.backtest_range, space,
+                                         workers=workers, preload=objective.preload) as evaluator:
+        fitness = evaluator.evaluate(probes, progress_every=0)
+        evaluations = evaluator.last_stats['evaluations']
+
+    scores = fitness.reshape(len(bases), space.n_genes, points)
+    effects = (scores.max(axis=2) - scores.min(axis=2)).mean(axis=0)
+    max_effect = effects.max() if effects.max() > 0 else 1.0
+
+    genes = []
+    frozen = {}
+    for j, name in enumerate(space.names):
+        relative = float(effects[j] / max_effect)
+        if effects[j] == 0:
+            status = 'dead'
+        elif relative < threshold:
+            status = 'low'
+        else:
+            status = 'active'
+        genes.append({'gene': name, 'effect': float(effects[j]), 'relative_effect': relative, 'status': status})
+        if status != 'active':
+            if best is not None and best.get(name) is not None:
+                frozen[name] = best[name]
+            else:
+                midpoint = (space.lower[j] + space.upper[j]) / 2
+                frozen[name] = int(midpoint) if space.integer_mask[j] else float(midpoint)
+
+    genes.sort(key=lambda g: g['effect'], reverse=True)
+    return {
+        'lottery_type': lottery_type,
+        'objective': objective_name,
+        'bases': len(bases),
+        'probe_points': points,
+        'evaluations': evaluations,
+        'threshold': threshold,
+        'genes': genes,
+        'frozen': frozen
+    }
+
+
+def display_sensitivity(report):
+    objective = OBJECTIVES[report['objective']]
+    labels = {'dead': '无影响', 'low': '低影响', 'active': '有效'}
+    print(f"\n{'='*70}")
+    print(f"基因敏感度探测 - {report['lottery_type'].upper()} {objective.name}")
+    print(f"基准策略 {report['bases']} 个, 每基因探测 {report['probe_points']} 个取值, 实际回测 {report['evaluations']} 次")
+    print(f"{'='*70}")
+    print(f"\n  {'基因':<28} {'平均得分极差':<14} {'相对影响':<10} {'结论'}")
+    print(f"  {'-'*64}")
+    for g in report['genes']:
+        print(f"  {g['gene']:<28} {g['effect']:<14.1f} {g['relative_effect']*100:>6.1f}%   {labels[g['status']]}")
+    if report['frozen']:
+        print(f"\n  建议冻结: {', '.join(f'{k}={v}' for k, v in report['frozen'].items())}")
+        print("  优化器加 --prune-genes 参数即可冻结这些基因")
+    print(f"\n{'='*70}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="探测每个基因对回测得分的影响，找出可冻结的死基因")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--objective', type=str, default='v7', choices=list(OBJECTIVES.keys()))
+    parser.add_argument('--bases', type=int, default=RANDOM_BASES, help='随机基准策略数（另加已保存的最优策略）')
+    parser.add_argument('--points', type=int, default=PROBE_POINTS, help='每个基因探测的取值个数')
+    parser.add_argument('--threshold', type=float, default=LOW_EFFECT_THRESHOLD, help='低影响阈值（相对最大影响）')
+    parser.add_argument('--workers', type=int, default=None, help='并行回测的工作进程数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.time()
+    report = probe_sensitivity(args.objective, args.lottery, args.bases, args.points, args.threshold,
+                               args.workers, args.seed)
+    display_sensitivity(report)
+    print(f"耗时: {time.time() - start:.1f} 秒")
+
+    output_file = OBJECTIVES[args.objective].sensitivity_file(args.lottery)
+    optimizer_core.save_json_atomic(report, output_file)
+    print(f"[OK] 敏感度报告已保存至: {output_file}")
@@ -0,0 +1,290 @@
+"""
+本地后台任务队列：仪表盘的耗时操作（每日分析、三个优化器、V7预测）不在 Streamlit 请求中运行
+
+- 任务表保存在 SQLite 文件 JOB_DB 中，浏览器刷新、仪表盘重启或多个用户同时访问都看到同一份状态；
+- submit 提交任务：与排队中/运行中任务完全相同（类型 + 参数）的提交不会重复入队，直接返回已有任务；
+- 独立的工作进程（python job_queue.py --worker）按提交顺序逐个运行任务，同一时刻只运行一个，
+  因此不会有两个优化器同时改写同一个最优策略文件；输出写入 optimizer_logs/job_{id}.log；
+- cancel 取消任务：排队中的直接取消，运行中的由工作进程终止其整个进程组（含优化器子进程与进程池）；
+- ensure_worker 在没有存活的工作进程时（按心跳判断）启动一个脱离当前会话的工作进程，
+  工作进程空闲 WORKER_IDLE_EXIT 秒后自行退出；新的工作进程先结束上一个工作进程遗留的运行中任务
+  （按任务表中记录的进程组），再开始运行排队的任务。
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import optimizer_progress
+from optimizer_scheduler import LOG_DIR, OBJECTIVE_SCRIPTS
+
+JOB_DB = 'jobs.db'
+JOB_KINDS = {
+    'daily': ('run_daily_analysis.py', '每日分析'),
+    'v7_predict': ('run_v7_prediction.py', 'V7预测'),
+    **{objective: (script, f"{name}优化") for objective, (script, name) in OBJECTIVE_SCRIPTS.items()}
+}
+ACTIVE_STATUSES = ('queued', 'running')
+POLL_INTERVAL = 1.0         # 工作进程检查新任务与取消请求的间隔（秒）
+WORKER_TIMEOUT = 10.0       # 心跳超过该秒数未更新即视为工作进程已退出
+WORKER_IDLE_EXIT = 600      # 工作进程空闲多少秒后退出
+CANCEL_GRACE_SECONDS = 10   # 取消时先发终止信号，超过该秒数仍未退出则强制结束
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    args TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    returncode INTEGER,
+    output_file TEXT,
+    pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS worker (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pid INTEGER,
+    heartbeat REAL
+);
+"""
+
+
+def connect(db_path=JOB_DB):
+    """自动提交模式的连接；需要原子性的读改写用 BEGIN IMMEDIATE 显式开启事务"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    # 旧版本创建的任务表没有 pid 列
+    if 'pid' not in {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}:
+        conn.execute("ALTER TABLE jobs ADD COLUMN pid INTEGER")
+    return conn
+
+
+def _job_dict(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['args'] = json.loads(job['args'])
+    job['label'] = JOB_KINDS[job['kind']][1]
+    return job
+
+
+def submit(kind, args=(), db_path=JOB_DB):
+    """提交任务，返回 (任务, 是否新建)；已有相同的排队中/运行中任务时返回该任务"""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"未知的任务类型: {kind}")
+    args = [str(a) for a in args]
+    dedup_key = json.dumps([kind] + args, ensure_ascii=False)
+    conn = connect(db_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(f"SELECT * FROM jobs WHERE dedup_key = ? AND status IN {ACTIVE_STATUSES} "
+                           "ORDER BY id LIMIT 1", (dedup_key,)).fetchone()
+        if row is not None:
+            conn.execute('COMMIT')
+            return _job_dict(row), False
+        cursor = conn.execute("INSERT INTO jobs (kind, args, dedup_key, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                              (kind, json.dumps(args), dedup_key, time.time()))
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        conn.execute('COMMIT')
+        return _job_dict(row), True
+    finally:
+        conn.close()
+
+
+def get_job(job_id, db_path=JOB_DB):
+    conn = connect(db_path)
+    try:
+        return _job_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def latest_job(kind, db_path=JOB_DB):
+    """某类任务最近提交的一个（不存在时返回 None）"""
+    conn = connect(db_path)
+    try:
+        return _job_dict(conn.execute("SELECT * FROM jobs WHERE kind = ? ORDER BY id DESC LIMIT 1", (kind,)).fetchone())
+    finally:
+        conn.close()
+
+
+def list_jobs(limit=20, db_path=JOB_DB):
+    conn = connect(db_path)
+    try:
+        return [_job_dict(row) for row in conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))]
+    finally:
+        conn.close()
+
+
+def cancel(job_id, db_path=JOB_DB):
+    """取消任务：排队中的立即取消，运行中的标记取消请求由工作进程终止。返回取消后的任务状态"""
+    conn = connect(db_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                     (time.time(), job_id))
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.execute('COMMIT')
+        return _job_dict(row)
+    finally:
+        conn.close()
+
+
+def worker_alive(db_path=JOB_DB):
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT heartbeat FROM worker WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    return row is not None and row['heartbeat'] is not None and time.time() - row['heartbeat'] < WORKER_TIMEOUT
+
+
+def ensure_worker(db_path=JOB_DB):
+    """没有存活的工作进程时启动一个（脱离调用者的会话，仪表盘重启不影响它）。返回是否新启动"""
+    if worker_alive(db_path):
+        return False
+    os.makedirs(LOG_DIR, exist_ok=True)
+    if os.name == 'nt':
+        detach = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS}
+    else:
+        detach = {'start_new_session': True}
+    with open(os.path.join(LOG_DIR, 'job_worker.log'), 'a', encoding='utf-8') as output:
+        subprocess.Popen([sys.executable, '-u', os.path.abspath(__file__), '--worker', '--db', db_path],
+                         stdout=output, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, **detach)
+    return True
+
+
+def job_progress(job):
+    """任务的实时进度（见 optimizer_progress.job_progress），排队中的任务只有状态"""
+    if job['status'] == 'queued' or job['started_at'] is None:
+        return None
+    progress_job = {'output_file': job['output_file'], 'start_time': job['started_at'],
+                    'returncode': job['returncode'] if job['status'] != 'running' else None}
+    if job['kind'] in OBJECTIVE_SCRIPTS:
+        progress_job['objective'] = job['kind']
+        if '--lottery' in job['args']:
+            progress_job['lotteries'] = [job['args'][job['args'].index('--lottery') + 1]]
+    return optimizer_progress.job_progress(progress_job)
+
+
+def _heartbeat(conn, claim=False):
+    """更新心跳；claim 为 True 时只有在没有其他存活工作进程时才登记本进程，返回是否成功"""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    row = conn.execute("SELECT pid, heartbeat FROM worker WHERE id = 1").fetchone()
+    if (claim and row is not None and row['pid'] != os.getpid()
+            and row['heartbeat'] is not None and now - row['heartbeat'] < WORKER_TIMEOUT):
+        conn.execute('COMMIT')
+        return False
+    conn.execute("INSERT OR REPLACE INTO worker (id, pid, heartbeat) VALUES (1, ?, ?)", (os.getpid(), now))
+    conn.execute('COMMIT')
+    return True
+
+
+def _claim_next(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+    if row is None:
+        conn.execute('COMMIT')
+        return None
+    output_file = os.path.join(LOG_DIR, f"job_{row['id']}.log")
+    conn.execute("UPDATE jobs SET status = 'running', started_at = ?, output_file = ? WHERE id = ?",
+                 (time.time(), output_file, row['id']))
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+    conn.execute('COMMIT')
+    return _job_dict(row)
+
+
+def _run_job(conn, job):
+    """运行一个任务直到结束或被取消，期间保持心跳"""
+    script = JOB_KINDS[job['kind']][0]
+    process = optimizer_progress.start_script(script, job['args'], label=job['label'],
+                                              output_name=os.path.basename(job['output_file']))['process']
+    # 记录进程组：工作进程异常退出后，新的工作进程据此结束遗留的任务（见 _recover_orphans）
+    conn.execute("UPDATE jobs SET pid = ? WHERE id = ?", (process.pid, job['id']))
+    print(f"[启动] 任务 #{job['id']} {job['label']} (pid {process.pid})")
+    cancelled = False
+    while process.poll() is None:
+        time.sleep(POLL_INTERVAL)
+        _heartbeat(conn)
+        row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job['id'],)).fetchone()
+        if row['cancel_requested'] and not cancelled:
+            cancelled = True
+            optimizer_progress.stop_script(process, CANCEL_GRACE_SECONDS)
+    status = 'cancelled' if cancelled else ('succeeded' if process.returncode == 0 else 'failed')
+    conn.execute("UPDATE jobs SET status = ?, returncode = ?, finished_at = ? WHERE id = ?",
+                 (status, process.returncode, time.time(), job['id']))
+    print(f"[{status}] 任务 #{job['id']} {job['label']}, 退出码 {process.returncode}")
+
+
+def _recover_orphans(conn):
+    """
+    上一个工作进程异常退出时遗留的运行中任务无法再跟踪：脚本在独立的进程组中运行，不会随工作进程退出，
+    先结束其整个进程组，避免与接下来的任务同时改写策略文件，再标记为失败
+    """
+    for row in conn.execute("SELECT id, pid FROM jobs WHERE status = 'running'").fetchall():
+        if row['pid'] is not None:
+            optimizer_progress.kill_process_group(row['pid'])
+            print(f"[恢复] 已结束遗留任务 #{row['id']} 的进程组 (pid {row['pid']})")
+        conn.execute("UPDATE jobs SET status = 'failed', finished_at = ? WHERE id = ?", (time.time(), row['id']))
+
+
+def run_worker(db_path=JOB_DB, idle_exit=WORKER_IDLE_EXIT):
+    """工作进程主循环：逐个运行排队中的任务，空闲 idle_exit 秒后退出"""
+    conn = connect(db_path)
+    if not _heartbeat(conn, claim=True):
+        print("已有工作进程在运行，退出。")
+        return
+    _recover_orphans(conn)
+    print(f"任务工作进程已启动 (pid {os.getpid()})")
+    idle_since = time.time()
+    try:
+        while True:
+            _heartbeat(conn)
+            job = _claim_next(conn)
+            if job is not None:
+                _run_job(conn, job)
+                idle_since = time.time()
+            elif idle_exit and time.time() - idle_since > idle_exit:
+                print(f"空闲超过 {idle_exit} 秒，工作进程退出。")
+                break
+            else:
+                time.sleep(POLL_INTERVAL)
+    finally:
+        conn.execute("UPDATE worker SET heartbeat = NULL WHERE id = 1 AND pid = ?", (os.getpid(),))
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="仪表盘后台任务队列：提交、查询、取消任务或运行工作进程")
+    parser.add_argument('--db', type=str, default=JOB_DB, help='任务表 SQLite 文件')
+    parser.add_argument('--worker', action='store_true', help='运行工作进程')
+    parser.add_argument('--idle-exit', type=int, default=WORKER_IDLE_EXIT, help='工作进程空闲多少秒后退出（0 为不退出）')
+    parser.add_argument('--submit', type=str, default=None, choices=list(JOB_KINDS.keys()), help='提交任务')
+    parser.add_argument('--cancel', type=int, default=None, metavar='JOB_ID', help='取消任务')
+    args, job_args = parser.parse_known_args()
+
+    if args.worker:
+        run_worker(args.db, args.idle_exit)
+    elif args.submit:
+        job, created = submit(args.submit, job_args, args.db)
+        print(f"{'已提交' if created else '已有相同任务'}: #{job['id']} {job['label']} ({job['status']})")
+        if ensure_worker(args.db):
+            print("已启动工作进程")
+    elif args.cancel is not None:
+        job = cancel(args.cancel, args.db)
+        print(f"任务 #{args.cancel}: {job['status'] if job else '不存在'}"
+              f"{'（已请求取消）' if job and job['cancel_requested'] and job['status'] == 'running' else ''}")
+    else:
+        for job in list_jobs(db_path=args.db):
+            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(job['created_at']))
+            print(f"#{job['id']:<5} {job['label']:<12} {job['status']:<10} {created}  {' '.join(job['args'])}")
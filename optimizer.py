@@ -1,13 +1,22 @@
-import random
-import json
+"""
+V6 通用策略优化器：在最近50期上用遗传算法优化平码组合预测的权重
+
+进化流程由 optimizer_engine 统一实现，本模块只定义目标函数、参数空间与遗传算法参数。
+"""
 import backtester
-import operator
+import optimizer_engine
 
 # --- GENETIC ALGORITHM PARAMETERS ---
 POPULATION_SIZE = 60       
 N_GENERATIONS = 50         
 MUTATION_RATE = 0.2        
 TOURNAMENT_SIZE = 5        
+ELITE_COUNT = 2            # 每代原样保留的精英个体数
+STALL_GENERATIONS = 12     # 全局最优连续多少代无提升即提前停止
+MIN_DIVERSITY = 0.01       # 种群多样性低于该值视为收敛
+WARM_START_POPULATION_SIZE = 30   # 热启动（每日重新优化）的种群大小
+WARM_START_GENERATIONS = 8        # 热启动的进化代数
+WARM_START_STALL_GENERATIONS = 3  # 热启动时全局最优连续多少代无提升即停止
 
 # --- V6 参数空间：强化组合预测 ---
 PARAMETER_SPACE = {
@@ -24,110 +33,29 @@ PARAMETER_SPACE = {
     'triplet_weight': (0.0, 8.0)        # 3中3 权重 (三元闭环)
 }
 
-# --- GENETIC ALGORITHM IMPLEMENTATION ---
-
-def create_individual():
-    individual = {}
-    for key, (min_val, max_val) in PARAMETER_SPACE.items():
-        individual[key] = random.uniform(min_val, max_val)
-    return individual
-
-def create_initial_population():
-    return [create_individual() for _ in range(POPULATION_SIZE)]
+# 分析器中按 int() 使用的基因，规范化时截断取整
+INTEGER_GENES = ('trend_lookback',)
 
-def calculate_population_fitness(population, lottery_type, backtest_range):
-    population_with_fitness = []
-    print(f"正在评估通用种群适应度 (共 {len(population)} 个个体)...")
-    for i, individual in enumerate(population):
-        fitness = backtester.run_backtest(lottery_type, individual, backtest_range)
-        population_with_fitness.append((individual, fitness))
-    return population_with_fitness
+OBJECTIVE = optimizer_engine.Objective(
+    'general', '通用', backtester.run_backtest, PARAMETER_SPACE, INTEGER_GENES,
+    preload=backtester.preload_history, backtest_range=50,
+    population_size=POPULATION_SIZE, n_generations=N_GENERATIONS, mutation_rate=MUTATION_RATE,
+    tournament_size=TOURNAMENT_SIZE, elite_count=ELITE_COUNT,
+    stall_generations=STALL_GENERATIONS, min_diversity=MIN_DIVERSITY,
+    warm_start_population_size=WARM_START_POPULATION_SIZE, warm_start_generations=WARM_START_GENERATIONS,
+    warm_start_stall_generations=WARM_START_STALL_GENERATIONS,
+    best_file='best_strategy_{lottery}.json', checkpoint_file='{lottery}_optimizer_checkpoint.json',
+    log_file='{lottery}_optimizer_log.json', lotteries=('hk', 'macau'))
 
-def selection(population_with_fitness):
-    tournament = random.sample(population_with_fitness, TOURNAMENT_SIZE)
-    return max(tournament, key=operator.itemgetter(1))[0]
-
-def crossover(parent1, parent2):
-    child = {}
-    crossover_point = random.randint(1, len(PARAMETER_SPACE) - 1)
-    keys = list(PARAMETER_SPACE.keys())
-    
-    for i, key in enumerate(keys):
-        if i < crossover_point:
-            child[key] = parent1[key]
-        else:
-            child[key] = parent2[key]
-    return child
-
-def mutate(individual):
-    for key in individual:
-        if random.random() < MUTATION_RATE:
-            min_val, max_val = PARAMETER_SPACE[key]
-            individual[key] = random.uniform(min_val, max_val)
-    return individual
-
-def run_evolution(lottery_type, backtest_range):
-    print(f"--- V6: 开始为 {lottery_type.upper()} 通用数据运行优化 ---")
-    print(f"种群大小: {POPULATION_SIZE}, 进化代数: {N_GENERATIONS}, 变异率: {MUTATION_RATE}")
-
-    population = create_initial_population()
-    overall_best_individual = None
-    overall_best_fitness = -1
-    
-    fitness_log = []
+SPACE = OBJECTIVE.space
+create_initial_population = OBJECTIVE.initial_population
+breed = OBJECTIVE.breed
 
-    for gen in range(N_GENERATIONS):
-        print(f"\n--- 第 {gen + 1}/{N_GENERATIONS} 代通用进化 ---")
-        population_with_fitness = calculate_population_fitness(population, lottery_type, backtest_range)
-        current_best_individual, current_best_fitness = max(population_with_fitness, key=operator.itemgetter(1))
-        
-        if current_best_fitness > overall_best_fitness:
-            overall_best_fitness = current_best_fitness
-            overall_best_individual = current_best_individual
-            print(f"发现新的全局最优策略！适应度分数: {overall_best_fitness}")
 
-        new_population = []
-        for _ in range(POPULATION_SIZE):
-            parent1 = selection(population_with_fitness)
-            parent2 = selection(population_with_fitness)
-            child = crossover(parent1, parent2)
-            child = mutate(child)
-            new_population.append(child)
-        
-        population = new_population
-        avg_fitness = sum(fit for ind, fit in population_with_fitness) / POPULATION_SIZE
-        print(f"第 {gen + 1} 代总结: 平均适应度 = {avg_fitness:.2f}, 本代最高 = {current_best_fitness:.2f}, 全局最高 = {overall_best_fitness:.2f}")
-        fitness_log.append({'generation': gen + 1, 'best_fitness': current_best_fitness, 'average_fitness': avg_fitness})
+def run_evolution(lottery_type, backtest_range=50, **options):
+    """运行通用策略的遗传算法优化（参数见 optimizer_engine.run_evolution）"""
+    return optimizer_engine.run_evolution(OBJECTIVE, lottery_type, backtest_range, **options)
 
-    print("\n--- 通用进化完成 ---")
-    if overall_best_individual:
-        print(f"找到的“天选策略”获得了 {overall_best_fitness:.2f} 的最终适应度分数。")
-        print("最优权重参数为:")
-        for key, value in overall_best_individual.items():
-            print(f"  - {key}: {value:.4f}")
-        
-        output_filename = f'best_strategy_{lottery_type}.json'
-        try:
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(overall_best_individual, f, indent=2)
-            print(f"\n最优策略已保存至: {output_filename}")
-        except Exception as e:
-            print(f"错误: 保存最优策略失败。 {e}")
-            
-        log_filename = f'{lottery_type}_optimizer_log.json'
-        try:
-            with open(log_filename, 'w', encoding='utf-8') as f:
-                json.dump(fitness_log, f, indent=2)
-            print(f"优化过程日志已保存至: {log_filename}")
-        except Exception as e:
-            print(f"错误: 保存优化日志失败。 {e}")
-            
-    else:
-        print("未能找到任何有效策略。")
 
 if __name__ == "__main__":
-    print("将分别为香港和澳门数据优化策略...")
-    run_evolution('hk', backtest_range=50)
-    print("\n" + "="*50 + "\n")
-    run_evolution('macau', backtest_range=50)
-    print("\n所有优化任务完成。")
+    optimizer_engine.main(OBJECTIVE, __doc__)
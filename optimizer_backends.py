@@ -0,0 +1,303 @@
+"""
+可插拔的优化器后端：遗传算法 (GA) / 差分进化 (DE) / CMA-ES
+
+三个后端都实现同一个 ask/tell 接口：
+- ask(rng)                  返回下一批待评估的种群矩阵（个体数 × 基因数）；
+- tell(population, fitness) 接收这批个体规范化后的矩阵与适应度。
+
+目标函数与优化器完全相同（OBJECTIVES：V6通用 / V6特码 / V7特码 的回测评分），
+评估经由 optimizer_core.FitnessEvaluator（进程池 + 适应度缓存），预算按实际回测次数计。
+命令行运行时比较各后端达到目标分数所需的回测次数（evaluations-to-target），
+目标分数默认取当前已保存最优策略在同一回测区间上的得分。
+三个优化器脚本都可以用 --backend 选择后端（optimizer_engine.run_evolution 经由 create_backend 调用）。
+"""
+import json
+import math
+import time
+import numpy as np
+import optimizer
+import optimizer_special
+import optimizer_special_v7
+import optimizer_core
+from optimizer_engine import BACKENDS
+
+# 目标函数：各优化器模块中定义的 optimizer_engine.Objective
+OBJECTIVES = {
+    'general': optimizer.OBJECTIVE,
+    'special': optimizer_special.OBJECTIVE,
+    'v7': optimizer_special_v7.OBJECTIVE
+}
+
+DEFAULT_BUDGET = 600        # 每次运行的回测次数上限
+DEFAULT_SEEDS = 3           # 每个后端重复运行的次数（不同随机种子）
+MAX_STALE_ROUNDS = 20       # 连续多少轮没有新的回测（全部命中缓存）即视为已收敛
+
+
+class GeneticBackend:
+    """与三个优化器相同的遗传算法：精英保留 + Objective.breed（锦标赛选择 + 单点交叉 + 均匀变异）"""
+    name = 'ga'
+
+    def __init__(self, objective, population_size=None):
+        self.objective = objective
+        self.space = objective.space
+        self.population_size = population_size or objective.population_size
+        self.population = None
+        self.fitness = None
+
+    def ask(self, rng):
+        if self.population is None:
+            return self.space.random(self.population_size, rng)
+        elites = optimizer_core.select_elites(self.population, self.fitness, self.objective.elite_count)
+        children = self.objective.breed(self.population, self.fitness, self.population_size - len(elites), rng)
+        return np.vstack([elites, children])
+
+    def tell(self, population, fitness):
+        self.population, self.fitness = population, fitness
+
+
+class DifferentialEvolutionBackend:
+    """差分进化 DE/rand/1/bin：试验向量不差于父代时替换父代"""
+    name = 'de'
+
+    def __init__(self, space, population_size, differential_weight=0.7, crossover_rate=0.9):
+        self.space = space
+        self.population_size = max(4, population_size)
+        self.differential_weight = differential_weight
+        self.crossover_rate = crossover_rate
+        self.population = None
+        self.fitness = None
+
+    def ask(self, rng):
+        if self.population is None:
+            return self.space.random(self.population_size, rng)
+
+        n, n_genes = self.population.shape
+        # 每行抽取3个互不相同且不等于自身的个体
+        keys = rng.random((n, n))
+        np.fill_diagonal(keys, np.inf)
+        r1, r2, r3 = np.argsort(keys, axis=1)[:, :3].T
+        mutants = self.population[r1] + self.differential_weight * (self.population[r2] - self.population[r3])
+
+        cross = rng.random((n, n_genes)) < self.crossover_rate
+        cross[np.arange(n), rng.integers(n_genes, size=n)] = True
+        return self.space.clip(np.where(cross, mutants, self.population))
+
+    def tell(self, population, fitness):
+        if self.population is None:
+            self.population, self.fitness = population, fitness
+            return
+        improved = fitness >= self.fitness
+        self.population = np.where(improved[:, None], population, self.population)
+        self.fitness = np.where(improved, fitness, self.fitness)
+
+
+class CMAESBackend:
+    """
+    CMA-ES（秩一 + 秩μ 更新，求最大值）。
+    在归一化到 [0, 1] 的坐标中搜索，采样点裁剪到边界内后评估与更新。
+    """
+    name = 'cmaes'
+
+    def __init__(self, space, population_size=None, sigma=0.3, mean=None):
+        self.space = space
+        n = space.n_genes
+        self.n = n
+        self.lam = population_size or 4 + int(3 * math.log(n))
+        self.mu = self.lam // 2
+        weights = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+
+        self.mean = np.full(n, 0.5) if mean is None else (np.asarray(mean, dtype=float) - space.lower) / space.span
+        self.sigma = sigma
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.generation = 0
+
+    def ask(self, rng):
+        z = rng.standard_normal((self.lam, self.n))
+        y = np.clip(self.mean + self.sigma * (z * self.D) @ self.B.T, 0.0, 1.0)
+        return self.space.lower + y * self.space.span
+
+    def tell(self, population, fitness):
+        y = (population - self.space.lower) / self.space.span
+        order = np.argsort(-fitness, kind='stable')[:self.mu]
+        old_mean = self.mean
+        self.mean = self.weights @ y[order]
+        self.generation += 1
+
+        step = (self.mean - old_mean) / self.sigma
+        inv_sqrt_c = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ step
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = ps_norm / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n < 1.4 + 2 / (self.n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+
+        artmp = (y[order] - old_mean) / self.sigma
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * (artmp.T * self.weights) @ artmp)
+        self.sigma *= math.exp((self.cs / self.damps) * (ps_norm / self.chi_n - 1))
+        self.sigma = min(self.sigma, 1.0)
+
+        self.C = np.triu(self.C) + np.triu(self.C, 1).T
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+
+def create_backend(name, space, objective=None, population_size=None):
+    """
+    按名称创建后端。GA 直接使用目标 (objective) 的遗传算子与精英数，必须提供 objective；
+    population_size 为空时使用目标的种群大小（GA）或各后端的常用默认值。
+    """
+    if name == 'ga':
+        if objective is None:
+            raise ValueError("GA 后端需要目标 (objective)")
+        return GeneticBackend(objective, population_size)
+    if name == 'de':
+        return DifferentialEvolutionBackend(space, population_size or 10 * space.n_genes)
+    if name == 'cmaes':
+        return CMAESBackend(space, population_size)
+    raise ValueError(f"未知的优化器后端: {name}")
+
+
+
+def run_backend(backend, evaluator, max_evaluations, rng, target=None):
+    """
+    用一个后端优化，直到实际回测次数达到 max_evaluations、最优分数达到 target，
+    或连续 MAX_STALE_ROUNDS 轮采样全部命中缓存（后端已收敛）。
+    返回最优个体、最优分数、达到目标时的回测次数与 (回测次数, 最优分数) 轨迹。
+    """
+    evaluator.reset_cache()
+    evaluations = 0
+    best_individual, best_fitness = None, -float('inf')
+    evaluations_to_target = None
+    trace = []
+    stale_rounds = 0
+
+    while evaluations < max_evaluations and stale_rounds < MAX_STALE_ROUNDS:
+        population = evaluator.canonicalize(backend.ask(rng))
+        fitness = evaluator.evaluate(population, progress_every=0)
+        backend.tell(population, fitness)
+        evaluations += evaluator.last_stats['evaluations']
+        stale_rounds = stale_rounds + 1 if evaluator.last_stats['evaluations'] == 0 else 0
+
+        best_index = int(np.argmax(fitness))
+        if fitness[best_index] > best_fitness:
+            best_fitness = float(fitness[best_index])
+            best_individual = evaluator.space.to_individual(population[best_index])
+        trace.append((evaluations, best_fitness))
+
+        if target is not None and best_fitness >= target:
+            evaluations_to_target = evaluations
+            break
+
+    return {
+        'best_individual': best_individual,
+        'best_fitness': best_fitness,
+        'evaluations': evaluations,
+        'evaluations_to_target': evaluations_to_target,
+        'trace': trace
+    }
+
+
+def default_target(objective, lottery_type):
+    """目标分数：当前已保存最优策略在同一回测区间上的得分；没有最优策略文件时返回 None"""
+    try:
+        with open(objective.best_file(lottery_type), 'r', encoding='utf-8') as f:
+            weights = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return None
+    return objective.fitness_fn(lottery_type, weights, objective.backtest_range)
+
+
+def compare_backends(lottery_type, objective_name, backends=BACKENDS, budget=DEFAULT_BUDGET,
+                     n_seeds=DEFAULT_SEEDS, target=None, workers=None):
+    """每个后端用 n_seeds 个随机种子各运行一次，返回比较结果"""
+    objective = OBJECTIVES[objective_name]
+    space = objective.space
+    if target is None:
+        target = default_target(objective, lottery_type)
+
+    runs = {name: [] for name in backends}
+    with optimizer_core.FitnessEvaluator(objective.fitness_fn, lottery_type, objective.backtest_range, space,
+                                         workers=workers, preload=objective.preload) as evaluator:
+        for name in backends:
+            for seed in range(n_seeds):
+                start = time.time()
+                backend = create_backend(name, space, objective)
+                result = run_backend(backend, evaluator, budget, np.random.default_rng(seed), target)
+                result['seed'] = seed
+                result['seconds'] = time.time() - start
+                runs[name].append(result)
+                reached = result['evaluations_to_target']
+                print(f"  {name:<6} 种子 {seed}: 最优 {result['best_fitness']:.0f}, "
+                      f"{'达到目标用 ' + str(reached) + ' 次回测' if reached else '未达到目标'}")
+
+    summary = []
+    for name in backends:
+        reached = [r['evaluations_to_target'] for r in runs[name] if r['evaluations_to_target'] is not None]
+        summary.append({
+            'backend': name,
+            'runs': len(runs[name]),
+            'success_rate': len(reached) / len(runs[name]) if runs[name] else 0.0,
+            'median_evaluations_to_target': float(np.median(reached)) if reached else None,
+            'mean_best_fitness': float(np.mean([r['best_fitness'] for r in runs[name]])),
+            'mean_seconds': float(np.mean([r['seconds'] for r in runs[name]]))
+        })
+    summary.sort(key=lambda r: (-r['success_rate'], r['median_evaluations_to_target'] or float('inf')))
+
+    return {
+        'lottery_type': lottery_type,
+        'objective': objective_name,
+        'target': target,
+        'budget': budget,
+        'summary': summary,
+        'runs': runs
+    }
+
+
+def display_comparison(report):
+    objective = OBJECTIVES[report['objective']]
+    print(f"\n{'='*80}")
+    print(f"优化器后端比较 - {report['lottery_type'].upper()} {objective.name}")
+    print(f"目标分数: {report['target']}, 每次运行回测预算: {report['budget']}")
+    print(f"{'='*80}")
+    print(f"\n  {'后端':<8} {'达标率':<8} {'达标回测次数(中位数)':<22} {'平均最优分数':<14} {'平均耗时'}")
+    print(f"  {'-'*70}")
+    for r in report['summary']:
+        median = f"{r['median_evaluations_to_target']:.0f}" if r['median_evaluations_to_target'] is not None else "--"
+        print(f"  {r['backend']:<8} {r['success_rate']*100:>5.0f}%   {median:<22} "
+              f"{r['mean_best_fitness']:<14.1f} {r['mean_seconds']:.1f} 秒")
+    print(f"\n{'='*80}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="比较 GA / DE / CMA-ES 优化器后端达到目标分数所需的回测次数")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--objective', type=str, default='v7', choices=list(OBJECTIVES.keys()))
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET, help='每次运行的回测次数上限')
+    parser.add_argument('--seeds', type=int, default=DEFAULT_SEEDS, help='每个后端的重复次数')
+    parser.add_argument('--target', type=float, default=None, help='目标分数（默认为当前最优策略的得分）')
+    parser.add_argument('--workers', type=int, default=None, help='并行回测的工作进程数')
+    args = parser.parse_args()
+
+    report = compare_backends(args.lottery, args.objective, args.backends, args.budget, args.seeds,
+                              args.target, args.workers)
+    display_comparison(report)
+
+    output_file = f'{args.lottery}_{args.objective}_backend_comparison.json'
+    optimizer_core.save_json_atomic(report, output_file)
+    print(f"[OK] 比较结果已保存至: {output_file}")
@@ -0,0 +1,672 @@
+"""
+优化器公共组件
+optimizer.py / optimizer_special.py / optimizer_special_v7.py 共用的种群表示、遗传算子与适应度评估。
+
+种群是 (个体数 × 基因数) 的 NumPy 矩阵（GeneSpace），锦标赛选择、单点交叉与变异都是整矩阵运算，
+种群规模到上千时遗传算法本身的开销仍可忽略；只有回测时才把行转换为权重字典。
+
+FitnessEvaluator 使用进程池并行回测：
+- 工作进程初始化时只加载一次历史数据（preload），之后的回测直接使用进程内缓存；
+- 按块分发个体，结果按种群顺序返回，因此给定随机种子时结果与串行完全一致。
+
+个体先规范化（整数基因截断取整、浮点基因舍入到 FLOAT_PRECISION 位），
+规范化后相同的基因组只回测一次，适应度跨代缓存。
+
+精英保留与收敛检测（select_elites / ConvergenceMonitor）：每代最优的若干个体原样进入下一代，
+全局最优连续多代没有提升或种群多样性塌缩时提前结束进化。
+
+检查点（save_checkpoint / load_checkpoint）：每代结束时原子写入下一代种群、上一代适应度、
+随机数状态、全局最优与日志，--resume 可从中断处精确续跑，--seed-from 用上次的最终种群热启动。
+
+每日热启动（warm_start_population）：每天只新增一期开奖，最优策略变化很小，
+因此以已保存的最优策略和上次运行的精英为种子，加上它们的小幅扰动，只跑少量代数。
+
+逐次减半（fidelities）：新个体先在最近的短窗口上回测，只有排名前 1/HALVING_ETA 的个体晋级到更长的窗口，
+最后只有少数个体在完整回测区间上评分；被淘汰个体的适应度是短窗口得分按期数外推的估计值，
+且不会超过同批完整评分的最低分，因此全局最优始终是完整回测区间上的真实得分。
+
+代理模型预筛选（KNNSurrogate）：用迄今所有真实回测过的基因组训练 k 近邻回归，
+预测新个体的适应度，只有预测排名靠前的 SURROGATE_KEEP_FRACTION 才真正回测；
+其余个体以预测值（同样不超过同批真实评分的最低分）参与选择，不写入缓存。
+
+时间预算（deadline）：评估器在每个回测结果返回后检查截止时间，超时即抛出 TimeBudgetExceeded
+（附带本批已完成的完整回测结果），由调用方保存迄今最优后按时退出。
+
+遥测：每次回测都计时并记录工作进程的峰值内存，evaluate 在 last_stats 中给出评估耗时、
+工作进程利用率（回测总耗时 / (进程数 × 评估耗时)）与峰值内存；append_jsonl 逐行追加遥测记录。
+"""
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，峰值内存记为 None
+    resource = None
+
+FLOAT_PRECISION = 4     # 浮点基因保留的小数位数，更细的差异不影响预测结果
+
+WARM_START_ELITES = 10          # 热启动时从上次检查点沿用的精英数
+WARM_START_PERTURBATION = 0.1   # 扰动的标准差（占基因取值范围的比例）
+WARM_START_RANDOM_FRACTION = 0.2  # 热启动种群中保留的随机个体比例，避免过早收敛
+
+HALVING_ETA = 3                 # 逐次减半每一级只晋级前 1/HALVING_ETA
+HALVING_MIN_WINDOW = 5          # 最短回测窗口（期）
+
+SURROGATE_NEIGHBORS = 5         # k 近邻的 k
+SURROGATE_MIN_SAMPLES = 40      # 真实回测样本数达到该值后才启用代理模型
+SURROGATE_KEEP_FRACTION = 0.4   # 每批新个体中按预测值真正回测的比例
+
+# 工作进程内的评估上下文（由进程池初始化函数设置）
+_worker_context = {}
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _init_worker(fitness_fn, lottery_type, preload):
+    _worker_context['fitness_fn'] = fitness_fn
+    _worker_context['lottery_type'] = lottery_type
+    if preload is not None:
+        preload(lottery_type)
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存 (MB)；不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed_backtest(fitness_fn, lottery_type, individual, backtest_range):
+    """回测一个个体，返回 (适应度, 耗时秒数, 所在进程的峰值内存)"""
+    start = time.perf_counter()
+    fitness = fitness_fn(lottery_type, individual, backtest_range)
+    return fitness, time.perf_counter() - start, peak_rss_mb()
+
+
+def _evaluate_in_worker(task):
+    individual, backtest_range = task
+    ctx = _worker_context
+    return _timed_backtest(ctx['fitness_fn'], ctx['lottery_type'], individual, backtest_range)
+
+
+def default_fidelities(backtest_range):
+    """逐次减半的短窗口：完整区间的 1/8、1/4、1/2（去重，且不短于 HALVING_MIN_WINDOW）"""
+    windows = sorted({max(HALVING_MIN_WINDOW, backtest_range // d) for d in (8, 4, 2)})
+    return tuple(w for w in windows if w < backtest_range)
+
+
+class GeneSpace:
+    """
+    参数空间的矩阵表示：种群是 (个体数 × 基因数) 的 NumPy 矩阵，列顺序与 PARAMETER_SPACE 一致。
+    integer_genes 为分析器中按 int() 使用的基因名，规范化时截断取整。
+    fixed 为冻结的基因 {基因名: 取值}：不参与搜索（不占矩阵的列），转为权重字典时按固定值补上。
+    """
+
+    def __init__(self, parameter_space, integer_genes=(), fixed=None):
+        self.fixed = dict(fixed or {})
+        self.names = [k for k in parameter_space.keys() if k not in self.fixed]
+        self.lower = np.array([parameter_space[k][0] for k in self.names], dtype=float)
+        self.upper = np.array([parameter_space[k][1] for k in self.names], dtype=float)
+        self.span = np.where(self.upper > self.lower, self.upper - self.lower, 1.0)
+        self.integer_mask = np.array([k in integer_genes for k in self.names])
+
+    @property
+    def n_genes(self):
+        return len(self.names)
+
+    def random(self, n, rng):
+        """n 个在取值范围内均匀分布的随机个体"""
+        return self.lower + rng.random((n, self.n_genes)) * (self.upper - self.lower)
+
+    def clip(self, population):
+        return np.clip(population, self.lower, self.upper)
+
+    def canonicalize(self, population, precision=FLOAT_PRECISION):
+        """规范化：整数基因按分析器中的 int() 截断，其余基因舍入到 precision 位小数"""
+        return np.where(self.integer_mask, np.trunc(population), np.round(population, precision))
+
+    def to_individual(self, row):
+        """矩阵的一行转为分析器使用的权重字典"""
+        individual = {name: int(v) if is_int else float(v)
+                      for name, v, is_int in zip(self.names, row, self.integer_mask)}
+        individual.update(self.fixed)
+        return individual
+
+    def to_individuals(self, population):
+        return [self.to_individual(row) for row in population]
+
+    def from_individuals(self, individuals, rng):
+        """
+        权重字典转为矩阵：只保留参数空间中的基因并裁剪到取值范围内。
+        基因齐全时不消耗 rng（续跑时 rng 已恢复为检查点状态，必须原样用于之后的进化）；
+        缺失的基因由从 rng 派生的独立生成器随机补齐。
+        """
+        population = np.full((len(individuals), self.n_genes), np.nan)
+        for i, individual in enumerate(individuals):
+            for j, name in enumerate(self.names):
+                if individual.get(name) is not None:
+                    population[i, j] = float(individual[name])
+        missing = np.isnan(population)
+        if missing.any():
+            filler = rng.spawn(1)[0]
+            population = np.where(missing, self.random(len(individuals), filler), population)
+        return self.clip(population)
+
+
+def row_keys(population):
+    """规范化种群每一行的缓存键"""
+    return [row.tobytes() for row in np.ascontiguousarray(population)]
+
+
+def rank_correlation(a, b):
+    """Spearman 秩相关系数（不处理并列），样本少于3个或无方差时返回 None"""
+    if len(a) < 3:
+        return None
+    ra = np.argsort(np.argsort(a)).astype(float)
+    rb = np.argsort(np.argsort(b)).astype(float)
+    if ra.std() == 0 or rb.std() == 0:
+        return None
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+class KNNSurrogate:
+    """按取值范围归一化的欧氏距离做 k 近邻加权平均，预测个体的适应度"""
+
+    def __init__(self, space, k=SURROGATE_NEIGHBORS):
+        self.space = space
+        self.k = k
+        self.rows = []
+        self.fitness = []
+        self._x = None
+        self._y = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, rows, fitness):
+        self.rows.extend(rows)
+        self.fitness.extend(fitness)
+        self._x = None
+
+    def predict(self, population):
+        if self._x is None:
+            self._x = (np.array(self.rows) - self.space.lower) / self.space.span
+            self._y = np.array(self.fitness, dtype=float)
+        x = (np.asarray(population) - self.space.lower) / self.space.span
+        distances = np.sqrt(((x[:, None, :] - self._x[None, :, :]) ** 2).sum(axis=2))
+        k = min(self.k, len(self._y))
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        weights = 1.0 / (np.take_along_axis(distances, nearest, axis=1) + 1e-9)
+        return (weights * self._y[nearest]).sum(axis=1) / weights.sum(axis=1)
+
+
+class TimeBudgetExceeded(Exception):
+    """评估超过截止时间；individuals/fitness 为中断前本批已在完整回测区间上评分的个体"""
+
+    def __init__(self, individuals=(), fitness=()):
+        super().__init__("超过时间预算")
+        self.individuals = list(individuals)
+        self.fitness = list(fitness)
+
+
+class FitnessEvaluator:
+    """
+    种群适应度评估器，一次评估整个种群矩阵。
+    fitness_fn(lottery_type, weights, backtest_range) 必须是模块级函数（可被子进程引用）。
+    fitness_fn 也可以返回一组目标值（元组），此时 evaluate 返回 (个体数 × 目标数) 的矩阵；
+    逐次减半与代理模型只支持标量适应度。
+    workers <= 1 时在当前进程中串行评估。
+    fidelities 为逐次减半使用的短窗口期数（升序）；为空时所有个体都在完整回测区间上评分。
+    surrogate 为 True 时启用 k 近邻代理模型预筛选新个体。
+    deadline 为截止时间（time.time() 时间戳），超过后评估抛出 TimeBudgetExceeded。
+    """
+
+    def __init__(self, fitness_fn, lottery_type, backtest_range, space, workers=None, preload=None,
+                 fidelities=None, surrogate=False):
+        self.fitness_fn = fitness_fn
+        self.lottery_type = lottery_type
+        self.backtest_range = backtest_range
+        self.space = space
+        self.workers = max(1, workers if workers is not None else default_workers())
+        self.preload = preload
+        self.fidelities = tuple(sorted(w for w in (fidelities or ()) if w < backtest_range))
+        self.surrogate = KNNSurrogate(space) if surrogate else None
+        self.total_surrogate_skipped = 0
+        self.deadline = None
+        self._pool = None
+        self._busy_seconds = 0.0
+        self._worker_peak_rss = None
+
+        # 适应度缓存（跨代）与命中统计；逐次减半中被淘汰个体的估计值也进入缓存
+        self.cache = {}
+        self.partial_cache = {}
+        self.total_requests = 0
+        self.total_cache_hits = 0
+        self.last_stats = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self.fitness_fn, self.lottery_type, self.preload)
+            )
+        return self._pool
+
+    def chunksize(self, n_items):
+        """每个工作进程约分到4块，兼顾负载均衡与进程间通信开销"""
+        return max(1, math.ceil(n_items / (self.workers * 4)))
+
+    def canonicalize(self, population):
+        return self.space.canonicalize(population)
+
+    def seed_cache(self, population, fitness):
+        """写入已知的适应度（如岛屿迁入的个体），这些个体之后评估时直接命中缓存，不再回测"""
+        self.cache.update(zip(row_keys(self.canonicalize(population)), (float(f) for f in fitness)))
+
+    def reset_cache(self):
+        """清空适应度缓存与命中统计（比较不同优化器后端时各自独立计数）"""
+        self.cache = {}
+        self.partial_cache = {}
+        self.total_requests = 0
+        self.total_cache_hits = 0
+        self.last_stats = {}
+        if self.surrogate is not None:
+            self.surrogate = KNNSurrogate(self.space)
+            self.total_surrogate_skipped = 0
+
+    def _run(self, individuals, progress_every, backtest_range=None):
+        """实际回测一批个体（默认完整回测区间），按顺序返回适应度"""
+        backtest_range = backtest_range or self.backtest_range
+        if self.workers <= 1:
+            if self.preload is not None:
+                self.preload(self.lottery_type)
+            results = (_timed_backtest(self.fitness_fn, self.lottery_type, individual, backtest_range)
+                       for individual in individuals)
+        else:
+            tasks = [(individual, backtest_range) for individual in individuals]
+            results = self._get_pool().imap(_evaluate_in_worker, tasks, self.chunksize(len(tasks)))
+
+        fitness = []
+        for i, (value, seconds, rss) in enumerate(results):
+            if progress_every and (i + 1) % progress_every == 0:
+                print(f"  进度: {i + 1}/{len(individuals)}")
+            fitness.append(value)
+            self._busy_seconds += seconds
+            if rss is not None:
+                self._worker_peak_rss = max(self._worker_peak_rss or 0.0, rss)
+            if self.deadline is not None and time.time() > self.deadline and len(fitness) < len(individuals):
+                full_range = backtest_range == self.backtest_range
+                raise TimeBudgetExceeded(individuals[:len(fitness)] if full_range else (),
+                                         fitness if full_range else ())
+        return fitness
+
+    def _observe(self, rows, fitness):
+        """记录完整回测区间上的评分（或其外推估计），作为代理模型的训练样本"""
+        if self.surrogate is not None:
+            self.surrogate.add(rows, fitness)
+
+    def _surrogate_screen(self, pending):
+        """
+        用代理模型预测新个体的适应度，只保留预测排名靠前的个体进行真实回测。
+        返回 (需回测的个体, 跳过个体的预测值, 全部预测值)。
+        """
+        keys = list(pending.keys())
+        predicted = dict(zip(keys, self.surrogate.predict([pending[k] for k in keys])))
+        n_keep = max(1, math.ceil(len(keys) * SURROGATE_KEEP_FRACTION))
+        ranked = sorted(keys, key=lambda k: predicted[k], reverse=True)
+        to_run = {k: pending[k] for k in ranked[:n_keep]}
+        skipped = {k: predicted[k] for k in ranked[n_keep:]}
+        return to_run, skipped, predicted
+
+    def _successive_halving(self, pending, progress_every):
+        """
+        逐次减半评估一批新个体，把结果写入缓存。
+        返回 (实际回测的总期数, 被淘汰个体数)。
+        """
+        candidates = list(pending.keys())
+        estimates = {}
+        periods = 0
+        for window in self.fidelities:
+            todo = [k for k in candidates if (k, window) not in self.partial_cache]
+            if todo:
+                scores = self._run([self.space.to_individual(pending[k]) for k in todo], 0, window)
+                self.partial_cache.update(zip(((k, window) for k in todo), scores))
+                periods += window * len(todo)
+            n_keep = max(1, math.ceil(len(candidates) / HALVING_ETA))
+            ranked = sorted(candidates, key=lambda k: self.partial_cache[(k, window)], reverse=True)
+            for k in ranked[n_keep:]:
+                estimates[k] = self.partial_cache[(k, window)] * self.backtest_range / window
+            candidates = ranked[:n_keep]
+
+        full = self._run([self.space.to_individual(pending[k]) for k in candidates], progress_every)
+        periods += self.backtest_range * len(candidates)
+        self.cache.update(zip(candidates, full))
+        self._observe([pending[k] for k in candidates], full)
+        # 被淘汰个体的外推估计（未截断）也作为代理模型的训练样本，否则开启逐次减半时样本增长过慢
+        self._observe([pending[k] for k in estimates], list(estimates.values()))
+
+        # 估计值不超过同批完整评分的最低分，保证被淘汰个体不会排在完整评分的个体之前
+        ceiling = np.nextafter(min(full), -np.inf)
+        for k, estimate in estimates.items():
+            self.cache[k] = float(min(estimate, ceiling))
+        return periods, len(estimates)
+
+    def evaluate(self, population, progress_every=10):
+        """
+        按行返回种群矩阵中每个个体的适应度 (NumPy 数组)。
+        只回测缓存中没有的规范化基因组（同一代内的重复个体也只回测一次）。
+        """
+        start = time.perf_counter()
+        self._busy_seconds = 0.0
+        canonical = self.canonicalize(population)
+        keys = row_keys(canonical)
+        pending = {}
+        for key, row in zip(keys, canonical):
+            if key not in self.cache and key not in pending:
+                pending[key] = row
+
+        to_run, skipped, predicted = pending, {}, {}
+        if len(pending) > 1 and self.surrogate is not None and len(self.surrogate) >= SURROGATE_MIN_SAMPLES:
+            to_run, skipped, predicted = self._surrogate_screen(pending)
+
+        periods, screened_out = 0, 0
+        if to_run and self.fidelities and len(to_run) > 1:
+            periods, screened_out = self._successive_halving(to_run, progress_every)
+        elif to_run:
+            individuals = [self.space.to_individual(row) for row in to_run.values()]
+            fitness = self._run(individuals, progress_every)
+            self.cache.update(zip(to_run.keys(), fitness))
+            self._observe(list(to_run.values()), fitness)
+            periods = self.backtest_range * len(to_run)
+
+        surrogate_stats = {}
+        if predicted:
+            # 预测值同样不超过同批真实评分的最低分
+            ceiling = np.nextafter(min(self.cache[k] for k in to_run), -np.inf)
+            skipped = {k: float(min(v, ceiling)) for k, v in skipped.items()}
+            checked = list(to_run.keys())
+            actual = np.array([self.cache[k] for k in checked])
+            estimate = np.array([predicted[k] for k in checked])
+            self.total_surrogate_skipped += len(skipped)
+            surrogate_stats = {
+                'surrogate_skipped': len(skipped),
+                'surrogate_rank_corr': rank_correlation(estimate, actual),
+                'surrogate_mae': float(np.mean(np.abs(estimate - actual)))
+            }
+
+        hits = len(keys) - len(pending)
+        self.total_requests += len(keys)
+        self.total_cache_hits += hits
+        self.last_stats = {
+            'evaluations': len(pending) - len(skipped),
+            'cache_hits': hits,
+            'cache_hit_rate': hits / len(keys) if keys else 0.0,
+            'backtest_periods': periods,
+            'full_range_periods': self.backtest_range * len(pending),
+            'screened_out': screened_out,
+            'surrogate_skipped': 0,
+            **surrogate_stats,
+            'total_cache_hit_rate': self.total_cache_hits / self.total_requests if self.total_requests else 0.0
+        }
+        elapsed = time.perf_counter() - start
+        self.last_stats.update({
+            'evaluation_seconds': elapsed,
+            'busy_seconds': self._busy_seconds,
+            'worker_utilization': self._busy_seconds / (self.workers * elapsed) if elapsed > 0 else 0.0,
+            'worker_peak_rss_mb': self._worker_peak_rss
+        })
+        return np.array([self.cache[key] if key in self.cache else skipped[key] for key in keys], dtype=float)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def terminate(self):
+        """立即停止工作进程（放弃正在进行的回测）"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+def tournament_select(fitness, n, tournament_size, rng):
+    """向量化锦标赛选择：一次抽取 n 组参赛者，返回每组中适应度最高者的行下标"""
+    contestants = rng.integers(len(fitness), size=(n, tournament_size))
+    winners = np.argmax(fitness[contestants], axis=1)
+    return contestants[np.arange(n), winners]
+
+
+def single_point_crossover(parents1, parents2, rng):
+    """向量化单点交叉：交叉点之前的基因来自 parents1，之后的来自 parents2"""
+    n, n_genes = parents1.shape
+    if n_genes < 2:
+        return parents1.copy()
+    points = rng.integers(1, n_genes, size=n)
+    return np.where(np.arange(n_genes) < points[:, None], parents1, parents2)
+
+
+def uniform_mutation(population, rate, space, rng):
+    """向量化基因变异：每个基因以 rate 的概率重新在取值范围内均匀抽取"""
+    mask = rng.random(population.shape) < rate
+    return np.where(mask, space.random(len(population), rng), population)
+
+
+def perturb(population, space, rng, scale=None):
+    """对每个基因加上与取值范围成比例的高斯扰动"""
+    scale = WARM_START_PERTURBATION if scale is None else scale
+    return space.clip(population + rng.normal(0.0, 1.0, population.shape) * scale * space.span)
+
+
+def select_elites(population, fitness, k):
+    """适应度最高的 k 个互不相同的个体（按适应度降序），原样复制进入下一代"""
+    order = np.argsort(-fitness, kind='stable')
+    elites, seen = [], set()
+    for idx, key in zip(order, row_keys(population[order])):
+        if len(elites) >= k:
+            break
+        if key not in seen:
+            seen.add(key)
+            elites.append(idx)
+    return population[elites].copy()
+
+
+def population_diversity(population, space):
+    """种群多样性：各基因按取值范围归一化后的标准差的平均值，0 表示完全收敛"""
+    if len(population) < 2:
+        return 0.0
+    return float(np.mean(population.std(axis=0) / space.span))
+
+
+class ConvergenceMonitor:
+    """
+    收敛检测：全局最优连续 stall_generations 代没有提升，或种群多样性低于 min_diversity 时停止。
+    stall_generations 为 0 时不提前停止。
+    """
+
+    def __init__(self, stall_generations, min_diversity):
+        self.stall_generations = stall_generations
+        self.min_diversity = min_diversity
+        self.best_fitness = -float('inf')
+        self.stalled = 0
+
+    def update(self, best_fitness, diversity):
+        """记录一代的结果；满足停止条件时返回停止原因，否则返回 None"""
+        if best_fitness > self.best_fitness:
+            self.best_fitness = best_fitness
+            self.stalled = 0
+        else:
+            self.stalled += 1
+
+        if not self.stall_generations:
+            return None
+        if self.stalled >= self.stall_generations:
+            return f"全局最优已连续 {self.stalled} 代没有提升"
+        if diversity < self.min_diversity:
+            return f"种群多样性塌缩 ({diversity:.4f} < {self.min_diversity})"
+        return None
+
+    def state(self):
+        return {'best_fitness': self.best_fitness, 'stalled': self.stalled}
+
+    def restore(self, state):
+        self.best_fitness = state['best_fitness']
+        self.stalled = state['stalled']
+
+
+def save_json_atomic(data, path):
+    """先写临时文件再替换，进程在写入中途被杀也不会留下损坏的文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def append_jsonl(record, path):
+    """向 JSON Lines 文件追加一条记录并立即刷新到磁盘，便于运行中实时读取"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+
+
+def save_checkpoint(path, lottery_type, backtest_range, generation, population, evaluated, fitness,
+                    space, rng, best_individual, best_fitness, fitness_log, monitor, finished):
+    """
+    保存第 generation 代结束时的完整进化状态。
+    population 为下一代待评估的种群矩阵，evaluated/fitness 为本代已评估的种群及其适应度。
+    """
+    save_json_atomic({
+        'lottery_type': lottery_type,
+        'backtest_range': backtest_range,
+        'generation': generation,
+        'finished': finished,
+        'population': space.to_individuals(population),
+        'evaluated': [{'individual': ind, 'fitness': float(fit)}
+                      for ind, fit in zip(space.to_individuals(evaluated), fitness)],
+        'rng_state': rng.bit_generator.state,
+        'best_individual': best_individual,
+        'best_fitness': best_fitness,
+        'monitor': monitor.state(),
+        'fitness_log': fitness_log
+    }, path)
+
+
+def load_checkpoint(path, lottery_type, backtest_range, rng):
+    """读取可续跑的检查点并恢复随机数状态；不存在、已完成或参数不一致时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        print(f"未找到可用的检查点 {path}，将从头开始。")
+        return None
+    if checkpoint.get('lottery_type') != lottery_type or checkpoint.get('backtest_range') != backtest_range:
+        print(f"检查点 {path} 的彩种或回测期数与本次运行不一致，将从头开始。")
+        return None
+    if checkpoint.get('finished'):
+        print(f"检查点 {path} 对应的运行已完成，将从头开始。")
+        return None
+    if not isinstance(checkpoint.get('rng_state'), dict):
+        print(f"检查点 {path} 由旧版本优化器生成，无法精确续跑，将从头开始。")
+        return None
+
+    rng.bit_generator.state = checkpoint['rng_state']
+    print(f"从检查点续跑: 已完成 {checkpoint['generation']} 代, 全局最高 {checkpoint['best_fitness']}")
+    return checkpoint
+
+
+def _load_evaluated(path):
+    """检查点中上一代已评估的个体，按适应度降序"""
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    evaluated = sorted(checkpoint.get('evaluated', []), key=lambda e: e['fitness'], reverse=True)
+    return [e['individual'] for e in evaluated] or checkpoint.get('population', [])
+
+
+def seed_population(path, population_size, space, rng):
+    """用之前运行的最终种群热启动：按上一代适应度排序取前 population_size 个，不足部分随机补齐"""
+    try:
+        individuals = _load_evaluated(path)[:population_size]
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"警告: 无法读取热启动种群 {path} ({e})，改用随机种群。")
+        return space.random(population_size, rng)
+
+    print(f"从 {path} 热启动: 沿用 {len(individuals)} 个个体")
+    return np.vstack([space.from_individuals(individuals, rng),
+                      space.random(population_size - len(individuals), rng)])
+
+
+def warm_start_population(best_file, checkpoint_file, population_size, space, rng):
+    """
+    热启动种群：已保存的最优策略 + 上次检查点中的精英 + 它们的扰动 + 少量随机个体。
+    没有任何可用种子时返回纯随机种群。返回 (population, 种子个数)。
+    """
+    seeds = []
+    try:
+        with open(best_file, 'r', encoding='utf-8') as f:
+            seeds.append(json.load(f))
+    except (IOError, json.JSONDecodeError):
+        print(f"注意: 未找到最优策略 {best_file}")
+    try:
+        seeds.extend(_load_evaluated(checkpoint_file))
+    except (IOError, json.JSONDecodeError):
+        print(f"注意: 未找到上次运行的检查点 {checkpoint_file}")
+
+    if not seeds:
+        print("没有可用的热启动种子，改用随机种群。")
+        return space.random(population_size, rng), 0
+
+    seed_matrix = space.canonicalize(space.from_individuals(seeds, rng))
+    _, first = np.unique(seed_matrix, axis=0, return_index=True)
+    seed_matrix = seed_matrix[np.sort(first)][:min(1 + WARM_START_ELITES, population_size)]
+
+    n_seeds = len(seed_matrix)
+    n_random = int(population_size * WARM_START_RANDOM_FRACTION)
+    n_perturbed = max(0, population_size - n_random - n_seeds)
+    perturbed = perturb(seed_matrix[np.arange(n_perturbed) % n_seeds], space, rng)
+    population = np.vstack([seed_matrix, perturbed, space.random(population_size - n_seeds - n_perturbed, rng)])
+    print(f"热启动: {n_seeds} 个种子, {n_perturbed} 个扰动个体, {population_size - n_seeds - n_perturbed} 个随机个体")
+    return population, n_seeds
+
+
+def add_common_arguments(parser):
+    """优化器共用的命令行参数"""
+    parser.add_argument('--workers', type=int, default=None, help='并行回测的工作进程数（默认CPU核数，1为串行）')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子，用于复现优化结果')
+    parser.add_argument('--stall-generations', type=int, default=None,
+                        help='全局最优连续多少代无提升即提前停止（0 表示跑满全部代数）')
+    parser.add_argument('--lottery', type=str, default=None, choices=['macau', 'hk'], help='只优化一个彩种（默认两个都优化）')
+    parser.add_argument('--resume', action='store_true', help='从上次中断的检查点续跑')
+    parser.add_argument('--seed-from', type=str, default=None,
+                        help='用之前运行的检查点文件的最终种群热启动（路径中的 {lottery} 会替换为彩种）')
+    parser.add_argument('--population-size', type=int, default=None, help='种群大小（默认使用优化器内置值）')
+    parser.add_argument('--generations', type=int, default=None, help='进化代数（默认使用优化器内置值）')
+    parser.add_argument('--successive-halving', action='store_true',
+                        help='逐次减半评估：新个体先在短窗口上回测，只有排名靠前的才在完整区间上评分')
+    parser.add_argument('--surrogate', action='store_true',
+                        help='用 k 近邻代理模型预筛选新个体，只回测预测排名靠前的部分')
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help='时间预算（秒）：按预算调整种群与代数，持续保存迄今最优策略并按时退出')
+    parser.add_argument('--prune-genes', action='store_true',
+                        help='冻结基因敏感度探测 (gene_sensitivity.py) 报告中无影响或影响很小的基因')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='以已保存的最优策略和上次的精英为种子，用较小的种群和代数快速重新优化（每日运行）')
+    return parser
@@ -0,0 +1,399 @@
+"""
+统一的遗传算法优化引擎
+
+V6通用 / V6特码 / V7特码 三个优化器只在目标函数、参数空间与遗传算法参数上不同，
+这里把它们描述为 Objective，进化流程（并行评估、适应度缓存、精英保留、提前停止、
+检查点续跑、热启动、逐次减半、代理模型）只实现一次，由 run_evolution 统一运行。
+种群大小、进化代数与提前停止代数（预算）都是 run_evolution 的参数，可按次调整。
+
+时间预算模式（time_budget）：第一代结束后按实测的单次回测耗时缩小种群，保证预算内至少能跑
+TIME_BUDGET_MIN_GENERATIONS 代；预计下一代无法在截止前完成时提前结束，评估中途超时则中断；
+每发现新的全局最优就立即写入最优策略文件，因此无论何时退出都留下有效的最优策略。
+
+优化器后端（backend）：默认是遗传算法 'ga'；'de'（差分进化）与 'cmaes'（CMA-ES）经由
+optimizer_backends 的 ask/tell 接口逐代采样，评估、日志、遥测、提前停止与时间预算与 GA 相同，
+但后端内部状态不写入检查点，因此不支持续跑与热启动，也不改写 GA 的检查点。
+
+基因裁剪（prune_genes）：读取 gene_sensitivity.py 的探测报告，把无影响或影响很小的基因
+冻结为报告中的取值，不再参与搜索。
+
+遥测：每代结束后向 {lottery}_{key}_optimizer_telemetry.jsonl 追加一行，记录墙钟耗时、实际回测数、
+每秒回测数、缓存命中、提前淘汰（逐次减半 + 代理模型）、工作进程利用率与峰值内存，
+同一次运行的记录共享 run_id，可按运行比较性能。优化日志也在每代结束后重写，
+运行中即可读取（仪表盘据此实时显示学习曲线与预计剩余时间）。
+"""
+import copy
+import json
+import time
+from datetime import datetime
+import numpy as np
+import optimizer_core
+
+TIME_BUDGET_MIN_GENERATIONS = 5     # 时间预算内至少要能跑的代数（据此缩小种群）
+TIME_BUDGET_MIN_POPULATION = 10     # 时间预算模式下的最小种群
+TIME_BUDGET_MARGIN = 0.05           # 预留给保存结果的时间比例（最多5秒）
+BACKENDS = ('ga', 'de', 'cmaes')    # 可选的优化器后端，见 optimizer_backends
+
+
+class Objective:
+    """
+    一个优化目标：适应度函数 fitness_fn(lottery_type, individual, backtest_range)、
+    参数空间与默认的遗传算法参数。文件名模板中的 {lottery} 会替换为彩种。
+    """
+
+    def __init__(self, key, name, fitness_fn, parameter_space, integer_genes=(), preload=None,
+                 backtest_range=50, population_size=60, n_generations=50, mutation_rate=0.2,
+                 tournament_size=5, elite_count=2, stall_generations=12, min_diversity=0.01,
+                 warm_start_population_size=30, warm_start_generations=8, warm_start_stall_generations=3,
+                 best_file='best_{key}_strategy_{lottery}.json',
+                 checkpoint_file='{lottery}_{key}_optimizer_checkpoint.json',
+                 log_file='{lottery}_{key}_optimizer_log.json',
+                 sensitivity_file='{lottery}_{key}_gene_sensitivity.json',
+                 telemetry_file='{lottery}_{key}_optimizer_telemetry.jsonl',
+                 lotteries=('hk', 'macau'), description=()):
+        self.key = key
+        self.name = name
+        self.fitness_fn = fitness_fn
+        self.parameter_space = parameter_space
+        self.integer_genes = tuple(integer_genes)
+        self.space = optimizer_core.GeneSpace(parameter_space, integer_genes)
+        self.preload = preload
+        self.backtest_range = backtest_range
+        self.population_size = population_size
+        self.n_generations = n_generations
+        self.mutation_rate = mutation_rate
+        self.tournament_size = tournament_size
+        self.elite_count = elite_count
+        self.stall_generations = stall_generations
+        self.min_diversity = min_diversity
+        self.warm_start_population_size = warm_start_population_size
+        self.warm_start_generations = warm_start_generations
+        self.warm_start_stall_generations = warm_start_stall_generations
+        self.lotteries = tuple(lotteries)
+        self.description = tuple(description)
+        self._files = {'best': best_file, 'checkpoint': checkpoint_file, 'log': log_file,
+                       'sensitivity': sensitivity_file, 'telemetry': telemetry_file}
+
+    def best_file(self, lottery_type):
+        return self._files['best'].format(key=self.key, lottery=lottery_type)
+
+    def checkpoint_file(self, lottery_type):
+        return self._files['checkpoint'].format(key=self.key, lottery=lottery_type)
+
+    def log_file(self, lottery_type):
+        return self._files['log'].format(key=self.key, lottery=lottery_type)
+
+    def telemetry_file(self, lottery_type):
+        return self._files['telemetry'].format(key=self.key, lottery=lottery_type)
+
+    def sensitivity_file(self, lottery_type):
+        return self._files['sensitivity'].format(key=self.key, lottery=lottery_type)
+
+    def with_fixed_genes(self, fixed):
+        """冻结部分基因后的目标副本：fixed 中的基因不再搜索，个体中按固定值补上"""
+        pruned = copy.copy(self)
+        pruned.space = optimizer_core.GeneSpace(self.parameter_space, self.integer_genes, fixed)
+        return pruned
+
+    def load_frozen_genes(self, lottery_type):
+        """基因敏感度报告中建议冻结的基因 {基因名: 取值}；没有报告时返回空字典"""
+        try:
+            with open(self.sensitivity_file(lottery_type), 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            print(f"注意: 未找到基因敏感度报告 {self.sensitivity_file(lottery_type)}，不冻结任何基因。")
+            return {}
+        return {k: v for k, v in report.get('frozen', {}).items() if k in self.parameter_space}
+
+    def initial_population(self, rng, size=None):
+        """随机初始种群（个体数 × 基因数 的矩阵）"""
+        return self.space.random(size or self.population_size, rng)
+
+    def breed(self, population, fitness, n_children, rng):
+        """锦标赛选择 + 单点交叉 + 均匀变异，由当前种群繁殖 n_children 个子代"""
+        parents1 = population[optimizer_core.tournament_select(fitness, n_children, self.tournament_size, rng)]
+        parents2 = population[optimizer_core.tournament_select(fitness, n_children, self.tournament_size, rng)]
+        children = optimizer_core.single_point_crossover(parents1, parents2, rng)
+        return optimizer_core.uniform_mutation(children, self.mutation_rate, self.space, rng)
+
+    def budget(self, warm_start=False, population_size=None, n_generations=None, stall_generations=None):
+        """本次运行的 (种群大小, 进化代数, 提前停止代数)；未指定的取目标的默认值"""
+        if population_size is None:
+            population_size = self.warm_start_population_size if warm_start else self.population_size
+        if n_generations is None:
+            n_generations = self.warm_start_generations if warm_start else self.n_generations
+        if stall_generations is None:
+            stall_generations = self.warm_start_stall_generations if warm_start else self.stall_generations
+        return population_size, n_generations, stall_generations
+
+
+def evaluate_population(objective, population, evaluator):
+    """计算种群中每个个体的适应度，返回规范化后的种群与适应度数组"""
+    print(f"正在评估{objective.name}种群适应度 (共 {len(population)} 个个体, {evaluator.workers} 个进程)...")
+    population = evaluator.canonicalize(population)
+    fitness = evaluator.evaluate(population, progress_every=10)
+    stats = evaluator.last_stats
+    print(f"  实际回测 {stats['evaluations']} 个, 缓存命中 {stats['cache_hits']} 个 ({stats['cache_hit_rate']*100:.1f}%)")
+    if stats['screened_out']:
+        print(f"  逐次减半: {stats['screened_out']} 个在短窗口被淘汰, 回测期数 {stats['backtest_periods']}/{stats['full_range_periods']}")
+    if stats['surrogate_skipped']:
+        corr = stats['surrogate_rank_corr']
+        corr_text = f"{corr:.2f}" if corr is not None else "--"
+        print(f"  代理模型: 跳过 {stats['surrogate_skipped']} 个, 秩相关 {corr_text}, 平均绝对误差 {stats['surrogate_mae']:.1f}")
+    return population, fitness
+
+
+def telemetry_record(run_id, objective, lottery_type, generation, population_size, wall_seconds, stats, workers):
+    """一代的遥测记录"""
+    evaluation_seconds = stats.get('evaluation_seconds', 0.0)
+    return {
+        'run_id': run_id,
+        'objective': objective.key,
+        'lottery_type': lottery_type,
+        'generation': generation,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'population_size': population_size,
+        'wall_seconds': wall_seconds,
+        'evaluation_seconds': evaluation_seconds,
+        'evaluations': stats['evaluations'],
+        'evaluations_per_second': stats['evaluations'] / evaluation_seconds if evaluation_seconds > 0 else 0.0,
+        'cache_hits': stats['cache_hits'],
+        'cache_hit_rate': stats['cache_hit_rate'],
+        'early_aborts': stats['screened_out'] + stats['surrogate_skipped'],
+        'backtest_periods': stats['backtest_periods'],
+        'workers': workers,
+        'worker_utilization': stats.get('worker_utilization', 0.0),
+        'peak_rss_mb': optimizer_core.peak_rss_mb(),
+        'worker_peak_rss_mb': stats.get('worker_peak_rss_mb')
+    }
+
+
+def save_best(objective, lottery_type, best_individual, fitness_log):
+    """原子写入最优策略与进化日志"""
+    optimizer_core.save_json_atomic(best_individual, objective.best_file(lottery_type))
+    optimizer_core.save_json_atomic(fitness_log, objective.log_file(lottery_type))
+
+
+def ensure_best_file(objective, lottery_type, fallback_individual):
+    """最优策略文件缺失或损坏时写入 fallback_individual，保证退出时总有有效的最优策略"""
+    try:
+        with open(objective.best_file(lottery_type), 'r', encoding='utf-8') as f:
+            if isinstance(json.load(f), dict):
+                return False
+    except (IOError, json.JSONDecodeError):
+        pass
+    optimizer_core.save_json_atomic(fallback_individual, objective.best_file(lottery_type))
+    return True
+
+
+def run_evolution(objective, lottery_type, backtest_range=None, workers=None, seed=None, population_size=None,
+                  n_generations=None, stall_generations=None, resume=False, seed_from=None, warm_start=False,
+                  successive_halving=False, surrogate=False, time_budget=None, prune_genes=False, backend='ga'):
+    """
+    对一个目标运行优化，保存最优策略与进化日志。
+    time_budget 为时间预算（秒），为空时不限时；prune_genes 为 True 时冻结敏感度报告中的低影响基因；
+    backend 为优化器后端（BACKENDS），种群大小未指定时 DE / CMA-ES 使用各自的常用默认值。
+    返回 (最优个体, 最优适应度)；没有找到有效策略时最优个体为 None。
+    """
+    start_time = time.time()
+    run_id = datetime.now().isoformat(timespec='seconds')
+    if prune_genes:
+        frozen = objective.load_frozen_genes(lottery_type)
+        if frozen:
+            objective = objective.with_fixed_genes(frozen)
+            print(f"冻结 {len(frozen)} 个低影响基因: {', '.join(frozen)}")
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的优化器后端: {backend}")
+    if backend != 'ga' and (resume or seed_from or warm_start):
+        print(f"注意: {backend} 后端不支持续跑与热启动，将从头开始。")
+        resume, seed_from, warm_start = False, None, False
+    requested_population_size = population_size
+    adapt_population = time_budget is not None and population_size is None and backend == 'ga'
+    backtest_range = backtest_range or objective.backtest_range
+    population_size, n_generations, stall_generations = objective.budget(
+        warm_start, population_size, n_generations, stall_generations)
+    space = objective.space
+    driver = None
+    if backend != 'ga':
+        # 延迟导入：optimizer_backends 依赖各优化器模块，而它们在导入时依赖本模块
+        import optimizer_backends
+        driver = optimizer_backends.create_backend(backend, space, objective, requested_population_size)
+
+    print(f"--- 开始为 {lottery_type.upper()} 数据运行{objective.name}优化 ---")
+    if driver is None:
+        print(f"种群大小: {population_size}, 进化代数: {n_generations}, 变异率: {objective.mutation_rate}")
+    else:
+        print(f"优化器后端: {backend}, 进化代数: {n_generations}")
+    if time_budget is not None:
+        print(f"时间预算: {time_budget:.0f} 秒")
+    for line in objective.description:
+        print(line)
+
+    rng = np.random.default_rng(seed)
+    evaluator = optimizer_core.FitnessEvaluator(objective.fitness_fn, lottery_type, backtest_range, space,
+                                                workers=workers, preload=objective.preload,
+                                                fidelities=optimizer_core.default_fidelities(backtest_range) if successive_halving else None,
+                                                surrogate=surrogate)
+    if time_budget is not None:
+        evaluator.deadline = start_time + time_budget - min(5.0, time_budget * TIME_BUDGET_MARGIN)
+    monitor = optimizer_core.ConvergenceMonitor(stall_generations, objective.min_diversity)
+
+    checkpoint_file = objective.checkpoint_file(lottery_type)
+    best_file = objective.best_file(lottery_type)
+    overall_best_individual = None
+    overall_best_fitness = -float('inf')
+    fitness_log = []
+    start_generation = 0
+
+    checkpoint = optimizer_core.load_checkpoint(checkpoint_file, lottery_type, backtest_range, rng) if resume else None
+    if checkpoint:
+        population = space.from_individuals(checkpoint['population'], rng)
+        overall_best_individual = checkpoint['best_individual']
+        overall_best_fitness = checkpoint['best_fitness']
+        fitness_log = checkpoint['fitness_log']
+        start_generation = checkpoint['generation']
+        monitor.restore(checkpoint['monitor'])
+    elif seed_from:
+        population = optimizer_core.seed_population(seed_from.format(lottery=lottery_type), population_size, space, rng)
+    elif warm_start:
+        population, _ = optimizer_core.warm_start_population(best_file, checkpoint_file, population_size, space, rng)
+    elif driver is None:
+        population = objective.initial_population(rng, population_size)
+
+    last_generation_seconds = 0.0
+    for gen in range(start_generation, n_generations):
+        if evaluator.deadline is not None and time.time() + last_generation_seconds > evaluator.deadline:
+            print(f"\n时间预算不足以再运行一代，停止于第 {gen} 代")
+            if fitness_log:
+                fitness_log[-1]['stop_reason'] = "时间预算用尽"
+            break
+
+        print(f"\n--- 第 {gen + 1}/{n_generations} 代{objective.name}进化 ---")
+        generation_start = time.time()
+        if driver is not None:
+            population = driver.ask(rng)
+        try:
+            evaluated, fitness = evaluate_population(objective, population, evaluator)
+        except optimizer_core.TimeBudgetExceeded as e:
+            evaluator.terminate()
+            print(f"\n第 {gen + 1} 代评估中途超过时间预算，已中断")
+            if e.fitness and max(e.fitness) > overall_best_fitness:
+                best_index = int(np.argmax(e.fitness))
+                overall_best_fitness = float(e.fitness[best_index])
+                overall_best_individual = e.individuals[best_index]
+                save_best(objective, lottery_type, overall_best_individual, fitness_log)
+            if fitness_log:
+                fitness_log[-1]['stop_reason'] = "时间预算用尽"
+            break
+        last_generation_seconds = time.time() - generation_start
+        if driver is not None:
+            driver.tell(evaluated, fitness)
+
+        best_index = int(np.argmax(fitness))
+        current_best_fitness = float(fitness[best_index])
+
+        if current_best_fitness > overall_best_fitness:
+            overall_best_fitness = current_best_fitness
+            overall_best_individual = space.to_individual(evaluated[best_index])
+            print(f"发现新的全局最优{objective.name}策略！适应度分数: {overall_best_fitness}")
+            if time_budget is not None:
+                save_best(objective, lottery_type, overall_best_individual, fitness_log)
+
+        if adapt_population and gen == start_generation and evaluator.last_stats['evaluations']:
+            # 按第一代实测的单次回测耗时，缩小种群使剩余预算至少够跑 TIME_BUDGET_MIN_GENERATIONS 代
+            seconds_per_eval = last_generation_seconds / evaluator.last_stats['evaluations']
+            remaining = evaluator.deadline - time.time()
+            affordable = int(remaining / (seconds_per_eval * TIME_BUDGET_MIN_GENERATIONS))
+            if affordable < population_size:
+                population_size = max(TIME_BUDGET_MIN_POPULATION, objective.elite_count + 1, affordable)
+                last_generation_seconds = seconds_per_eval * population_size
+                print(f"时间预算: 单次回测约 {seconds_per_eval:.2f} 秒，种群缩小为 {population_size}")
+
+        if driver is None:
+            # 精英个体原样进入下一代（其适应度已在缓存中，不会重复回测）
+            elites = optimizer_core.select_elites(evaluated, fitness, objective.elite_count)
+            population = np.vstack([elites, objective.breed(evaluated, fitness, population_size - len(elites), rng)])
+        avg_fitness = float(fitness.mean())
+        print(f"第 {gen + 1} 代总结: 平均适应度 = {avg_fitness:.2f}, 本代最高 = {current_best_fitness:.2f}, 全局最高 = {overall_best_fitness:.2f}")
+        diversity = optimizer_core.population_diversity(evaluated, space)
+        fitness_log.append({'generation': gen + 1, 'best_fitness': current_best_fitness, 'average_fitness': avg_fitness,
+                            'global_best': overall_best_fitness,
+                            'evaluations': evaluator.last_stats['evaluations'],
+                            'cache_hit_rate': evaluator.last_stats['cache_hit_rate'],
+                            'backtest_periods': evaluator.last_stats['backtest_periods'],
+                            'surrogate_skipped': evaluator.last_stats['surrogate_skipped'],
+                            'surrogate_rank_corr': evaluator.last_stats.get('surrogate_rank_corr'),
+                            'diversity': diversity, 'seconds': time.time() - generation_start})
+
+        stop_reason = monitor.update(overall_best_fitness, diversity)
+        if stop_reason:
+            fitness_log[-1]['stop_reason'] = stop_reason
+            print(f"\n提前停止于第 {gen + 1} 代: {stop_reason}")
+
+        if driver is None:
+            optimizer_core.save_checkpoint(checkpoint_file, lottery_type, backtest_range, gen + 1, population,
+                                           evaluated, fitness, space, rng, overall_best_individual,
+                                           overall_best_fitness, fitness_log, monitor,
+                                           finished=bool(stop_reason) or gen + 1 == n_generations)
+        # 每代结束即重写优化日志，仪表盘据此实时显示学习曲线
+        optimizer_core.save_json_atomic(fitness_log, objective.log_file(lottery_type))
+        optimizer_core.append_jsonl(telemetry_record(run_id, objective, lottery_type, gen + 1, len(evaluated),
+                                                     time.time() - generation_start, evaluator.last_stats,
+                                                     evaluator.workers), objective.telemetry_file(lottery_type))
+        if stop_reason:
+            break
+
+    evaluator.close()
+    print(f"进化共运行 {len(fitness_log)}/{n_generations} 代, 耗时 {time.time() - start_time:.1f} 秒")
+    print(f"适应度缓存: 共请求 {evaluator.total_requests} 次, 命中率 {evaluator.last_stats.get('total_cache_hit_rate', 0)*100:.1f}%")
+    if evaluator.surrogate is not None:
+        print(f"代理模型: 共跳过 {evaluator.total_surrogate_skipped} 次回测")
+
+    print(f"\n--- {objective.name}进化完成 ---")
+    if not overall_best_individual:
+        print(f"未能找到任何有效{objective.name}策略。")
+        if time_budget is not None and ensure_best_file(objective, lottery_type, space.to_individual(population[0])):
+            print(f"[OK] 已写入未经评分的初始策略以保证 {best_file} 有效")
+        return None, overall_best_fitness
+
+    print(f"找到的“天选{objective.name}策略”获得了 {overall_best_fitness:.2f} 的最终适应度分数。")
+    print("最优权重参数为:")
+    for key, value in overall_best_individual.items():
+        print(f"  - {key}: {value:.4f}")
+
+    try:
+        save_best(objective, lottery_type, overall_best_individual, fitness_log)
+        print(f"\n[OK] 最优{objective.name}策略已保存至: {best_file}")
+        print(f"[OK] {objective.name}优化日志已保存至: {objective.log_file(lottery_type)}")
+    except (IOError, OSError) as e:
+        print(f"错误: 保存优化结果失败 {e}")
+    return overall_best_individual, overall_best_fitness
+
+
+def main(objective, description=None):
+    """优化器脚本的命令行入口：为一个或两个彩种依次运行 run_evolution"""
+    import argparse
+    parser = optimizer_core.add_common_arguments(argparse.ArgumentParser(description=description))
+    parser.add_argument('--backend', type=str, default='ga', choices=list(BACKENDS),
+                        help='优化器后端：遗传算法 / 差分进化 / CMA-ES（后两者不支持续跑与热启动）')
+    args = parser.parse_args()
+    run_options = dict(workers=args.workers, seed=args.seed, population_size=args.population_size,
+                       n_generations=args.generations, stall_generations=args.stall_generations,
+                       resume=args.resume, seed_from=args.seed_from, warm_start=args.warm_start,
+                       successive_halving=args.successive_halving, surrogate=args.surrogate,
+                       prune_genes=args.prune_genes, backend=args.backend)
+    deadline = time.time() + args.time_budget if args.time_budget is not None else None
+
+    lotteries = [args.lottery] if args.lottery else list(objective.lotteries)
+    print("="*60)
+    print(f"{objective.name}优化器")
+    print("="*60)
+    print(f"将分别为香港和澳门数据优化{objective.name}策略..." if len(lotteries) > 1
+          else f"将为 {lotteries[0].upper()} 数据优化{objective.name}策略...")
+    for i, lottery_type in enumerate(lotteries):
+        if i:
+            print("\n" + "="*60 + "\n")
+        # 时间预算在尚未优化的彩种之间平均分配
+        time_budget = (deadline - time.time()) / (len(lotteries) - i) if deadline is not None else None
+        run_evolution(objective, lottery_type, time_budget=time_budget, **run_options)
+    print(f"\n所有{objective.name}优化任务完成。")
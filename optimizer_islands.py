@@ -0,0 +1,166 @@
+"""
+岛屿模型遗传算法：每个彩种 K 个子种群（岛屿）在各自的进程中独立进化，
+每隔 M 代沿环形拓扑迁移精英（岛屿 i 的精英替换岛屿 i+1 当代适应度最低的个体，再繁殖下一代）。
+
+- 各岛屿的随机数由 SeedSequence(seed).spawn(K) 派生，迁移是同步的
+  （发送后阻塞等待上游岛屿的移民），因此结果与进程调度无关，给定种子可完全复现；
+- 多个彩种（HK / 澳门）的岛屿同时启动，各自组成独立的迁移环；
+- 遗传算子、参数空间与适应度函数与对应的单种群优化器完全相同（optimizer_backends.OBJECTIVES）。
+"""
+import multiprocessing
+import os
+import queue
+import time
+import numpy as np
+import optimizer_core
+from optimizer_backends import OBJECTIVES
+
+ISLAND_POPULATION_SIZE = 30     # 每个岛屿的种群大小
+MIGRATION_INTERVAL = 5          # 每隔多少代迁移一次
+MIGRANT_COUNT = 2               # 每次迁出的精英个数
+DEFAULT_SEED = 42
+
+
+def default_islands(n_lotteries):
+    """按CPU核数平均分给各彩种，每个彩种至少2个岛屿"""
+    return max(2, (os.cpu_count() or 1) // max(1, n_lotteries))
+
+
+def _island_main(objective_name, lottery_type, island, seed_sequence, population_size, n_generations,
+                 migration_interval, migrant_count, inbox, outbox, results):
+    """单个岛屿进程：串行评估本岛种群，按代进化并与相邻岛屿交换精英"""
+    objective = OBJECTIVES[objective_name]
+    space = objective.space
+    rng = np.random.default_rng(seed_sequence)
+    label = f"[{lottery_type}#{island}]"
+
+    evaluator = optimizer_core.FitnessEvaluator(objective.fitness_fn, lottery_type, objective.backtest_range,
+                                                space, workers=1, preload=objective.preload)
+    population = objective.initial_population(rng, population_size)
+    best_individual, best_fitness = None, -float('inf')
+    fitness_log = []
+
+    for gen in range(n_generations):
+        evaluated = evaluator.canonicalize(population)
+        fitness = evaluator.evaluate(evaluated, progress_every=0)
+        best_index = int(np.argmax(fitness))
+        if fitness[best_index] > best_fitness:
+            best_fitness = float(fitness[best_index])
+            best_individual = space.to_individual(evaluated[best_index])
+
+        migrated = (gen + 1) % migration_interval == 0 and gen + 1 < n_generations
+        fitness_log.append({'generation': gen + 1, 'best_fitness': float(fitness[best_index]),
+                            'average_fitness': float(fitness.mean()), 'global_best': best_fitness,
+                            'evaluations': evaluator.last_stats['evaluations'],
+                            'diversity': optimizer_core.population_diversity(evaluated, space),
+                            'migrated': migrated})
+        print(f"{label} 第 {gen + 1}/{n_generations} 代: 本代最高 {fitness[best_index]:.2f}, "
+              f"岛内最高 {best_fitness:.2f}{', 已迁移' if migrated else ''}")
+
+        if migrated:
+            # 先发送再接收：所有岛屿都在同一代交换，环形拓扑上不会死锁。
+            # 移民连同适应度一起发送，在繁殖之前替换本代适应度最低的个体，参与精英保留与选择
+            migrants = optimizer_core.select_elites(evaluated, fitness, migrant_count)
+            migrant_fitness = [float(fitness[np.all(evaluated == row, axis=1).argmax()]) for row in migrants]
+            outbox.put((migrants.tolist(), migrant_fitness))
+            immigrants, immigrant_fitness = inbox.get()
+            immigrants = evaluator.canonicalize(np.array(immigrants, dtype=float))
+            # 移民的适应度已由上游岛屿回测：写入本岛缓存，作为精英保留到下一代时不再重复回测
+            evaluator.seed_cache(immigrants, immigrant_fitness)
+            worst = np.argsort(fitness, kind='stable')[:len(immigrants)]
+            evaluated, fitness = evaluated.copy(), fitness.copy()
+            evaluated[worst] = immigrants
+            fitness[worst] = immigrant_fitness
+
+        elites = optimizer_core.select_elites(evaluated, fitness, objective.elite_count)
+        population = np.vstack([elites, objective.breed(evaluated, fitness, population_size - len(elites), rng)])
+
+    evaluator.close()
+    results.put({'lottery_type': lottery_type, 'island': island, 'best_individual': best_individual,
+                 'best_fitness': best_fitness, 'fitness_log': fitness_log})
+
+
+def run_islands(objective_name, lottery_types, n_islands=None, population_size=ISLAND_POPULATION_SIZE,
+                n_generations=None, migration_interval=MIGRATION_INTERVAL, migrant_count=MIGRANT_COUNT,
+                seed=DEFAULT_SEED):
+    """
+    为每个彩种启动 n_islands 个岛屿进程并等待全部完成。
+    返回 {彩种: {'best_individual', 'best_fitness', 'islands': [按岛屿编号排列的结果]}}。
+    """
+    objective = OBJECTIVES[objective_name]
+    n_islands = n_islands or default_islands(len(lottery_types))
+    n_generations = n_generations or objective.n_generations
+    migrant_count = min(migrant_count, population_size - objective.elite_count)
+
+    results = multiprocessing.Queue()
+    processes = []
+    for lottery_index, lottery_type in enumerate(lottery_types):
+        # 每个彩种一个迁移环：岛屿 i 发往 queues[i]，从 queues[i-1] 接收
+        queues = [multiprocessing.Queue() for _ in range(n_islands)]
+        seeds = np.random.SeedSequence([seed, lottery_index]).spawn(n_islands)
+        for island in range(n_islands):
+            processes.append(multiprocessing.Process(
+                target=_island_main,
+                args=(objective_name, lottery_type, island, seeds[island], population_size, n_generations,
+                      migration_interval, migrant_count, queues[island - 1], queues[island], results)))
+    for process in processes:
+        process.start()
+
+    # 先取完结果再 join，避免子进程因结果队列未被读取而无法退出
+    collected = []
+    while len(collected) < len(processes):
+        try:
+            collected.append(results.get(timeout=1))
+        except queue.Empty:
+            failed = [p for p in processes if p.exitcode not in (None, 0)]
+            if failed:
+                for process in processes:
+                    process.terminate()
+                raise RuntimeError(f"{len(failed)} 个岛屿进程异常退出 (exitcode={failed[0].exitcode})")
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for lottery_type in lottery_types:
+        islands = sorted((r for r in collected if r['lottery_type'] == lottery_type), key=lambda r: r['island'])
+        best = max(islands, key=lambda r: r['best_fitness'])
+        summary[lottery_type] = {'best_individual': best['best_individual'], 'best_fitness': best['best_fitness'],
+                                 'best_island': best['island'], 'islands': islands}
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="岛屿模型遗传算法：多进程子种群并行进化并定期迁移精英")
+    parser.add_argument('--objective', type=str, default='v7', choices=list(OBJECTIVES.keys()))
+    parser.add_argument('--lottery', type=str, default=None, choices=['macau', 'hk'], help='只优化一个彩种（默认两个同时优化）')
+    parser.add_argument('--islands', type=int, default=None, help='每个彩种的岛屿数（默认按CPU核数平分）')
+    parser.add_argument('--population-size', type=int, default=ISLAND_POPULATION_SIZE, help='每个岛屿的种群大小')
+    parser.add_argument('--generations', type=int, default=None, help='进化代数（默认与单种群优化器相同）')
+    parser.add_argument('--migration-interval', type=int, default=MIGRATION_INTERVAL, help='每隔多少代迁移一次')
+    parser.add_argument('--migrants', type=int, default=MIGRANT_COUNT, help='每次迁出的精英个数')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='随机种子，用于复现优化结果')
+    args = parser.parse_args()
+
+    objective = OBJECTIVES[args.objective]
+    lotteries = [args.lottery] if args.lottery else ['macau', 'hk']
+    start = time.time()
+    summary = run_islands(args.objective, lotteries, args.islands, args.population_size, args.generations,
+                          args.migration_interval, args.migrants, args.seed)
+    print(f"\n岛屿模型进化完成，耗时 {time.time() - start:.1f} 秒")
+
+    for lottery_type, result in summary.items():
+        print(f"\n{lottery_type.upper()} {objective.name}: 最优适应度 {result['best_fitness']} "
+              f"(岛屿 {result['best_island']})")
+        for island in result['islands']:
+            print(f"  岛屿 {island['island']}: {island['best_fitness']}")
+
+        best_file = objective.best_file(lottery_type)
+        optimizer_core.save_json_atomic(result['best_individual'], best_file)
+        log_file = f'{lottery_type}_{args.objective}_island_log.json'
+        optimizer_core.save_json_atomic({'seed': args.seed, 'best_fitness': result['best_fitness'],
+                                         'best_island': result['best_island'],
+                                         'islands': [{'island': r['island'], 'best_fitness': r['best_fitness'],
+                                                      'fitness_log': r['fitness_log']} for r in result['islands']]},
+                                        log_file)
+        print(f"[OK] 最优策略已保存至: {best_file}, 进化日志已保存至: {log_file}")
@@ -0,0 +1,221 @@
+"""
+V7 特码 Pareto 多目标优化（NSGA-II）：生肖命中 vs 特码数字命中
+
+run_special_backtest_v7 把生肖命中(+100)、数字命中(+500)与未命中(-50)合成一个分数，
+换一种取舍就要重新优化。这里分别记录两个目标，一次运行得到整条 Pareto 前沿：
+- 非支配排序 + 拥挤距离的 NSGA-II 环境选择（父代与子代合并后取前 N 个）；
+- 二元锦标赛按 (前沿层级, 拥挤距离) 选择父代，交叉与变异与 V7 优化器相同；
+- 评估经由 FitnessEvaluator（进程池 + 缓存），参数空间为 optimizer_special_v7 的空间。
+
+前沿保存在 {lottery}_v7_pareto_front.json；之后用 --pick 按目标权重从已保存的前沿中
+选出一个策略写入 best_special_strategy_{lottery}_v7.json，无需重新优化。
+"""
+import json
+import time
+import numpy as np
+import backtester_v7
+import optimizer_core
+import optimizer_special_v7
+
+OBJECTIVE_NAMES = ('zodiac_hits', 'number_hits')
+# 与 V7 单目标评分等价的权重：100*生肖 + 500*数字 - 50*(期数 - 数字)，期数相同时只差常数
+V7_SCORE_WEIGHTS = (100.0, 550.0)
+
+
+def front_file(lottery_type):
+    return f'{lottery_type}_v7_pareto_front.json'
+
+
+def non_dominated_sort(objectives):
+    """快速非支配排序：返回前沿列表（每个前沿为行下标列表），第一个为 Pareto 前沿"""
+    n = len(objectives)
+    better_eq = np.all(objectives[:, None, :] >= objectives[None, :, :], axis=2)
+    strictly = np.any(objectives[:, None, :] > objectives[None, :, :], axis=2)
+    dominance = better_eq & strictly            # dominance[i, j]: i 支配 j
+    dominated_count = dominance.sum(axis=0)
+    fronts = []
+    current = [i for i in range(n) if dominated_count[i] == 0]
+    while current:
+        fronts.append(current)
+        following = []
+        for i in current:
+            for j in np.flatnonzero(dominance[i]):
+                dominated_count[j] -= 1
+                if dominated_count[j] == 0:
+                    following.append(int(j))
+        current = sorted(following)
+    return fronts
+
+
+def crowding_distance(objectives):
+    """一个前沿内各个体的拥挤距离（边界个体为无穷大）"""
+    n, m = objectives.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for k in range(m):
+        order = np.argsort(objectives[:, k], kind='stable')
+        values = objectives[order, k]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        span = values[-1] - values[0]
+        if span > 0:
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
+
+
+def rank_population(objectives):
+    """每个个体的 (前沿层级, 拥挤距离)"""
+    rank = np.zeros(len(objectives), dtype=int)
+    crowding = np.zeros(len(objectives))
+    for level, front in enumerate(non_dominated_sort(objectives)):
+        rank[front] = level
+        crowding[front] = crowding_distance(objectives[front])
+    return rank, crowding
+
+
+def environmental_selection(population, objectives, n):
+    """NSGA-II 环境选择：按前沿逐层取满 n 个，最后一层按拥挤距离从大到小截取"""
+    selected = []
+    for front in non_dominated_sort(objectives):
+        if len(selected) + len(front) <= n:
+            selected.extend(front)
+            continue
+        distance = crowding_distance(objectives[front])
+        order = np.argsort(-distance, kind='stable')
+        selected.extend(front[i] for i in order[:n - len(selected)])
+        break
+    return population[selected], objectives[selected]
+
+
+def crowded_tournament(rank, crowding, n, rng):
+    """二元锦标赛：层级低者胜，同层拥挤距离大者胜"""
+    a = rng.integers(len(rank), size=n)
+    b = rng.integers(len(rank), size=n)
+    a_wins = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (crowding[a] >= crowding[b]))
+    return np.where(a_wins, a, b)
+
+
+def unique_rows(population, objectives):
+    """去掉规范化后重复的基因组，避免同一个策略占据前沿的多个位置"""
+    _, first = np.unique(population, axis=0, return_index=True)
+    first = np.sort(first)
+    return population[first], objectives[first]
+
+
+def run_pareto(lottery_type, population_size=None, n_generations=None, workers=None, seed=None, prune_genes=False):
+    """运行 NSGA-II，返回 Pareto 前沿（按生肖命中降序）与进化日志"""
+    objective = optimizer_special_v7.OBJECTIVE
+    if prune_genes:
+        objective = objective.with_fixed_genes(objective.load_frozen_genes(lottery_type))
+    space = objective.space
+    population_size = population_size or objective.population_size
+    n_generations = n_generations or objective.n_generations
+    rng = np.random.default_rng(seed)
+
+    print(f"--- 开始为 {lottery_type.upper()} 运行V7特码 Pareto 多目标优化 (NSGA-II) ---")
+    print(f"目标: {' / '.join(OBJECTIVE_NAMES)}, 种群大小: {population_size}, 进化代数: {n_generations}")
+
+    fitness_log = []
+    with optimizer_core.FitnessEvaluator(backtester_v7.run_special_backtest_v7_objectives, lottery_type,
+                                         objective.backtest_range, space, workers=workers,
+                                         preload=objective.preload) as evaluator:
+        population = evaluator.canonicalize(objective.initial_population(rng, population_size))
+        results = evaluator.evaluate(population, progress_every=0)
+        for gen in range(n_generations):
+            rank, crowding = rank_population(results[:, :2])
+            parents1 = population[crowded_tournament(rank, crowding, population_size, rng)]
+            parents2 = population[crowded_tournament(rank, crowding, population_size, rng)]
+            children = optimizer_core.uniform_mutation(
+                optimizer_core.single_point_crossover(parents1, parents2, rng), objective.mutation_rate, space, rng)
+            children = evaluator.canonicalize(children)
+            child_results = evaluator.evaluate(children, progress_every=0)
+
+            merged, merged_results = unique_rows(np.vstack([population, children]), np.vstack([results, child_results]))
+            population, results = environmental_selection(merged, merged_results, population_size)
+
+            front = non_dominated_sort(results[:, :2])[0]
+            zodiac, number = results[front, 0], results[front, 1]
+            fitness_log.append({'generation': gen + 1, 'front_size': len(front),
+                                'max_zodiac_hits': float(zodiac.max()), 'max_number_hits': float(number.max()),
+                                'evaluations': evaluator.last_stats['evaluations']})
+            print(f"第 {gen + 1}/{n_generations} 代: 前沿 {len(front)} 个策略, "
+                  f"生肖命中 {zodiac.min():.0f}-{zodiac.max():.0f}, 数字命中 {number.min():.0f}-{number.max():.0f}, "
+                  f"实际回测 {evaluator.last_stats['evaluations']} 个")
+
+    front = non_dominated_sort(results[:, :2])[0]
+    points, seen = [], set()
+    for i in front:
+        zodiac_hits, number_hits, periods = (int(v) for v in results[i])
+        # 目标值相同的策略只保留一个
+        if (zodiac_hits, number_hits) in seen:
+            continue
+        seen.add((zodiac_hits, number_hits))
+        points.append({
+            'individual': space.to_individual(population[i]),
+            'zodiac_hits': zodiac_hits,
+            'number_hits': number_hits,
+            'periods': periods,
+            'zodiac_rate': zodiac_hits / periods if periods else 0.0,
+            'number_rate': number_hits / periods if periods else 0.0,
+            'v7_score': 100 * zodiac_hits + 500 * number_hits - 50 * (periods - number_hits)
+        })
+    points.sort(key=lambda p: (-p['zodiac_hits'], -p['number_hits']))
+    return points, fitness_log
+
+
+def pick_point(front, zodiac_weight, number_weight):
+    """按 zodiac_weight * 生肖命中 + number_weight * 数字命中 从前沿中选出得分最高的点"""
+    return max(front, key=lambda p: zodiac_weight * p['zodiac_hits'] + number_weight * p['number_hits'])
+
+
+def display_front(lottery_type, front):
+    print(f"\n{'='*70}")
+    print(f"V7特码 Pareto 前沿 - {lottery_type.upper()}（共 {len(front)} 个策略）")
+    print(f"{'='*70}")
+    print(f"\n  {'序号':<6} {'生肖命中':<12} {'数字命中':<12} {'回测期数':<10} {'V7得分'}")
+    print(f"  {'-'*56}")
+    for i, p in enumerate(front):
+        print(f"  {i:<6} {p['zodiac_hits']:<4} ({p['zodiac_rate']*100:>4.1f}%) {p['number_hits']:<4} "
+              f"({p['number_rate']*100:>4.1f}%) {p['periods']:<10} {p['v7_score']}")
+    print(f"\n{'='*70}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="V7特码 Pareto 多目标优化（生肖命中 vs 数字命中）")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--population-size', type=int, default=None, help='种群大小（默认与V7优化器相同）')
+    parser.add_argument('--generations', type=int, default=None, help='进化代数（默认与V7优化器相同）')
+    parser.add_argument('--workers', type=int, default=None, help='并行回测的工作进程数')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子，用于复现优化结果')
+    parser.add_argument('--prune-genes', action='store_true', help='冻结基因敏感度报告中的低影响基因')
+    parser.add_argument('--pick', type=float, nargs=2, default=None, metavar=('ZODIAC_WEIGHT', 'NUMBER_WEIGHT'),
+                        help='不重新优化，按目标权重从已保存的前沿中选出策略并写入V7最优策略文件')
+    args = parser.parse_args()
+
+    output_file = front_file(args.lottery)
+    if args.pick is None:
+        start = time.time()
+        front, fitness_log = run_pareto(args.lottery, args.population_size, args.generations, args.workers,
+                                        args.seed, args.prune_genes)
+        print(f"耗时: {time.time() - start:.1f} 秒")
+        optimizer_core.save_json_atomic({'lottery_type': args.lottery, 'objectives': list(OBJECTIVE_NAMES),
+                                         'front': front, 'fitness_log': fitness_log}, output_file)
+        print(f"[OK] Pareto 前沿已保存至: {output_file}")
+        display_front(args.lottery, front)
+        print(f"用 --pick 生肖权重 数字权重 选择策略，例如与V7评分等价的 --pick {V7_SCORE_WEIGHTS[0]:.0f} {V7_SCORE_WEIGHTS[1]:.0f}")
+    else:
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                front = json.load(f)['front']
+        except (IOError, json.JSONDecodeError, KeyError):
+            front = []
+        if not front:
+            print(f"错误: 未找到已保存的 Pareto 前沿 {output_file}，请先不带 --pick 运行一次。")
+        else:
+            point = pick_point(front, *args.pick)
+            best_file = optimizer_special_v7.OBJECTIVE.best_file(args.lottery)
+            optimizer_core.save_json_atomic(point['individual'], best_file)
+            print(f"选中策略: 生肖命中 {point['zodiac_hits']}/{point['periods']}, "
+                  f"数字命中 {point['number_hits']}/{point['periods']}, V7得分 {point['v7_score']}")
+            print(f"[OK] 已写入: {best_file}")
@@ -0,0 +1,144 @@
+"""
+优化任务的后台运行与实时进度
+
+仪表盘不再用阻塞的 subprocess.run 等待优化器结束，而是：
+- start_script 以 Popen 启动脚本，输出直接写入 optimizer_logs/ 下的文件，立即返回
+  （仪表盘经由 job_queue 的工作进程调用）；
+- 优化器每完成一代就重写一次 {lottery} 的优化日志（见 optimizer_engine），
+  job_progress 读取输出文件与日志，给出当前彩种、代数、本次运行的学习曲线与预计剩余时间。
+读取只依赖文件，仪表盘可以在任意一次重跑中轮询，不需要常驻线程。
+"""
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from optimizer_backends import OBJECTIVES
+from optimizer_scheduler import GENERATION_PATTERN, LOG_DIR
+
+LOTTERY_PATTERN = re.compile(r'开始为 (\w+) 数据运行')
+ETA_WINDOW = 5              # 用最近多少代的平均耗时估计剩余时间
+OUTPUT_TAIL_LINES = 30      # 默认显示的输出末尾行数
+STOP_GRACE_SECONDS = 10     # 取消时先发终止信号，超过该秒数仍未退出则强制结束
+
+
+def start_script(script, args=(), label=None, output_name=None):
+    """在后台启动一个脚本，输出写入 LOG_DIR 下的文件，返回任务信息（含 Popen 对象）"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    output_file = os.path.join(LOG_DIR, output_name or f"{os.path.splitext(script)[0]}.log")
+    command = [sys.executable, '-u', script] + list(args)
+    # 独立的进程组：取消时连同它启动的优化器子进程与进程池一起终止（见 stop_script）
+    if os.name == 'nt':
+        group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group = {'start_new_session': True}
+    with open(output_file, 'w', encoding='utf-8') as output:
+        process = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, **group)
+    return {
+        'script': script,
+        'label': label or script,
+        'command': command,
+        'output_file': output_file,
+        'start_time': time.time(),
+        'process': process
+    }
+
+
+def kill_process_group(pid):
+    """强制结束以 pid 为首的整个进程组（start_script 启动的脚本即为组长）；进程组已不存在时什么也不做"""
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/T', '/F', '/PID', str(pid)], capture_output=True)
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def stop_script(process, grace_seconds=STOP_GRACE_SECONDS):
+    """
+    终止 start_script 启动的脚本及其整个进程组（子脚本、进程池工作进程）：
+    先发送终止信号，grace_seconds 秒后仍未退出则强制结束，最后清理进程组中残留的进程。
+    """
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/T', '/PID', str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    try:
+        process.wait(grace_seconds)
+    except subprocess.TimeoutExpired:
+        pass
+    kill_process_group(process.pid)
+    process.wait()
+
+
+def read_output(job, max_lines=OUTPUT_TAIL_LINES):
+    """任务输出的最后 max_lines 行"""
+    try:
+        with open(job['output_file'], 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except IOError:
+        return ''
+    return '\n'.join(lines[-max_lines:]) if max_lines else '\n'.join(lines)
+
+
+def _read_log(path, since):
+    """读取 since 之后写入的优化日志；文件仍是上一次运行留下的则返回空列表"""
+    try:
+        if os.path.getmtime(path) < since:
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, OSError, json.JSONDecodeError):
+        return []
+
+
+def job_progress(job):
+    """
+    任务当前进度：returncode（运行中为 None）、elapsed、当前彩种与代数、
+    当前彩种本次运行的 fitness_log，以及按最近几代耗时估计的剩余秒数 eta（无法估计时为 None）。
+    job 需要 output_file 与 start_time；优化任务另有 objective 与可选的 lotteries（默认为该目标的全部彩种）；
+    returncode 取自 job['process']，没有 Popen 对象时取 job['returncode']。
+    """
+    returncode = job['process'].poll() if 'process' in job else job.get('returncode')
+    progress = {'returncode': returncode, 'elapsed': time.time() - job['start_time'],
+                'lottery_type': None, 'lottery_index': 0, 'generation': 0, 'n_generations': None,
+                'fitness_log': [], 'eta': None}
+    if 'objective' not in job:
+        return progress
+
+    try:
+        with open(job['output_file'], 'r', encoding='utf-8', errors='replace') as f:
+            output = f.read()
+    except IOError:
+        output = ''
+    started = LOTTERY_PATTERN.findall(output)
+    if started:
+        progress['lottery_type'] = started[-1].lower()
+        progress['lottery_index'] = len(started) - 1
+        # 只看当前彩种那一段输出中的代数
+        generations = GENERATION_PATTERN.findall(output[output.rfind('开始为'):])
+        if generations:
+            progress['generation'], progress['n_generations'] = (int(v) for v in generations[-1])
+
+    if progress['lottery_type'] is None:
+        return progress
+    log_file = OBJECTIVES[job['objective']].log_file(progress['lottery_type'])
+    progress['fitness_log'] = _read_log(log_file, job['start_time'])
+
+    lotteries = job.get('lotteries') or OBJECTIVES[job['objective']].lotteries
+    if returncode is None and progress['n_generations']:
+        recent = [entry['seconds'] for entry in progress['fitness_log'][-ETA_WINDOW:] if 'seconds' in entry]
+        if recent:
+            per_generation = sum(recent) / len(recent)
+            done = progress['fitness_log'][-1]['generation']
+            remaining = max(0, progress['n_generations'] - done)
+            # 后面还要优化的彩种按相同的每代耗时估计（提前停止时实际会更短）
+            remaining += (len(lotteries) - 1 - progress['lottery_index']) * progress['n_generations']
+            progress['eta'] = per_generation * remaining
+    return progress
@@ -0,0 +1,158 @@
+"""
+优化任务调度器：把 (V6通用 / V6特码 / V7特码) × (香港 / 澳门) 的任务矩阵
+在给定的CPU核数预算内并发运行。
+
+- 同时运行 min(核数预算, 任务数) 个任务，核数在运行中的任务之间平均分配
+  （作为各优化器的 --workers），预计耗时最长的任务先启动并分到余下的核；
+- 核数只在任务启动时分配：--workers 在优化器子进程启动后无法更改，
+  某个任务结束后，它占用的核只交给排队中的任务，不会补给仍在运行的任务；
+  排队的任务少于空闲的份额时，空闲的核合并后平均分给这些任务；
+- 每个任务是一个独立的优化器子进程，输出写入 optimizer_logs/ 下的日志文件，
+  调度器从输出中解析当前代数，定期打印每个任务的进度。
+"""
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+OBJECTIVE_SCRIPTS = {
+    'general': ('optimizer.py', 'V6通用'),
+    'special': ('optimizer_special.py', 'V6特码'),
+    'v7': ('optimizer_special_v7.py', 'V7特码')
+}
+LOTTERIES = ('hk', 'macau')
+# 预计耗时从长到短（V7 回测期数与种群最大），长任务先启动
+JOB_ORDER = ('v7', 'special', 'general')
+
+LOG_DIR = 'optimizer_logs'
+PROGRESS_INTERVAL = 10      # 打印进度的间隔（秒）
+GENERATION_PATTERN = re.compile(r'第 (\d+)/(\d+) 代')
+
+
+def default_cpu_budget():
+    return os.cpu_count() or 1
+
+
+def job_matrix(objectives=None, lotteries=LOTTERIES):
+    """全部 (目标, 彩种) 组合，按预计耗时从长到短排列"""
+    objectives = objectives or JOB_ORDER
+    ordered = [o for o in JOB_ORDER if o in objectives]
+    return [(objective, lottery) for objective in ordered for lottery in lotteries]
+
+
+def allocate_workers(cpu_budget, n_jobs):
+    """把 cpu_budget 个核平均分给 n_jobs 个同时运行的任务，余数给排在前面的任务"""
+    n_jobs = max(1, n_jobs)
+    base, extra = divmod(max(cpu_budget, n_jobs), n_jobs)
+    return [base + (1 if i < extra else 0) for i in range(n_jobs)]
+
+
+def _follow_output(job):
+    """逐行读取子进程输出：写入日志文件并更新任务的当前代数"""
+    with open(job['log_file'], 'w', encoding='utf-8') as log:
+        for line in job['process'].stdout:
+            log.write(line)
+            log.flush()
+            match = GENERATION_PATTERN.search(line)
+            if match:
+                job['generation'], job['n_generations'] = int(match.group(1)), int(match.group(2))
+
+
+def _start_job(objective, lottery_type, workers, extra_args):
+    script, name = OBJECTIVE_SCRIPTS[objective]
+    command = [sys.executable, '-u', script, '--lottery', lottery_type, '--workers', str(workers)] + list(extra_args)
+    job = {
+        'objective': objective,
+        'lottery_type': lottery_type,
+        'label': f"{lottery_type.upper()} {name}",
+        'workers': workers,
+        'command': command,
+        'log_file': os.path.join(LOG_DIR, f'{lottery_type}_{objective}.log'),
+        'generation': 0,
+        'n_generations': None,
+        'start_time': time.time(),
+        'seconds': None,
+        'returncode': None
+    }
+    job['process'] = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                      text=True, encoding='utf-8', errors='replace')
+    job['reader'] = threading.Thread(target=_follow_output, args=(job,), daemon=True)
+    job['reader'].start()
+    print(f"[启动] {job['label']} ({workers} 个进程), 日志: {job['log_file']}")
+    return job
+
+
+def _format_progress(job):
+    elapsed = time.time() - job['start_time']
+    if job['n_generations']:
+        return f"{job['label']}: 第 {job['generation']}/{job['n_generations']} 代, {elapsed:.0f} 秒"
+    return f"{job['label']}: 启动中, {elapsed:.0f} 秒"
+
+
+def run_jobs(jobs, cpu_budget=None, extra_args=(), progress_interval=PROGRESS_INTERVAL):
+    """
+    在 cpu_budget 个核内并发运行 (目标, 彩种) 任务列表，全部结束后返回每个任务的结果
+    （按传入顺序，含 returncode、耗时、日志文件）。extra_args 会传给每个优化器。
+    每个任务的核数在启动时确定，运行中不再调整；结束任务释放的核只分给之后启动的任务。
+    """
+    cpu_budget = cpu_budget or default_cpu_budget()
+    os.makedirs(LOG_DIR, exist_ok=True)
+    pending = list(jobs)
+    concurrency = min(cpu_budget, len(pending))
+    slots = allocate_workers(cpu_budget, concurrency)
+    running, finished = [], []
+    start = time.time()
+    last_report = start
+
+    while pending or running:
+        if pending and len(slots) > len(pending):
+            # 剩下的任务不够用完空闲的核：合并后重新平均分配，避免核数闲置
+            slots = allocate_workers(sum(slots), len(pending))
+        while pending and slots:
+            objective, lottery_type = pending.pop(0)
+            running.append(_start_job(objective, lottery_type, slots.pop(0), extra_args))
+
+        time.sleep(0.5)
+        for job in list(running):
+            returncode = job['process'].poll()
+            if returncode is None:
+                continue
+            job['reader'].join()
+            job['returncode'] = returncode
+            job['seconds'] = time.time() - job['start_time']
+            status = "完成" if returncode == 0 else f"失败 (退出码 {returncode})"
+            print(f"[{status}] {job['label']}, 耗时 {job['seconds']:.0f} 秒")
+            running.remove(job)
+            finished.append(job)
+            slots.append(job['workers'])
+
+        if running and time.time() - last_report >= progress_interval:
+            last_report = time.time()
+            print(f"--- 进度 ({last_report - start:.0f} 秒, {len(finished)}/{len(jobs)} 完成) ---")
+            for job in running:
+                print(f"  {_format_progress(job)}")
+
+    print(f"全部 {len(jobs)} 个优化任务结束，总耗时 {time.time() - start:.0f} 秒")
+    order = {(objective, lottery_type): i for i, (objective, lottery_type) in enumerate(jobs)}
+    finished.sort(key=lambda job: order[(job['objective'], job['lottery_type'])])
+    return [{key: job[key] for key in ('objective', 'lottery_type', 'label', 'workers', 'returncode',
+                                       'seconds', 'log_file')} for job in finished]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="在CPU核数预算内并发运行全部优化任务")
+    parser.add_argument('--objectives', nargs='+', default=list(JOB_ORDER), choices=list(OBJECTIVE_SCRIPTS.keys()))
+    parser.add_argument('--lotteries', nargs='+', default=list(LOTTERIES), choices=list(LOTTERIES))
+    parser.add_argument('--cpu-budget', type=int, default=None, help='可用的CPU核数（默认全部）')
+    parser.add_argument('--warm-start', action='store_true', help='各优化器以热启动模式运行')
+    args, optimizer_args = parser.parse_known_args()
+
+    extra_args = (['--warm-start'] if args.warm_start else []) + optimizer_args
+    results = run_jobs(job_matrix(args.objectives, args.lotteries), args.cpu_budget, extra_args)
+    failed = [r for r in results if r['returncode'] != 0]
+    for r in failed:
+        print(f"错误: {r['label']} 失败，详见 {r['log_file']}")
+    sys.exit(1 if failed else 0)
@@ -1,13 +1,22 @@
-import random
-import json
+"""
+V6 特码策略优化器：在最近50期上用遗传算法优化特码共振评分的权重
+
+进化流程由 optimizer_engine 统一实现，本模块只定义目标函数、参数空间与遗传算法参数。
+"""
 import backtester
-import operator
+import optimizer_engine
 
 # --- GENETIC ALGORITHM PARAMETERS ---
 POPULATION_SIZE = 60       # 种群大小
 N_GENERATIONS = 50         # 进化代数
 MUTATION_RATE = 0.2        # 变异率
 TOURNAMENT_SIZE = 5        # 锦标赛大小
+ELITE_COUNT = 2            # 每代原样保留的精英个体数
+STALL_GENERATIONS = 12     # 全局最优连续多少代无提升即提前停止
+MIN_DIVERSITY = 0.01       # 种群多样性低于该值视为收敛
+WARM_START_POPULATION_SIZE = 30   # 热启动（每日重新优化）的种群大小
+WARM_START_GENERATIONS = 8        # 热启动的进化代数
+WARM_START_STALL_GENERATIONS = 3  # 热启动时全局最优连续多少代无提升即停止
 
 # --- V6 参数空间：全域共振与多维狙击 ---
 PARAMETER_SPACE = {
@@ -24,124 +33,29 @@ PARAMETER_SPACE = {
     'special_tail_continuity': (0.0, 4.0) # 尾数惯性：上期尾数对下期尾数的影响
 }
 
-# --- GENETIC ALGORITHM IMPLEMENTATION ---
-
-def create_individual():
-    """创建一个包含随机权重的个体"""
-    individual = {}
-    for key, (min_val, max_val) in PARAMETER_SPACE.items():
-        individual[key] = random.uniform(min_val, max_val)
-    return individual
-
-def create_initial_population():
-    """创建初始种群"""
-    return [create_individual() for _ in range(POPULATION_SIZE)]
+# 分析器中按 int() 使用的基因，规范化时截断取整
+INTEGER_GENES = ('special_lookback',)
 
-def calculate_population_fitness(population, lottery_type, backtest_range):
-    """计算种群中每个个体的适应度"""
-    population_with_fitness = []
-    print(f"正在评估特码种群适应度 (共 {len(population)} 个个体)...")
-    for i, individual in enumerate(population):
-        fitness = backtester.run_special_backtest(lottery_type, individual, backtest_range)
-        population_with_fitness.append((individual, fitness))
-    return population_with_fitness
+OBJECTIVE = optimizer_engine.Objective(
+    'special', '特码', backtester.run_special_backtest, PARAMETER_SPACE, INTEGER_GENES,
+    preload=backtester.preload_history, backtest_range=50,
+    population_size=POPULATION_SIZE, n_generations=N_GENERATIONS, mutation_rate=MUTATION_RATE,
+    tournament_size=TOURNAMENT_SIZE, elite_count=ELITE_COUNT,
+    stall_generations=STALL_GENERATIONS, min_diversity=MIN_DIVERSITY,
+    warm_start_population_size=WARM_START_POPULATION_SIZE, warm_start_generations=WARM_START_GENERATIONS,
+    warm_start_stall_generations=WARM_START_STALL_GENERATIONS,
+    best_file='best_special_strategy_{lottery}.json', checkpoint_file='{lottery}_special_optimizer_checkpoint.json',
+    log_file='{lottery}_special_optimizer_log.json', lotteries=('hk', 'macau'))
 
-def selection(population_with_fitness):
-    """锦标赛选择法"""
-    tournament = random.sample(population_with_fitness, TOURNAMENT_SIZE)
-    return max(tournament, key=operator.itemgetter(1))[0]
-
-def crossover(parent1, parent2):
-    """单点交叉"""
-    child = {}
-    keys = list(PARAMETER_SPACE.keys())
-    if len(keys) > 1:
-        crossover_point = random.randint(1, len(keys) - 1)
-    else: 
-        crossover_point = 1
-    
-    for i, key in enumerate(keys):
-        if i < crossover_point:
-            child[key] = parent1[key]
-        else:
-            child[key] = parent2[key]
-    return child
-
-def mutate(individual):
-    """基因变异"""
-    for key in individual:
-        if random.random() < MUTATION_RATE:
-            min_val, max_val = PARAMETER_SPACE[key]
-            individual[key] = random.uniform(min_val, max_val)
-    return individual
-
-def run_evolution(lottery_type, backtest_range):
-    """运行特码策略的遗传算法优化"""
-    print(f"--- V6: 开始为 {lottery_type.upper()} 特码数据运行共振优化 ---")
-    print(f"种群大小: {POPULATION_SIZE}, 进化代数: {N_GENERATIONS}, 变异率: {MUTATION_RATE}")
-
-    population = create_initial_population()
-    overall_best_individual = None
-    overall_best_fitness = -float('inf')
-    
-    fitness_log = []
+SPACE = OBJECTIVE.space
+create_initial_population = OBJECTIVE.initial_population
+breed = OBJECTIVE.breed
 
-    for gen in range(N_GENERATIONS):
-        print(f"\n--- 第 {gen + 1}/{N_GENERATIONS} 代特码进化 ---")
-        
-        population_with_fitness = calculate_population_fitness(population, lottery_type, backtest_range)
-        
-        current_best_individual, current_best_fitness = max(population_with_fitness, key=operator.itemgetter(1))
-        
-        if current_best_fitness > overall_best_fitness:
-            overall_best_fitness = current_best_fitness
-            overall_best_individual = current_best_individual
-            print(f"发现新的全局最优特码策略！适应度分数: {overall_best_fitness}")
 
-        new_population = []
-        for _ in range(POPULATION_SIZE):
-            parent1 = selection(population_with_fitness)
-            parent2 = selection(population_with_fitness)
-            child = crossover(parent1, parent2)
-            child = mutate(child)
-            new_population.append(child)
-        
-        population = new_population
-        
-        avg_fitness = sum(fit for ind, fit in population_with_fitness) / POPULATION_SIZE
-        print(f"第 {gen + 1} 代特码总结: 平均适应度 = {avg_fitness:.2f}, 本代最高 = {current_best_fitness:.2f}, 全局最高 = {overall_best_fitness:.2f}")
-        
-        fitness_log.append({'generation': gen + 1, 'best_fitness': current_best_fitness, 'average_fitness': avg_fitness})
+def run_evolution(lottery_type, backtest_range=50, **options):
+    """运行特码策略的遗传算法优化（参数见 optimizer_engine.run_evolution）"""
+    return optimizer_engine.run_evolution(OBJECTIVE, lottery_type, backtest_range, **options)
 
-    print("\n--- 特码进化完成 ---")
-    if overall_best_individual:
-        print(f"找到的“天选特码策略”获得了 {overall_best_fitness:.2f} 的最终适应度分数。")
-        print("最优权重参数为:")
-        for key, value in overall_best_individual.items():
-            print(f"  - {key}: {value:.4f}")
-        
-        output_filename = f'best_special_strategy_{lottery_type}.json' 
-        try:
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(overall_best_individual, f, indent=2)
-            print(f"\n最优特码策略已保存至: {output_filename}")
-        except Exception as e:
-            print(f"错误: 保存最优特码策略失败。 {e}")
-            
-        log_filename = f'{lottery_type}_special_optimizer_log.json' 
-        try:
-            with open(log_filename, 'w', encoding='utf-8') as f:
-                json.dump(fitness_log, f, indent=2)
-            print(f"特码优化过程日志已保存至: {log_filename}")
-        except Exception as e:
-            print(f"错误: 保存特码优化日志失败。 {e}")
-            
-    else:
-        print("未能找到任何有效特码策略。")
 
 if __name__ == "__main__":
-    print("将分别为香港和澳门数据优化特码策略...")
-    run_evolution('hk', backtest_range=50)
-    print("\n" + "="*50 + "\n")
-    run_evolution('macau', backtest_range=50)
-    print("\n所有特码优化任务完成。")
+    optimizer_engine.main(OBJECTIVE, __doc__)
@@ -4,10 +4,12 @@ import subprocess
 import sys
 from datetime import datetime
 import locale
+import optimizer_scheduler
 
 # --- Configuration ---
 PREDICTION_DIR = 'predictions'
 REVIEW_LOG_FILE = 'review_log.json'
+OPTIMIZE_TIME_BUDGET = 1800     # 每个优化任务的时间预算（秒），保证在下一期开奖前完成
 LOTTERY_CONFIG = {
     'hk': {
         'data_file': 'HK2025_lottery_data_complete.json',
@@ -192,10 +194,13 @@ def main():
     print("--- 开始每日复盘与预测流程 ---")
     
     # --- Step 1: Optimize Strategies ---
-    print("\n--- 开始优化通用策略 ---")
-    run_command(f"{sys.executable} optimizer.py", "运行通用策略优化器")
-    print("\n--- 开始优化特码策略 ---")
-    run_command(f"{sys.executable} optimizer_special.py", "运行特码策略优化器")
+    # 每天只新增一期开奖，以已保存的最优策略热启动，只需少量代数；
+    # 通用/特码 × 香港/澳门 四个任务在全部CPU核内并发运行，各自限时并总会留下有效的最优策略
+    print("\n--- 开始优化通用与特码策略 (热启动，并发) ---")
+    jobs = optimizer_scheduler.job_matrix(['general', 'special'])
+    for job in optimizer_scheduler.run_jobs(jobs, extra_args=['--warm-start', '--time-budget', str(OPTIMIZE_TIME_BUDGET)]):
+        if job['returncode'] != 0:
+            print(f"  -> 错误: {job['label']} 优化失败，详见 {job['log_file']}")
 
     # --- Step 2: Fetch latest data ---
     print("\n--- 开始获取最新彩票数据 ---")
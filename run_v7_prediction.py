@@ -1,61 +1,96 @@
 """
 V7 预测系统 - 一键生成预测
 使用优化后的8生肖智能覆盖算法
+
+V7PredictionEngine 预加载历史数据、最优策略与特码窗口统计，之后每次预测只运行评分本身；
+仪表盘把它作为常驻资源在进程内直接调用，数据或策略文件变化后（is_stale）重新加载。
 """
 import json
 import os
 import advanced_lottery_analysis_v7 as analyzer
+from data_files import file_version
+
+DATA_FILE = 'lottery_data_2025_complete.json'
+STRATEGY_FILE = 'best_special_strategy_macau_v7.json'
+OUTPUT_DIR = 'predictions'
 
-def load_best_strategy():
+def load_best_strategy(strategy_file=STRATEGY_FILE):
     """加载最优V7策略"""
-    strategy_file = 'best_special_strategy_macau_v7.json'
     try:
         with open(strategy_file, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
         print(f"警告: 未找到优化策略文件，使用默认V7参数")
+        return dict(analyzer.DEFAULT_V7_WEIGHTS)
+
+class V7PredictionEngine:
+    """预加载历史数据、最优策略与窗口统计的V7预测引擎"""
+
+    def __init__(self, data_file=DATA_FILE, strategy_file=STRATEGY_FILE):
+        self.data_file = data_file
+        self.strategy_file = strategy_file
+        # 在读取之前取版本：读取期间文件被改写时 is_stale 为真，下次使用时重新加载
+        self.versions = (file_version(data_file), file_version(strategy_file))
+        self.weights = load_best_strategy(strategy_file)
+        self.special_history = analyzer.load_special_number_data(data_file)
+        self.stats = None
+        self.latest_period = None
+        if self.special_history:
+            # 窗口统计只依赖历史与回顾期，预测时直接复用
+            self.stats = analyzer.special_window_stats(self.special_history, analyzer.special_lookback(self.weights))
+            self.latest_period = max(int(r['period']) for r in self.special_history)
+
+    def is_stale(self):
+        """数据文件或策略文件在加载之后是否有变化"""
+        return (file_version(self.data_file), file_version(self.strategy_file)) != self.versions
+
+    def predict(self, next_period=None):
+        """生成预测结果（与保存的预测文件格式相同）；没有历史数据或预测失败时返回 None"""
+        if not self.special_history:
+            return None
+        prediction = analyzer.analyze_special_trend(self.special_history, self.weights, self.stats)
+        if not prediction:
+            return None
+        zodiacs = prediction['top_zodiacs']
         return {
-            'special_hot': 2.5,
-            'special_gap': 2.5,
-            'special_zodiac': 5.0,
-            'special_color_weight': 3.0,
-            'special_tail_weight': 3.0,
-            'special_cold_protect': 4.0,
-            'special_lookback': 30,
-            'special_resonance': 2.0,
-            'special_cycle_weight': 2.5,
-            'special_element_weight': 2.5,
-            'special_balance_weight': 2.0,
-            'special_diversity_bonus': 1.5
+            "period": next_period or self.latest_period + 1,
+            "algorithm": "V7",
+            "predicted_zodiacs": [z[0] for z in zodiacs],
+            "zodiac_scores": {z[0]: z[1] for z in zodiacs},
+            "predicted_color": prediction['predicted_color'],
+            "predicted_tail": prediction['predicted_tail'],
+            "predicted_element": prediction.get('predicted_element', '未知'),
+            "recommended_numbers": prediction['recommended_numbers'][:12],
+            "defense_info": prediction.get('defense_info', {})
         }
 
-def generate_prediction(next_period):
+def save_prediction(result, output_dir=OUTPUT_DIR):
+    """保存预测结果，返回文件路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f'v7_prediction_{result["period"]}.json')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return output_file
+
+def generate_prediction(next_period, engine=None):
     """生成下期预测"""
-    import sys
-    # 设置stdout编码为UTF-8
-    if sys.platform == 'win32':
-        import io
-        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-    
     print("="*70)
     print(f" V7 特码预测系统 - 澳门第 {next_period} 期")
     print("="*70)
     
-    # 加载策略
-    weights = load_best_strategy()
+    # 加载策略与历史数据
+    engine = engine or V7PredictionEngine()
+    weights = engine.weights
     print(f"\n[OK] 已加载优化策略")
-    
-    # 加载历史数据
-    special_history = analyzer.load_special_number_data()
-    if not special_history:
+    if not engine.special_history:
         print("错误: 无法加载历史数据")
         return None
     
-    print(f"[OK] 已加载 {len(special_history)} 期历史数据")
+    print(f"[OK] 已加载 {len(engine.special_history)} 期历史数据")
     
     # 生成预测
-    prediction = analyzer.analyze_special_trend(special_history, weights)
-    if not prediction:
+    result = engine.predict(next_period)
+    if not result:
         print("错误: 预测生成失败")
         return None
     
@@ -66,25 +101,22 @@ def generate_prediction(next_period):
     
     # 8个推荐生肖
     print(f"\n【特码推荐生肖】（8个）")
-    zodiacs = prediction['top_zodiacs']
-    for i, (zodiac, score) in enumerate(zodiacs, 1):
+    for i, (zodiac, score) in enumerate(result['zodiac_scores'].items(), 1):
         category = "热门" if i <= 6 else "防守"
         print(f"  {i}. {zodiac} (评分: {score:.2f}) - {category}")
     
     # 属性预测
     print(f"\n【预测属性】")
-    print(f"  波色: {prediction['predicted_color']}")
-    print(f"  尾数: {prediction['predicted_tail']}")
-    print(f"  五行: {prediction.get('predicted_element', '未知')}")
+    print(f"  波色: {result['predicted_color']}")
+    print(f"  尾数: {result['predicted_tail']}")
+    print(f"  五行: {result['predicted_element']}")
     
     # 推荐号码
     print(f"\n【综合推荐号码】（前12名）")
-    numbers = prediction['recommended_numbers']
-    print(f"  {', '.join(map(str, numbers[:12]))}")
+    print(f"  {', '.join(map(str, result['recommended_numbers']))}")
     
     # 防守信息
-    defense_info = prediction.get('defense_info', {})
-    coldest = defense_info.get('coldest_zodiacs', [])
+    coldest = result['defense_info'].get('coldest_zodiacs', [])
     if coldest:
         print(f"\n【防守提示】")
         print(f"  最冷生肖: {', '.join(coldest[:3])}")
@@ -97,25 +129,8 @@ def generate_prediction(next_period):
     print(f"  优化状态: {'已优化' if '28.5823' in str(weights.get('special_lookback', 0)) else '默认参数'}")
     
     # 保存预测
-    output_dir = 'predictions'
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, f'v7_prediction_{next_period}.json')
-    
-    result = {
-        "period": next_period,
-        "algorithm": "V7",
-        "predicted_zodiacs": [z[0] for z in zodiacs],
-        "zodiac_scores": {z[0]: z[1] for z in zodiacs},
-        "predicted_color": prediction['predicted_color'],
-        "predicted_tail": prediction['predicted_tail'],
-        "predicted_element": prediction.get('predicted_element', '未知'),
-        "recommended_numbers": numbers[:12],
-        "defense_info": defense_info
-    }
-    
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        output_file = save_prediction(result)
         print(f"\n[OK] 预测结果已保存至: {output_file}")
     except Exception as e:
         print(f"\n警告: 保存失败 - {e}")
@@ -131,12 +146,18 @@ if __name__ == "__main__":
     parser.add_argument('--period', type=int, help='预测期号（默认为最新期+1）')
     args = parser.parse_args()
     
+    import sys
+    # 设置stdout编码为UTF-8
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    
     if args.period:
         next_period = args.period
     else:
         # 自动获取下一期
         try:
-            with open('lottery_data_2025_complete.json', 'r', encoding='utf-8') as f:
+            with open(DATA_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             latest_period = max(int(r['period']) for r in data['totalRecords'])
             next_period = latest_period + 1
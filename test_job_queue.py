@@ -0,0 +1,57 @@
+"""
+后台任务队列测试：排队中被取消的任务（从未启动）在仪表盘进度面板中正常显示；
+新的工作进程结束上一个工作进程遗留的任务进程组
+"""
+import os
+import subprocess
+import sys
+import time
+import pytest
+import job_queue
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py')
+
+
+def test_cancel_queued_job(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    job, created = job_queue.submit('daily', db_path=db_path)
+    assert created
+
+    cancelled = job_queue.cancel(job['id'], db_path=db_path)
+    assert cancelled['status'] == 'cancelled'
+    assert cancelled['started_at'] is None
+    assert cancelled['finished_at'] is not None
+    assert job_queue.job_progress(cancelled) is None
+    assert job_queue.latest_job('daily', db_path=db_path)['id'] == job['id']
+
+
+def test_dashboard_renders_job_cancelled_while_queued(tmp_path, monkeypatch):
+    testing = pytest.importorskip('streamlit.testing.v1')
+    # 仪表盘使用相对路径的 jobs.db 与数据文件：在空目录中运行
+    monkeypatch.chdir(tmp_path)
+    job, _ = job_queue.submit('daily')
+    job_queue.cancel(job['id'])
+
+    app = testing.AppTest.from_file(DASHBOARD, default_timeout=60)
+    app.run()
+    app.sidebar.radio[0].set_value("执行中心").run()
+
+    assert not app.exception
+    assert any(f"(#{job['id']}) 已取消" in warning.value for warning in app.warning)
+
+
+def test_worker_kills_orphaned_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = str(tmp_path / 'jobs.db')
+    # 模拟工作进程异常退出：任务仍是运行中，它的脚本在独立的进程组中继续运行
+    job, _ = job_queue.submit('daily', db_path=db_path)
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'], start_new_session=True)
+    conn = job_queue.connect(db_path)
+    conn.execute("UPDATE jobs SET status = 'running', started_at = ?, pid = ? WHERE id = ?",
+                 (time.time(), process.pid, job['id']))
+    conn.close()
+
+    job_queue.run_worker(db_path, idle_exit=1)
+
+    assert process.wait(timeout=10) != 0
+    assert job_queue.get_job(job['id'], db_path=db_path)['status'] == 'failed'
@@ -0,0 +1,62 @@
+"""
+检查点续跑测试：中断后 --resume 续跑的结果必须与同一种子不中断运行的结果完全相同
+"""
+import json
+import shutil
+import optimizer_core
+import optimizer_engine
+import optimizer_special_v7
+
+SEED = 7
+GENERATIONS = 5
+INTERRUPT_AFTER = 3
+
+
+def make_objective(directory):
+    """与 V7 优化器相同的目标，但所有输出文件写入 directory"""
+    v7 = optimizer_special_v7.OBJECTIVE
+    return optimizer_engine.Objective(
+        v7.key, v7.name, v7.fitness_fn, v7.parameter_space, v7.integer_genes, preload=v7.preload,
+        backtest_range=10, population_size=8, n_generations=GENERATIONS, elite_count=v7.elite_count,
+        stall_generations=GENERATIONS + 1, min_diversity=0.0,
+        best_file=str(directory / 'best_{lottery}.json'),
+        checkpoint_file=str(directory / 'checkpoint_{lottery}.json'),
+        log_file=str(directory / 'log_{lottery}.json'),
+        telemetry_file=str(directory / 'telemetry_{lottery}.jsonl'))
+
+
+def _fitness_curve(checkpoint_file):
+    with open(checkpoint_file, 'r', encoding='utf-8') as f:
+        log = json.load(f)['fitness_log']
+    return [(entry['generation'], entry['best_fitness'], entry['average_fitness']) for entry in log]
+
+
+def test_resume_matches_uninterrupted_run(tmp_path, monkeypatch):
+    full_dir, resumed_dir = tmp_path / 'full', tmp_path / 'resumed'
+    full_dir.mkdir()
+    resumed_dir.mkdir()
+    full, resumed = make_objective(full_dir), make_objective(resumed_dir)
+
+    # 不中断运行，同时把第 INTERRUPT_AFTER 代结束时的检查点复制给续跑的目录，模拟在那里被中断
+    save_checkpoint = optimizer_core.save_checkpoint
+
+    def save_and_copy(path, lottery_type, backtest_range, generation, *args, **kwargs):
+        save_checkpoint(path, lottery_type, backtest_range, generation, *args, **kwargs)
+        if generation == INTERRUPT_AFTER:
+            shutil.copy(path, resumed.checkpoint_file(lottery_type))
+
+    monkeypatch.setattr(optimizer_core, 'save_checkpoint', save_and_copy)
+    full_best, full_fitness = optimizer_engine.run_evolution(full, 'macau', workers=1, seed=SEED)
+    monkeypatch.setattr(optimizer_core, 'save_checkpoint', save_checkpoint)
+
+    # 续跑使用另一个种子：随机数状态必须完全来自检查点
+    resumed_best, resumed_fitness = optimizer_engine.run_evolution(resumed, 'macau', workers=1, seed=SEED + 1,
+                                                                   resume=True)
+
+    assert resumed_fitness == full_fitness
+    assert resumed_best == full_best
+    checkpoint_full = _fitness_curve(full.checkpoint_file('macau'))
+    checkpoint_resumed = _fitness_curve(resumed.checkpoint_file('macau'))
+    assert len(checkpoint_resumed) == GENERATIONS
+    assert checkpoint_resumed == checkpoint_full
+
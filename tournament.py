@@ -0,0 +1,220 @@
+"""
+策略锦标赛：一次遍历历史，同时评估多个策略文件 × 分析器版本 (V6特码 / V7)
+
+历史只加载一次。窗口计数（生肖/波色/尾数/五行）与版本、回顾期都无关的部分是整段历史的
+前缀累计计数 (WindowCounts)，只扫描一次历史；任一期、任一回顾期的窗口计数都是两个前缀之差，
+不再逐期扫描窗口。生肖遗漏每期计算一次，由所有策略共享；由计数组装的窗口统计按 (版本, 回顾期) 每期一次。
+输出排行榜（含随机基线显著性）与逐期命中矩阵。
+"""
+import os
+import time
+from collections import Counter
+import numpy as np
+import advanced_lottery_analysis as macau_analyzer
+import advanced_hk_analysis as hk_analyzer
+import advanced_lottery_analysis_v7 as analyzer_v7
+import backtester_v7
+import backtest_significance
+import walk_forward_v7
+
+ANALYZERS = {
+    'v6': {'macau': macau_analyzer, 'hk': hk_analyzer},
+    'v7': {'macau': analyzer_v7, 'hk': analyzer_v7}
+}
+
+DEFAULT_STRATEGY_NAME = '默认参数'
+
+# 窗口计数的字段：名称 -> 从一期特码记录取类别（None 表示该期不计数）
+COUNT_FIELDS = {
+    'zodiac': lambda r: r['shengXiao'],
+    'color': lambda r: r['color'],
+    'tail': lambda r: r['number'] % 10,
+    'element': lambda r: r.get('wuXing') or None
+}
+
+
+class WindowCounts:
+    """
+    整段历史的前缀累计计数：prefix[j] 为 special_history[:j] 中各类别的出现次数，
+    first[j] 为 j 及之后（更早）各类别第一次出现的下标。
+    窗口 special_history[start:start + size] 的计数为 prefix[end] - prefix[start]，
+    键按窗口内首次出现的顺序排列，与 Counter 直接扫描窗口的结果（含 most_common 的并列次序）完全相同。
+    """
+
+    def __init__(self, special_history):
+        n = len(special_history)
+        self.n = n
+        self.fields = {}
+        for name, category_of in COUNT_FIELDS.items():
+            values = [category_of(r) for r in special_history]
+            categories = list(dict.fromkeys(v for v in values if v is not None))
+            index = {c: k for k, c in enumerate(categories)}
+            occurrences = np.zeros((n + 1, len(categories)), dtype=int)
+            first = np.full((n + 1, len(categories)), n)
+            for j in range(n - 1, -1, -1):
+                first[j] = first[j + 1]
+                if values[j] is not None:
+                    occurrences[j + 1, index[values[j]]] = 1
+                    first[j, index[values[j]]] = j
+            self.fields[name] = (categories, np.cumsum(occurrences, axis=0), first)
+
+    def window(self, start, size):
+        """special_history[start:start + size] 的各字段计数 {字段: Counter}"""
+        end = min(start + size, self.n)
+        counts = {}
+        for name, (categories, prefix, first) in self.fields.items():
+            window_counts = prefix[end] - prefix[start]
+            present = np.flatnonzero(window_counts)
+            order = present[np.argsort(first[start, present], kind='stable')]
+            counts[name] = Counter({categories[k]: int(window_counts[k]) for k in order})
+        return counts
+
+
+def default_strategy_files(lottery_type):
+    """彩种下已有的特码策略文件"""
+    candidates = [
+        f'best_special_strategy_{lottery_type}.json',
+        f'best_special_strategy_{lottery_type}_v7.json'
+    ]
+    return [f for f in candidates if os.path.exists(f)]
+
+
+def build_entrants(lottery_type, strategy_files, versions, include_defaults=True):
+    """策略文件 × 分析器版本 的全部组合"""
+    strategies = []
+    for path in strategy_files:
+        weights = analyzer_v7.load_json_safe(path, default_value=None)
+        if weights is None:
+            print(f"警告: 无法加载策略文件 {path}，已跳过。")
+            continue
+        strategies.append((os.path.splitext(os.path.basename(path))[0], weights))
+    if include_defaults:
+        strategies.append((DEFAULT_STRATEGY_NAME, dict(analyzer_v7.DEFAULT_V7_WEIGHTS)))
+
+    entrants = []
+    for version in versions:
+        for name, weights in strategies:
+            entrants.append({
+                'name': f'{version.upper()} | {name}',
+                'version': version,
+                'analyzer': ANALYZERS[version][lottery_type],
+                'weights': weights,
+                'lookback': analyzer_v7.special_lookback(weights)
+            })
+    return entrants
+
+
+def run_tournament(lottery_type, entrants, max_periods=None):
+    """
+    单次遍历历史评估所有参赛策略。
+    返回 (periods, tables, stats_computed)：tables[i] 为第 i 个策略的列式滚动回测结果表，
+    stats_computed 为由前缀计数组装窗口统计的次数（每期每个 (版本, 回顾期) 一次，不扫描窗口）。
+    """
+    special_history = walk_forward_v7.load_special_history(lottery_type)
+    n_periods = min(walk_forward_v7.available_periods(special_history, e['weights']) for e in entrants)
+    if max_periods is not None:
+        n_periods = min(n_periods, max_periods)
+
+    tables = [walk_forward_v7.empty_table() for _ in entrants]
+    window_counts = WindowCounts(special_history)
+    stats_computed = 0
+    for i in range(n_periods):
+        target_draw = special_history[i]
+        history_for_prediction = special_history[i + 1:]
+        # 生肖遗漏与回顾期、版本均无关，每期只扫描一次历史
+        gaps = analyzer_v7.zodiac_gaps(history_for_prediction)
+        shared_stats = {}
+        for entrant, table in zip(entrants, tables):
+            key = (entrant['version'], entrant['lookback'])
+            if key not in shared_stats:
+                shared_stats[key] = entrant['analyzer'].special_window_stats(
+                    history_for_prediction, entrant['lookback'], gaps,
+                    counts=window_counts.window(i + 1, entrant['lookback']))
+                stats_computed += 1
+            row = walk_forward_v7.evaluate_period(history_for_prediction, target_draw, entrant['weights'],
+                                                  entrant['analyzer'], shared_stats[key])
+            if row is None:
+                continue
+            for col in walk_forward_v7.TABLE_COLUMNS:
+                table[col].append(row[col])
+
+    periods = [int(special_history[i]['period']) for i in range(n_periods)]
+    return periods, tables, stats_computed
+
+
+LEADERBOARD_SIMULATIONS = 5000
+
+
+def build_leaderboard(entrants, tables, n_sims=LEADERBOARD_SIMULATIONS):
+    """排行榜：按高出同覆盖度随机策略的生肖命中率排序"""
+    leaderboard = []
+    for entrant, table in zip(entrants, tables):
+        total = walk_forward_v7.table_size(table)
+        significance = backtest_significance.significance_report(table, n_sims=n_sims, n_perms=n_sims // 2)
+        zodiac = significance['zodiac'] if significance else {}
+        number = significance['number'] if significance else {}
+        leaderboard.append({
+            'name': entrant['name'],
+            'version': entrant['version'],
+            'periods': total,
+            'zodiac_count': max((len(z) for z in table['predicted_zodiacs']), default=0),
+            'zodiac_hits': sum(table['zodiac_hit']),
+            'zodiac_rate': zodiac.get('hit_rate', 0.0),
+            'zodiac_edge': zodiac.get('hit_rate', 0.0) - zodiac.get('random_mean_rate', 0.0),
+            'zodiac_p_value': zodiac.get('p_value_vs_random'),
+            'number_hits': sum(table['number_hit']),
+            'number_rate': number.get('hit_rate', 0.0),
+            'number_p_value': number.get('p_value_vs_random'),
+            'v7_score': backtester_v7.score_walk_forward(table)
+        })
+    leaderboard.sort(key=lambda r: (r['zodiac_edge'], r['number_rate']), reverse=True)
+    return leaderboard
+
+
+def display_leaderboard(lottery_type, leaderboard, n_periods):
+    print(f"\n{'='*90}")
+    print(f"策略锦标赛排行榜 - {lottery_type.upper()}（共 {n_periods} 期）")
+    print(f"{'='*90}")
+    print(f"\n  {'排名':<4} {'策略':<42} {'生肖数':<6} {'生肖命中':<10} {'超随机':<8} {'p值':<8} {'号码命中':<10} {'V7得分'}")
+    print(f"  {'-'*86}")
+    for rank, r in enumerate(leaderboard, 1):
+        p = f"{r['zodiac_p_value']:.3f}" if r['zodiac_p_value'] is not None else "--"
+        print(f"  {rank:<4} {r['name']:<42} {r['zodiac_count']:<6} {r['zodiac_rate']*100:>6.1f}%   "
+              f"{r['zodiac_edge']*100:>+5.1f}%  {p:<8} {r['number_rate']*100:>6.1f}%    {r['v7_score']}")
+    print(f"\n{'='*90}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="策略锦标赛：单次遍历评估多个特码策略")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--strategies', nargs='*', default=None, help='策略文件（默认该彩种全部特码策略文件）')
+    parser.add_argument('--versions', nargs='+', default=['v6', 'v7'], choices=list(ANALYZERS.keys()))
+    parser.add_argument('--no-defaults', action='store_true', help='不加入默认V7参数')
+    parser.add_argument('--periods', type=int, default=None, help='最多评估最近 N 期（默认全部公共区间）')
+    args = parser.parse_args()
+
+    strategy_files = args.strategies if args.strategies is not None else default_strategy_files(args.lottery)
+    entrants = build_entrants(args.lottery, strategy_files, args.versions, include_defaults=not args.no_defaults)
+    if not entrants:
+        print("没有可参赛的策略。")
+    else:
+        start = time.time()
+        periods, tables, stats_computed = run_tournament(args.lottery, entrants, args.periods)
+        leaderboard = build_leaderboard(entrants, tables)
+        display_leaderboard(args.lottery, leaderboard, len(periods))
+        print(f"参赛策略: {len(entrants)}, 窗口计数: 前缀累计扫描历史 1 次, 按回顾期切片组装 {stats_computed} 次 "
+              f"(逐期扫描窗口需 {len(entrants) * len(periods)} 次), 耗时 {time.time() - start:.2f} 秒")
+
+        output_file = f'{args.lottery}_strategy_tournament.json'
+        result = {
+            'lottery_type': args.lottery,
+            'periods': periods,
+            'leaderboard': leaderboard,
+            'hit_matrix': {
+                'zodiac': {e['name']: [int(h) for h in t['zodiac_hit']] for e, t in zip(entrants, tables)},
+                'number': {e['name']: [int(h) for h in t['number_hit']] for e, t in zip(entrants, tables)}
+            }
+        }
+        if analyzer_v7.save_json_safe(result, output_file):
+            print(f"[OK] 锦标赛结果已保存至: {output_file}")
@@ -1,77 +1,190 @@
 """
 V7性能可视化
 生成性能对比和趋势分析
+
+报告状态（分段计数、连续命中/失误、生肖统计、最近5期）保存在
+v7_performance_state.json 中，每新开奖一期只做一次 O(1) 的增量更新，
+因此报告覆盖全部历史，而不仅是最近50期。
 """
 import json
-from collections import Counter
+import os
+import advanced_lottery_analysis_v7 as analyzer
+import walk_forward_v7
+import backtest_significance
+
+STRATEGY_FILE = 'best_special_strategy_macau_v7.json'
+STATE_FILE = 'v7_performance_state.json'
+REPORT_FILE = 'v7_performance_report.json'
+
+ZODIAC_ORDER = ['鼠', '牛', '虎', '兔', '龙', '蛇', '马', '羊', '猴', '鸡', '狗', '猪']
+SEGMENT_SIZE = 10       # 分段表现每段期数
+RECENT_WINDOW = 50      # 分段表现覆盖的最近期数
+RECENT_DETAIL = 5       # 最新详情保留期数
+
+
+def new_performance_state(fingerprint):
+    """创建空的报告状态"""
+    return {
+        'strategy_fingerprint': fingerprint,
+        'last_period': None,
+        'total_tests': 0,
+        'hits': 0,
+        'number_hits': 0,
+        'current_hit_streak': 0,
+        'current_miss_streak': 0,
+        'max_hit_streak': 0,
+        'max_miss_streak': 0,
+        'zodiac_stats': {z: {'actual': 0, 'hit': 0} for z in ZODIAC_ORDER},
+        'recent_hits': [],      # 最近 RECENT_WINDOW 期的命中情况，从新到旧
+        'recent_5': []
+    }
+
+
+def update_performance_state(state, row):
+    """用一期新开奖的回测结果更新报告状态（行必须按时间从旧到新依次传入）"""
+    hit = row['zodiac_hit']
+
+    state['total_tests'] += 1
+    state['hits'] += int(hit)
+    state['number_hits'] += int(row['number_hit'])
+
+    if hit:
+        state['current_hit_streak'] += 1
+        state['current_miss_streak'] = 0
+        state['max_hit_streak'] = max(state['max_hit_streak'], state['current_hit_streak'])
+    else:
+        state['current_miss_streak'] += 1
+        state['current_hit_streak'] = 0
+        state['max_miss_streak'] = max(state['max_miss_streak'], state['current_miss_streak'])
+
+    stats = state['zodiac_stats'].setdefault(row['actual_zodiac'], {'actual': 0, 'hit': 0})
+    stats['actual'] += 1
+    stats['hit'] += int(hit)
+
+    state['recent_hits'].insert(0, hit)
+    del state['recent_hits'][RECENT_WINDOW:]
+
+    state['recent_5'].insert(0, {
+        'period': row['period'],
+        'actual': row['actual_zodiac'],
+        'predicted': row['predicted_zodiacs'],
+        'hit': hit
+    })
+    del state['recent_5'][RECENT_DETAIL:]
+
+    state['last_period'] = row['period']
+    return state
+
+
+def build_performance_report(state):
+    """由报告状态生成 v7_performance_report.json 的内容"""
+    total = state['total_tests']
+    hits = state['hits']
+    accuracy = (hits / total * 100) if total > 0 else 0
+
+    segments = []
+    recent_hits = state['recent_hits']
+    for start in range(0, RECENT_WINDOW, SEGMENT_SIZE):
+        segment = recent_hits[start:start + SEGMENT_SIZE]
+        if not segment:
+            continue
+        name = f"最近{SEGMENT_SIZE}期" if start == 0 else f"{start}-{start + SEGMENT_SIZE}期"
+        seg_hits = sum(1 for h in segment if h)
+        segments.append({
+            'name': name,
+            'hits': seg_hits,
+            'total': len(segment),
+            'accuracy': seg_hits / len(segment) * 100
+        })
+
+    zodiac_stats = {}
+    for z, stats in state['zodiac_stats'].items():
+        zodiac_stats[z] = {
+            'actual': stats['actual'],
+            'hit': stats['hit'],
+            'rate': (stats['hit'] / stats['actual'] * 100) if stats['actual'] > 0 else 0
+        }
+
+    return {
+        "total_tests": total,
+        "hits": hits,
+        "accuracy": accuracy,
+        "miss_rate": 100 - accuracy,
+        "number_hits": state['number_hits'],
+        "latest_period": state['last_period'],
+        "max_hit_streak": state['max_hit_streak'],
+        "max_miss_streak": state['max_miss_streak'],
+        "current_hit_streak": state['current_hit_streak'],
+        "current_miss_streak": state['current_miss_streak'],
+        "segments": segments,
+        "zodiac_stats": zodiac_stats,
+        "recent_5": state['recent_5']
+    }
+
+
+def update_performance_report(lottery_type='macau', weights=None):
+    """
+    增量更新报告：只把上次更新之后新开奖的期数计入状态。
+    策略变化或状态文件缺失时从滚动回测结果表完整重建。
+    返回最新的报告字典；无法加载策略时返回 None。
+    """
+    if weights is None:
+        try:
+            with open(STRATEGY_FILE, 'r', encoding='utf-8') as f:
+                weights = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"错误: 无法加载数据 - {e}")
+            return None
+
+    fingerprint = walk_forward_v7.strategy_fingerprint(weights)
+    state = analyzer.load_json_safe(STATE_FILE, default_value={})
+    if not state or state.get('strategy_fingerprint') != fingerprint:
+        state = new_performance_state(fingerprint)
+
+    table = walk_forward_v7.get_walk_forward(lottery_type, weights)
+
+    # 结果表从新到旧，状态需按时间顺序从旧到新更新
+    last_period = state['last_period']
+    new_count = 0
+    for period in table['period']:
+        if last_period is not None and period <= last_period:
+            break
+        new_count += 1
+    for row in reversed(list(walk_forward_v7.iter_rows(table, limit=new_count))):
+        update_performance_state(state, row)
+
+    report = build_performance_report(state)
+    if new_count or not os.path.exists(REPORT_FILE):
+        analyzer.save_json_safe(state, STATE_FILE)
+        analyzer.save_json_safe(report, REPORT_FILE)
+    return report
+
 
 def analyze_v7_performance():
     """分析V7性能并生成报告"""
-    
+
     # 设置stdout编码为UTF-8（解决Windows乱码）
     import sys
     if sys.platform == 'win32':
         import io
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-    
+
     print("="*70)
     print(" V7 性能分析报告")
     print("="*70)
-    
-    # 加载数据
-    try:
-        with open('lottery_data_2025_complete.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        records = data['totalRecords']
-        records.sort(key=lambda x: int(x['period']), reverse=True)
-        
-        with open('best_special_strategy_macau_v7.json', 'r', encoding='utf-8') as f:
-            v7_weights = json.load(f)
-    except Exception as e:
-        print(f"错误: 无法加载数据 - {e}")
+
+    report = update_performance_report('macau')
+    if report is None:
         return
-    
-    # 导入分析器
-    import advanced_lottery_analysis_v7 as analyzer
-    
-    # 加载历史数据
-    special_history = analyzer.load_special_number_data()
-    
+
+    total = report['total_tests']
+    hits = report['hits']
+    accuracy = report['accuracy']
+
     print(f"\n数据概览:")
-    print(f"  总期数: {len(special_history)}")
-    print(f"  分析期数: 最近50期")
-    
-    # 回测最近50期
-    lookback = 30
-    test_results = []
-    
-    for i in range(50):
-        if i + lookback >= len(special_history):
-            break
-            
-        target = special_history[i]
-        history = special_history[i+1:]
-        
-        prediction = analyzer.analyze_special_trend(history, v7_weights)
-        if not prediction:
-            continue
-        
-        predicted_zodiacs = [z[0] for z in prediction['top_zodiacs']]
-        actual_zodiac = target['shengXiao']
-        
-        hit = actual_zodiac in predicted_zodiacs
-        test_results.append({
-            'period': target['period'],
-            'actual': actual_zodiac,
-            'predicted': predicted_zodiacs,
-            'hit': hit
-        })
-    
-    # 统计
-    total = len(test_results)
-    hits = sum(1 for r in test_results if r['hit'])
-    accuracy = (hits / total * 100) if total > 0 else 0
-    
+    print(f"  最新期号: {report['latest_period']}")
+    print(f"  分析期数: 全部历史")
+
     print(f"\n" + "="*70)
     print(f" 整体统计")
     print(f"="*70)
@@ -80,133 +193,86 @@ def analyze_v7_performance():
     print(f"  失误期数: {total - hits}")
     print(f"  准确率: {accuracy:.2f}%")
     print(f"  失误率: {100 - accuracy:.2f}%")
-    
+
     # 分段统计
     print(f"\n" + "="*70)
     print(f" 分段表现")
     print(f"="*70)
-    
-    segments = [
-        ("最近10期", test_results[:10]),
-        ("10-20期", test_results[10:20]),
-        ("20-30期", test_results[20:30]),
-        ("30-40期", test_results[30:40]),
-        ("40-50期", test_results[40:50])
-    ]
-    
-    for name, segment in segments:
-        if not segment:
-            continue
-        seg_hits = sum(1 for r in segment if r['hit'])
-        seg_total = len(segment)
-        seg_acc = (seg_hits / seg_total * 100) if seg_total > 0 else 0
-        
+
+    for segment in report['segments']:
+        seg_acc = segment['accuracy']
         bar_length = int(seg_acc / 2)
         bar = "#" * bar_length + "-" * (50 - bar_length)
-        
-        print(f"\n  {name:12} {seg_hits:2}/{seg_total:2}  {seg_acc:5.1f}%  [{bar}]")
-    
+
+        print(f"\n  {segment['name']:12} {segment['hits']:2}/{segment['total']:2}  {seg_acc:5.1f}%  [{bar}]")
+
     # 生肖分布分析
     print(f"\n" + "="*70)
     print(f" 生肖命中分析")
     print(f"="*70)
-    
-    zodiac_stats = {}
-    for z in ['鼠', '牛', '虎', '兔', '龙', '蛇', '马', '羊', '猴', '鸡', '狗', '猪']:
-        actual_count = sum(1 for r in test_results if r['actual'] == z)
-        hit_count = sum(1 for r in test_results if r['actual'] == z and r['hit'])
-        zodiac_stats[z] = {
-            'actual': actual_count,
-            'hit': hit_count,
-            'rate': (hit_count / actual_count * 100) if actual_count > 0 else 0
-        }
-    
+
     print(f"\n  {'生肖':<6} {'出现次数':<8} {'命中次数':<8} {'命中率'}")
     print(f"  {'-'*50}")
-    
-    for z, stats in sorted(zodiac_stats.items(), key=lambda x: x[1]['actual'], reverse=True):
+
+    for z, stats in sorted(report['zodiac_stats'].items(), key=lambda x: x[1]['actual'], reverse=True):
         if stats['actual'] == 0:
             continue
         bar_len = int(stats['rate'] / 5)
         bar = "#" * bar_len
         print(f"  {z:<6} {stats['actual']:<8} {stats['hit']:<8} {stats['rate']:5.1f}% [{bar}]")
-    
+
     # 连续命中/失误分析
     print(f"\n" + "="*70)
     print(f" 连续性分析")
     print(f"="*70)
-    
-    max_hit_streak = 0
-    max_miss_streak = 0
-    current_hit = 0
-    current_miss = 0
-    
-    for r in test_results:
-        if r['hit']:
-            current_hit += 1
-            current_miss = 0
-            max_hit_streak = max(max_hit_streak, current_hit)
-        else:
-            current_miss += 1
-            current_hit = 0
-            max_miss_streak = max(max_miss_streak, current_miss)
-    
-    print(f"\n  最长连续命中: {max_hit_streak} 期")
-    print(f"  最长连续失误: {max_miss_streak} 期")
-    
-    # V6 vs V7 对比
+
+    print(f"\n  最长连续命中: {report['max_hit_streak']} 期")
+    print(f"  最长连续失误: {report['max_miss_streak']} 期")
+
+    # 与随机策略对比（同期模拟 + 置换检验）
     print(f"\n" + "="*70)
-    print(f" V6 vs V7 性能对比")
+    print(f" V7 vs 随机基线")
     print(f"="*70)
     
-    comparison = [
-        ("生肖数量", "4个", "8个", "+100%"),
-        ("准确率", "41.2%", f"{accuracy:.1f}%", f"+{(accuracy/41.2-1)*100:.0f}%"),
-        ("失误率", "58.8%", f"{100-accuracy:.1f}%", f"-{(1-((100-accuracy)/58.8))*100:.0f}%"),
-        ("理论覆盖", "33.3%", "66.7%", "+100%")
-    ]
-    
-    print(f"\n  {'指标':<12} {'V6':<12} {'V7':<12} {'提升'}")
-    print(f"  {'-'*50}")
-    for metric, v6, v7, change in comparison:
-        print(f"  {metric:<12} {v6:<12} {v7:<12} {change}")
+    table = walk_forward_v7.load_walk_forward('macau')
+    significance = backtest_significance.significance_report(table) if table else None
+    if significance:
+        zodiac = significance['zodiac']
+        baseline = zodiac['random_mean_rate'] * 100
+        comparison = [
+            ("生肖数量", "8个", "8个", "-"),
+            ("准确率", f"{baseline:.1f}%", f"{accuracy:.1f}%", f"{accuracy - baseline:+.1f}%"),
+            ("失误率", f"{100-baseline:.1f}%", f"{100-accuracy:.1f}%", f"{baseline - accuracy:+.1f}%"),
+        ]
+        
+        print(f"\n  {'指标':<12} {'随机':<12} {'V7':<12} {'差值'}")
+        print(f"  {'-'*50}")
+        for metric, rnd, v7, change in comparison:
+            print(f"  {metric:<12} {rnd:<12} {v7:<12} {change}")
+        print()
+        for line in backtest_significance.format_significance(significance):
+            print(line)
+    else:
+        print("\n  无可用回测结果，无法进行对比")
     
     # 最新预测
     print(f"\n" + "="*70)
     print(f" 最新5期详情")
     print(f"="*70)
-    
-    for i, r in enumerate(test_results[:5], 1):
+
+    for i, r in enumerate(report['recent_5'], 1):
         status = "命中" if r['hit'] else "失误"
         status_symbol = "[HIT]" if r['hit'] else "[MISS]"
-        
+
         print(f"\n  第{i}期 - 期号{r['period']}")
         print(f"    实际生肖: {r['actual']}")
         print(f"    预测8肖: {', '.join(r['predicted'])}")
         print(f"    结果: {status_symbol} {status}")
-    
+
     print(f"\n" + "="*70)
     print(f" 分析完成")
     print(f"="*70)
-    
-    # 保存报告
-    report = {
-        "total_tests": total,
-        "hits": hits,
-        "accuracy": accuracy,
-        "miss_rate": 100 - accuracy,
-        "max_hit_streak": max_hit_streak,
-        "max_miss_streak": max_miss_streak,
-        "zodiac_stats": zodiac_stats,
-        "recent_5": test_results[:5]
-    }
-    
-    try:
-        with open('v7_performance_report.json', 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
-        print(f"\n详细报告已保存至: v7_performance_report.json")
-    except Exception as e:
-        print(f"\n警告: 保存报告失败 - {e}")
+    print(f"\n详细报告已保存至: {REPORT_FILE}")
 
 if __name__ == "__main__":
     analyze_v7_performance()
@@ -0,0 +1,295 @@
+"""
+V7 滚动回测引擎 (Walk-Forward)
+对历史逐期执行 analyze_special_trend，生成按期的列式结果表：
+预测8肖、推荐号码、实际开奖、命中情况与实际结果在预测中的排名。
+
+回测报告 (backtester_v7)、性能可视化 (visualize_v7_performance) 与
+准确率分析 (analyze_accuracy) 均从这张表派生，不再各自重复计算预测。
+"""
+import csv
+import hashlib
+import json
+import os
+import advanced_lottery_analysis_v7 as analyzer_v7
+
+DATA_FILES = {
+    'macau': 'lottery_data_2025_complete.json',
+    'hk': 'HK2025_lottery_data_complete.json'
+}
+
+# 列式结果表的列，行按期号从新到旧排列（与 special_history 一致）
+TABLE_COLUMNS = [
+    'period',
+    'actual_number',
+    'actual_zodiac',
+    'predicted_zodiacs',
+    'recommended_numbers',
+    'zodiac_hit',
+    'number_hit',
+    'zodiac_rank',      # 实际生肖在预测8肖中的名次，未命中为 0
+    'number_rank'       # 实际特码在推荐号码中的名次，未命中为 0
+]
+
+LIST_SEPARATOR = '|'
+
+
+# 进程内历史缓存：以数据文件的修改时间为准，重复回测（如优化器）不再重复解析JSON
+_history_cache = {}
+
+
+def load_special_history(lottery_type):
+    """按彩种加载特码历史（从新到旧），同一数据文件未变化时直接返回缓存"""
+    data_file = DATA_FILES.get(lottery_type)
+    if not data_file:
+        return []
+    mtime = os.path.getmtime(data_file) if os.path.exists(data_file) else None
+    cached = _history_cache.get(lottery_type)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, analyzer_v7.load_special_number_data(data_file))
+        _history_cache[lottery_type] = cached
+    return cached[1]
+
+
+def preload_history(lottery_type):
+    """进程池初始化时调用，预先加载该彩种的特码历史"""
+    load_special_history(lottery_type)
+
+
+def strategy_fingerprint(weights):
+    """策略权重的指纹，用于判断已保存的结果表是否仍然有效"""
+    payload = json.dumps(weights, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def min_history_for(weights):
+    """与回测器一致：预测至少需要 lookback + 5 期历史"""
+    return int(weights.get('special_lookback', 20)) + 5
+
+
+def empty_table():
+    return {col: [] for col in TABLE_COLUMNS}
+
+
+def evaluate_period(history_for_prediction, target_draw, weights, analyzer=analyzer_v7, stats=None):
+    """
+    对单期做一次预测并与实际结果比对，返回一行结果；无法预测时返回 None。
+    stats 为可选的共享窗口统计（analyzer.special_window_stats 的结果）。
+    """
+    prediction = analyzer.analyze_special_trend(history_for_prediction, weights, stats)
+    if not prediction:
+        return None
+
+    predicted_zodiacs = [p[0] for p in prediction.get('top_zodiacs', [])]
+    recommended_numbers = prediction.get('recommended_numbers', [])
+    actual_zodiac = target_draw['shengXiao']
+    actual_number = target_draw['number']
+
+    zodiac_rank = predicted_zodiacs.index(actual_zodiac) + 1 if actual_zodiac in predicted_zodiacs else 0
+    number_rank = recommended_numbers.index(actual_number) + 1 if actual_number in recommended_numbers else 0
+
+    return {
+        'period': int(target_draw['period']),
+        'actual_number': actual_number,
+        'actual_zodiac': actual_zodiac,
+        'predicted_zodiacs': predicted_zodiacs,
+        'recommended_numbers': recommended_numbers,
+        'zodiac_hit': zodiac_rank > 0,
+        'number_hit': number_rank > 0,
+        'zodiac_rank': zodiac_rank,
+        'number_rank': number_rank
+    }
+
+
+def available_periods(special_history, weights):
+    """可以做滚动回测的期数（每期都需要足够的更早历史）"""
+    return max(len(special_history) - min_history_for(weights), 0)
+
+
+def run_walk_forward(special_history, weights, max_periods=None, start=0, analyzer=analyzer_v7):
+    """
+    在整段历史上滚动回测：第 i 期只使用 i 之后（更早）的数据进行预测。
+    每期结果与回测区间无关，因此任意最近 N 期的报告都可以直接截取本表。
+    start 为跳过的最近期数，用于在较早的窗口上回测（如交叉验证的训练/测试段）。
+    analyzer 可替换为任何提供 analyze_special_trend 的分析模块（如V6特码分析器）。
+    """
+    table = empty_table()
+    available = available_periods(special_history, weights) - start
+    if available <= 0:
+        return table
+    if max_periods is not None:
+        available = min(available, max_periods)
+
+    for i in range(start, start + available):
+        row = evaluate_period(special_history[i + 1:], special_history[i], weights, analyzer)
+        if row is None:
+            continue
+        for col in TABLE_COLUMNS:
+            table[col].append(row[col])
+    return table
+
+
+def table_size(table):
+    return len(table['period'])
+
+
+def iter_rows(table, limit=None):
+    """按行遍历列式结果表（从新到旧）"""
+    n = table_size(table)
+    if limit is not None:
+        n = min(n, limit)
+    for i in range(n):
+        yield {col: table[col][i] for col in TABLE_COLUMNS}
+
+
+def recent(table, n):
+    """截取最近 n 期，仍为列式结构"""
+    return {col: values[:n] for col, values in table.items()}
+
+
+# --- 持久化 ---
+
+def table_path(lottery_type, fmt='csv'):
+    return f'{lottery_type}_v7_walk_forward.{fmt}'
+
+
+def meta_path(lottery_type):
+    return f'{lottery_type}_v7_walk_forward_meta.json'
+
+
+def _encode(col, value):
+    if col in ('predicted_zodiacs', 'recommended_numbers'):
+        return LIST_SEPARATOR.join(str(v) for v in value)
+    if col in ('zodiac_hit', 'number_hit'):
+        return int(value)
+    return value
+
+
+def _decode(col, value):
+    if col == 'predicted_zodiacs':
+        return value.split(LIST_SEPARATOR) if value else []
+    if col == 'recommended_numbers':
+        return [int(v) for v in value.split(LIST_SEPARATOR)] if value else []
+    if col in ('zodiac_hit', 'number_hit'):
+        return value == '1'
+    if col == 'actual_zodiac':
+        return value
+    return int(value)
+
+
+def save_walk_forward(table, lottery_type, weights):
+    """保存为 CSV（若环境中有 pandas + parquet 引擎则同时导出 Parquet）及元数据"""
+    csv_file = table_path(lottery_type, 'csv')
+    try:
+        with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TABLE_COLUMNS)
+            for row in iter_rows(table):
+                writer.writerow([_encode(col, row[col]) for col in TABLE_COLUMNS])
+    except IOError as e:
+        print(f"错误: 保存滚动回测结果失败 {e}")
+        return False
+
+    try:
+        import pandas as pd
+        pd.DataFrame(table).to_parquet(table_path(lottery_type, 'parquet'), index=False)
+    except (ImportError, ValueError):
+        pass
+
+    meta = {
+        'lottery_type': lottery_type,
+        'strategy_fingerprint': strategy_fingerprint(weights),
+        'latest_period': table['period'][0] if table['period'] else None,
+        'rows': table_size(table)
+    }
+    analyzer_v7.save_json_safe(meta, meta_path(lottery_type))
+    return True
+
+
+def load_walk_forward(lottery_type, weights=None):
+    """
+    读取已保存的结果表。若给定 weights 且与保存时的策略不一致则返回 None。
+    """
+    csv_file = table_path(lottery_type, 'csv')
+    meta = analyzer_v7.load_json_safe(meta_path(lottery_type), default_value={})
+    if not meta or not os.path.exists(csv_file):
+        return None
+    if weights is not None and meta.get('strategy_fingerprint') != strategy_fingerprint(weights):
+        return None
+
+    table = empty_table()
+    try:
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            for record in csv.DictReader(f):
+                for col in TABLE_COLUMNS:
+                    table[col].append(_decode(col, record[col]))
+    except (IOError, KeyError, ValueError):
+        return None
+    return table
+
+
+def extend_walk_forward(table, special_history, weights):
+    """
+    只为结果表最新一期之后新开奖的期数补算预测，并把新行插入表头。
+    返回新增的行数。
+    """
+    if not table['period']:
+        fresh = run_walk_forward(special_history, weights)
+        for col in TABLE_COLUMNS:
+            table[col] = fresh[col]
+        return table_size(table)
+
+    latest_period = table['period'][0]
+    new_rows = []
+    for i in range(available_periods(special_history, weights)):
+        target_draw = special_history[i]
+        if int(target_draw['period']) <= latest_period:
+            break
+        row = evaluate_period(special_history[i + 1:], target_draw, weights)
+        if row is not None:
+            new_rows.append(row)
+
+    for col in TABLE_COLUMNS:
+        table[col] = [row[col] for row in new_rows] + table[col]
+    return len(new_rows)
+
+
+def get_walk_forward(lottery_type, weights, special_history=None):
+    """
+    获取与当前策略、当前数据一致的结果表：
+    已保存且最新则直接读取；只有新开奖时仅补算新增期数；策略变化时重新计算。
+    """
+    if special_history is None:
+        special_history = load_special_history(lottery_type)
+
+    table = load_walk_forward(lottery_type, weights)
+    latest_period = int(special_history[0]['period']) if special_history else None
+    if table is not None and table['period'] and table['period'][0] == latest_period:
+        return table
+
+    if table is not None:
+        extend_walk_forward(table, special_history, weights)
+    else:
+        table = run_walk_forward(special_history, weights)
+    save_walk_forward(table, lottery_type, weights)
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="生成V7滚动回测结果表")
+    parser.add_argument('--lottery', type=str, default='macau', choices=['macau', 'hk'])
+    parser.add_argument('--strategy', type=str, default=None, help='策略文件（默认 best_special_strategy_<lottery>_v7.json）')
+    args = parser.parse_args()
+
+    strategy_file = args.strategy or f'best_special_strategy_{args.lottery}_v7.json'
+    weights = analyzer_v7.load_json_safe(strategy_file, default_value={})
+    if not weights:
+        print(f"注意: 未找到策略文件 {strategy_file}，将使用默认V7参数。")
+
+    history = load_special_history(args.lottery)
+    table = run_walk_forward(history, weights)
+    save_walk_forward(table, args.lottery, weights)
+    hits = sum(table['zodiac_hit'])
+    total = table_size(table)
+    print(f"[OK] {args.lottery.upper()} 滚动回测完成: {total} 期, 8生肖命中 {hits} 期")
+    print(f"     结果表已保存至: {table_path(args.lottery, 'csv')}")